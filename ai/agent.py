@@ -1,83 +1,229 @@
+import asyncio
+import json
+import logging
 import os
+import re
 import time
 from dotenv import load_dotenv
 
+from django.conf import settings
+
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain.agents import Tool, AgentExecutor, create_tool_calling_agent
 from langchain_community.tools.tavily_search.tool import TavilySearchResults
 
 from fastapi import HTTPException
 from google.api_core.exceptions import InternalServerError
 
+from sports.tools import sports_tool
+
+from .metrics import AI_RESPONSE_SECONDS, LLM_RETRIES, MetricsCallback
+from .pool import ExecutorPool
+from .router import AGENT, FAST, Hedged, ainvoke_hedged, classify_request, log_decision
+
 load_dotenv()
 
-# 1. Load Gemini LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",  # or "gemini-1.5-flash"
-    temperature=0.7
-)
+logger = logging.getLogger('gameplan.ai.agent')
+
+# 1. Load Gemini LLM (a deterministic local fake in OFFLINE_MODE)
+if settings.OFFLINE_MODE:
+    from .fakes import FakeToolCallingChatModel, fake_search
+
+    llm = FakeToolCallingChatModel()
+    fast_llm = FakeToolCallingChatModel()
+    search_func = fake_search
+else:
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",  # or "gemini-1.5-flash"
+        temperature=0.7
+    )
+    # Smaller, lower-latency model for follow-ups that need no tools
+    fast_llm = ChatGoogleGenerativeAI(
+        model=settings.AI_FAST_MODEL,
+        temperature=0.7,
+        max_output_tokens=512,
+    )
+    search_func = TavilySearchResults().run
 
 # 2. Tool for real-time info (web search)
-search_tool_instance = TavilySearchResults()
 search_tool = Tool(
     name="web-search",
-    func=search_tool_instance.run,
+    func=search_func,
     description="Search the web for up-to-date or factual information"
 )
 
-# 3. Memory for ongoing conversations
-memory = ConversationBufferMemory(
-    memory_key="chat_history",
-    return_messages=True
-)
+# Local fixtures, results and standings (sports/tools.py): answers from the
+# database in milliseconds, so the agent tries it before searching the web
+tools = [sports_tool, search_tool]
+
+# 3. Conversation history is passed in per request from the plan itself
+# (rolling summary + recent turns), so the executor holds no shared memory.
 
 # 4. Prompt guiding the AI’s behavior
 prompt = ChatPromptTemplate.from_messages([
     ("system", 
      "You're a sports expert AI assistant. Your job is to provide insightful, accurate, and concise information about football and other sports. "
      "You can discuss teams, players, match stats, recent scores, upcoming fixtures, and sports news. "
-     "If a question requires real-time or current data, call the appropriate tool to search the web and fetch updated info."),
+     "For fixtures, results and league tables, use the sports-data tool first. "
+     "If it has no data, or a question needs other real-time or current information, call the web-search tool to fetch updated info."),
     MessagesPlaceholder(variable_name="chat_history"),
     MessagesPlaceholder(variable_name="agent_scratchpad"),
     ("human", "{input}")
 ])
 
-# 5. Create the agent and executor
-agent = create_tool_calling_agent(
+# 5. Create the agent and executor. Each planning step (one model call) is
+# hedged; tool calls run once, in the executor
+agent = Hedged(AGENT, create_tool_calling_agent(
     llm=llm,
-    tools=[search_tool],
+    tools=tools,
     prompt=prompt
-)
+))
 
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=[search_tool],
-    memory=memory,
-    verbose=True  
-)
+def build_executor():
+    # Only the loop state is per executor; the agent runnable, tools and model
+    # clients above are shared, so this is cheap
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False  # steps are recorded by ai.tracing.TraceCallback instead of printed
+    )
+
+# One executor per concurrent request (see ai/pool.py)
+executor_pool = ExecutorPool(build_executor, size=settings.AI_EXECUTOR_POOL_SIZE)
+executor_pool.warm()
+
+# 6. Fast path: acknowledgements and edits of the last answer ("thanks",
+# "make it shorter") skip the agent loop, the tool and most of the history
+fast_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You're a sports expert AI assistant. Reply to the user's follow-up about the conversation so far. "
+     "Be brief, and don't invent new facts, scores or fixtures."),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}")
+])
+fast_chain = fast_prompt | fast_llm
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You maintain a running summary of a conversation between a user and a sports expert AI assistant. "
+     "Merge the new messages into the existing summary. Keep names, teams, dates, numbers, drills and any "
+     "decisions or preferences the user stated. Write plain prose, no more than 250 words."),
+    ("human", "Existing summary:\n{summary}\n\nNew messages:\n{messages}")
+])
+summary_chain = summary_prompt | llm
+
+title_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You name coaching and sports conversations. For each conversation below, write a short, specific title "
+     "of at most 6 words, without quotes or trailing punctuation. Answer with only a JSON object that maps "
+     "each conversation id to its title."),
+    ("human", "{conversations}")
+])
+# Titles are cheap: the fast model is enough
+title_chain = title_prompt | fast_llm
+
+# Models whose API clients are rebuilt in each worker after fork (ai.pool.post_fork)
+models = [llm, fast_llm]
+
+
+def build_chat_history(history=None, summary=None):
+    """Turn stored plan messages (and an optional summary) into chat messages."""
+    messages = []
+    if summary:
+        messages.append(SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+    for message in history or []:
+        if message.get("role") == "user":
+            messages.append(HumanMessage(content=message["content"]))
+        elif message.get("role") == "assistant":
+            messages.append(AIMessage(content=message["content"]))
+    return messages
+
+
+def summarize_conversation(previous_summary: str, messages: list, callbacks=None) -> str:
+    """Fold `messages` into `previous_summary` and return the updated summary."""
+    transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+    result = summary_chain.invoke({
+        "summary": previous_summary or "(none yet)",
+        "messages": transcript,
+    }, config={"callbacks": [MetricsCallback(), *(callbacks or [])]})
+    return result.content.strip()
+
+def generate_titles(excerpts: dict) -> dict:
+    """
+    Title several conversations in one model call. `excerpts` maps plan id to
+    the opening of its conversation; returns {plan_id: title} for the ids the
+    model answered for (unparsable output gives an empty dict).
+    """
+    conversations = "\n\n".join(f"[{plan_id}]\n{text}" for plan_id, text in excerpts.items())
+    result = title_chain.invoke({"conversations": conversations}, config={"callbacks": [MetricsCallback()]})
+
+    # Models like to wrap JSON in a code fence
+    match = re.search(r"\{.*\}", str(result.content), re.DOTALL)
+    try:
+        titles = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        titles = {}
+
+    return {
+        int(plan_id): str(title).strip().strip('"').rstrip('.')[:255]
+        for plan_id, title in titles.items()
+        if str(plan_id).isdigit() and int(plan_id) in excerpts and str(title).strip()
+    }
 
-# 6. AI response generator with retry logic
-def generate_ai_response(user_input: str) -> str:
-    max_retries = 3
+async def _arun_route(route, user_input, history, summary, config):
+    if route == FAST:
+        chat_history = build_chat_history((history or [])[-settings.AI_FAST_PATH_HISTORY:], summary)
+        result = await ainvoke_hedged(FAST, fast_chain, {"input": user_input, "chat_history": chat_history}, config)
+        return result.content
+    chat_history = build_chat_history(history, summary)
+    result = await executor_pool.ainvoke({"input": user_input, "chat_history": chat_history}, config=config)
+    return result.get("output", "I'm sorry, I couldn't generate a proper response.")
 
-    for attempt in range(1, max_retries + 1):
+# 7. AI response generator with routing and retry logic; waits on the model without holding a thread
+MAX_RETRIES = 3
+RETRY_DELAY_SECONDS = 2
+
+
+class _ResponseRun:
+    """Routing, config, retry policy and metrics of one response."""
+
+    def __init__(self, user_input, callbacks):
+        self.route, self.reason = classify_request(user_input)
+        self.config = {"callbacks": [MetricsCallback(), *(callbacks or [])]}
+        self.started = time.perf_counter()
+
+    def succeeded(self, output):
+        elapsed = time.perf_counter() - self.started
+        AI_RESPONSE_SECONDS.observe(elapsed, outcome='ok')
+        log_decision(self.route, self.reason, elapsed)
+        return output
+
+    def failed(self, error, attempt):
+        """Seconds to wait before retrying after `error`, or raise the HTTPException to answer with."""
+        if isinstance(error, InternalServerError):
+            logger.warning("Google API InternalServerError (attempt %s of %s): %s", attempt, MAX_RETRIES, error)
+            if attempt < MAX_RETRIES:
+                LLM_RETRIES.inc(error=type(error).__name__)
+                return RETRY_DELAY_SECONDS
+            AI_RESPONSE_SECONDS.observe(time.perf_counter() - self.started, outcome='unavailable')
+            raise HTTPException(
+                status_code=503,
+                detail="AI service is currently unavailable due to an internal error. Please try again later."
+            ) from error
+        logger.error("Unhandled exception while generating an AI response", exc_info=error)
+        AI_RESPONSE_SECONDS.observe(time.perf_counter() - self.started, outcome='error')
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected error occurred while processing the AI response."
+        ) from error
+
+
+async def agenerate_ai_response(user_input: str, history=None, summary=None, callbacks=None) -> str:
+    run = _ResponseRun(user_input, callbacks)
+    for attempt in range(1, MAX_RETRIES + 1):
         try:
-            result = agent_executor.invoke({"input": user_input})
-            return result.get("output", "I'm sorry, I couldn't generate a proper response.")
-        except InternalServerError as e:
-            print(f"[Retry {attempt}] Google API InternalServerError: {e}")
-            if attempt < max_retries:
-                time.sleep(2)
-            else:
-                raise HTTPException(
-                    status_code=503,
-                    detail="AI service is currently unavailable due to an internal error. Please try again later."
-                )
+            return run.succeeded(await _arun_route(run.route, user_input, history, summary, run.config))
         except Exception as e:
-            print("Unhandled exception in generate_ai_response:", e)
-            raise HTTPException(
-                status_code=500,
-                detail="Unexpected error occurred while processing the AI response."
-            )
+            await asyncio.sleep(run.failed(e, attempt))
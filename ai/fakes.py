@@ -0,0 +1,102 @@
+"""Deterministic local stand-ins for Gemini and Tavily, used in OFFLINE_MODE."""
+import hashlib
+from typing import List
+
+from google.api_core.exceptions import InternalServerError
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from utils.fakes import asimulate_call, simulate_call
+
+from .router import REALTIME_PATTERN  # questions that need live data trigger a tool call
+
+CANNED_REPLIES = [
+    "Start with a 10 minute dynamic warm-up, then run a 4v2 rondo focusing on two-touch play.",
+    "Split the squad into three groups and rotate through passing, finishing and small-sided games.",
+    "Keep the session to 60 minutes: technical block, opposed practice, then a conditioned game.",
+    "Focus on body shape when receiving and scanning before the ball arrives.",
+]
+
+
+def _digest(text):
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest(), 16)
+
+
+def _count_tokens(text):
+    return max(1, len(str(text).split()) * 4 // 3)
+
+
+def _llm_error():
+    return InternalServerError("Injected offline LLM failure")
+
+
+class FakeToolCallingChatModel(BaseChatModel):
+    """
+    Chat model that answers deterministically from the input. When tools are
+    bound and the question looks real-time, the first turn asks for the
+    first tool; once a tool result is in the messages, it answers using it.
+    Reports usage_metadata like Gemini so metering works offline.
+    """
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self):
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [convert_to_openai_tool(tool)['function']['name'] for tool in tools]
+        return self.model_copy(update={'tool_names': names})
+
+    def _respond(self, messages):
+        question = next(
+            (str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)),
+            '',
+        )
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        prompt_tokens = sum(_count_tokens(m.content) for m in messages)
+
+        if self.tool_names and not tool_results and REALTIME_PATTERN.search(question):
+            message = AIMessage(
+                content='',
+                tool_calls=[{
+                    'name': self.tool_names[0],
+                    'args': {'__arg1': question},
+                    'id': f"call_{_digest(question) % 10 ** 8}",
+                }],
+            )
+        else:
+            reply = CANNED_REPLIES[_digest(question) % len(CANNED_REPLIES)]
+            if tool_results:
+                reply = f"Based on the latest information: {str(tool_results[-1].content)[:200]} {reply}"
+            message = AIMessage(content=f"[offline] {reply}")
+
+        completion_tokens = _count_tokens(message.content or message.tool_calls)
+        message.usage_metadata = {
+            'input_tokens': prompt_tokens,
+            'output_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        simulate_call('llm', _llm_error)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asimulate_call('llm', _llm_error)
+        return self._respond(messages)
+
+
+def fake_search(query: str):
+    """Tavily-shaped canned results for `query`."""
+    simulate_call('search', lambda: ConnectionError("Injected offline search failure"))
+    digest = _digest(query)
+    return [
+        {
+            'url': f"https://example.com/sports/{(digest >> (8 * i)) % 100000}",
+            'content': f"Offline result {i + 1} for '{query}': {CANNED_REPLIES[(digest + i) % len(CANNED_REPLIES)]}",
+        }
+        for i in range(3)
+    ]
@@ -0,0 +1,119 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.metrics import Counter, Histogram
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+AI_RESPONSE_SECONDS = Histogram(
+    'gameplan_ai_response_duration_seconds',
+    'Wall time of agenerate_ai_response, retries included.',
+    ['outcome'],
+    buckets=LLM_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    'gameplan_llm_call_duration_seconds',
+    'Latency of individual chat model calls.',
+    ['model', 'outcome'],
+    buckets=LLM_BUCKETS,
+)
+LLM_RETRIES = Counter(
+    'gameplan_llm_retries_total',
+    'Agent runs retried after a model error, by error type.',
+    ['error'],
+)
+TOOL_CALLS = Counter(
+    'gameplan_tool_calls_total',
+    'Agent tool invocations by tool and outcome.',
+    ['tool', 'outcome'],
+)
+TOOL_CALL_SECONDS = Histogram(
+    'gameplan_tool_call_duration_seconds',
+    'Latency of agent tool invocations.',
+    ['tool'],
+    buckets=LLM_BUCKETS,
+)
+AI_ROUTE_DECISIONS = Counter(
+    'gameplan_ai_route_decisions_total',
+    'Messages routed to the fast path or the full agent, by reason.',
+    ['route', 'reason'],
+)
+AI_HEDGED_REQUESTS = Counter(
+    'gameplan_ai_hedged_requests_total',
+    'Calls that were hedged with a second request, by which one answered first.',
+    ['route', 'winner'],
+)
+AI_EXECUTOR_POOL_BUILDS = Counter(
+    'gameplan_ai_executor_pool_builds_total',
+    'Agent executors built, at warm-up or because every pooled executor was busy.',
+    ['reason'],
+)
+
+
+def _name(serialized, default):
+    # The class or tool name, never free text, to keep labels bounded
+    return (serialized or {}).get('name') or default
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """Times every chat model and tool call of one run. Use one instance per run."""
+
+    run_inline = True  # no thread hop per event in async runs
+
+    def __init__(self, deferred=False):
+        self._started = {}
+        # A fork holds its observations until merged, so a losing attempt records none
+        self._deferred = [] if deferred else None
+
+    def _start(self, run_id, name):
+        self._started[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id):
+        name, started = self._started.pop(run_id, (None, None))
+        return name, (time.perf_counter() - started) if started is not None else None
+
+    def _record(self, method, *args, **labels):
+        if self._deferred is not None:
+            self._deferred.append((method, args, labels))
+        else:
+            method(*args, **labels)
+
+    def fork(self):
+        """A fresh instance for one attempt of a hedged call (ai.router); merge() the winner's back."""
+        return type(self)(deferred=True)
+
+    def merge(self, other):
+        for method, args, labels in other._deferred:
+            self._record(method, *args, **labels)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, _name(serialized, 'chat_model'))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, _name(serialized, 'llm'))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, elapsed = self._finish(run_id)
+        if elapsed is not None:
+            self._record(LLM_CALL_SECONDS.observe, elapsed, model=model, outcome='ok')
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, elapsed = self._finish(run_id)
+        if elapsed is not None:
+            self._record(LLM_CALL_SECONDS.observe, elapsed, model=model, outcome='error')
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, _name(serialized, 'tool'))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        tool, elapsed = self._finish(run_id)
+        if elapsed is not None:
+            self._record(TOOL_CALLS.inc, tool=tool, outcome='ok')
+            self._record(TOOL_CALL_SECONDS.observe, elapsed, tool=tool)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        tool, elapsed = self._finish(run_id)
+        if elapsed is not None:
+            self._record(TOOL_CALLS.inc, tool=tool, outcome='error')
+            self._record(TOOL_CALL_SECONDS.observe, elapsed, tool=tool)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('plans', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTokenUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0)),
+                ('completion_tokens', models.PositiveBigIntegerField(default=0)),
+                ('tool_call_tokens', models.PositiveBigIntegerField(default=0)),
+                ('tool_calls', models.PositiveIntegerField(default=0)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_token_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'django"."daily_token_usage',
+                'indexes': [models.Index(fields=['date'], name='daily_token_date_905555_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='daily_token_usage_user_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TokenUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('tool_call_tokens', models.PositiveIntegerField(default=0)),
+                ('tool_calls', models.PositiveIntegerField(default=0)),
+                ('llm_calls', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='token_usage', to='plans.plan')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'django"."token_usage',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='token_usage_user_id_5b452f_idx')],
+            },
+        ),
+    ]
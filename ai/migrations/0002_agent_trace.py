@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+        ('plans', '0003_plan_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('request_id', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('failed', models.BooleanField(default=False)),
+                ('spans', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='agent_traces', to='plans.plan')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_traces', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'django"."agent_trace',
+                'indexes': [models.Index(fields=['plan', 'message_index'], name='agent_trace_plan_id_7cadb4_idx'), models.Index(fields=['created_at'], name='agent_trace_created_4b09b4_idx')],
+            },
+        ),
+    ]
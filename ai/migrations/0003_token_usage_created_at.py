@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_agent_trace'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tokenusage',
+            index=models.Index(fields=['created_at'], name='token_usage_created_f867dc_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import models
+from django.conf import settings
+
+
+class TokenUsage(models.Model):
+    """Token counts for a single agent run (one assistant message)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='token_usage')
+    plan = models.ForeignKey('plans.Plan', on_delete=models.SET_NULL, null=True, blank=True, related_name='token_usage')
+    # Index of the assistant reply in plan.conversation; null when the run failed
+    message_index = models.PositiveIntegerField(null=True, blank=True)
+
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    tool_call_tokens = models.PositiveIntegerField(default=0)  # output tokens spent emitting tool calls
+    tool_calls = models.PositiveIntegerField(default=0)
+    llm_calls = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'django"."token_usage'
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at']),  # recent-traffic checks by background jobs
+        ]
+
+    def __str__(self):
+        return f"{self.total_tokens} tokens - {self.user_id}"
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens + self.tool_call_tokens
+
+
+class DailyTokenUsage(models.Model):
+    """Per user per day rollup of TokenUsage, kept up to date on every run."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_token_usage')
+    date = models.DateField()
+
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    tool_call_tokens = models.PositiveBigIntegerField(default=0)
+    tool_calls = models.PositiveIntegerField(default=0)
+    runs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'django"."daily_token_usage'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_token_usage_user_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.user_id}"
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens + self.tool_call_tokens
+
+
+class AgentTrace(models.Model):
+    """
+    Span tree of one sampled agent run: every chain, LLM and tool step with
+    its timing and token counts. Linked to the HTTP request by request_id.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='agent_traces')
+    plan = models.ForeignKey('plans.Plan', on_delete=models.SET_NULL, null=True, blank=True, related_name='agent_traces')
+    message_index = models.PositiveIntegerField(null=True, blank=True)  # null when the run failed
+    request_id = models.CharField(max_length=64, blank=True, db_index=True)
+
+    duration_ms = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    failed = models.BooleanField(default=False)
+    spans = models.JSONField(default=list)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'django"."agent_trace'
+        indexes = [
+            models.Index(fields=['plan', 'message_index']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.request_id or self.pk} - {self.duration_ms} ms"
@@ -0,0 +1,102 @@
+"""
+Per-worker pool of agent executors.
+
+Everything an executor is made of (model clients, prompt, tool bindings,
+the agent runnable) is built once when ai.agent is imported, which with
+gunicorn's preload_app happens in the master, before fork, so workers share
+those pages copy-on-write. Executors are thin wrappers over those parts;
+each concurrent call takes one from the pool, so no two requests ever run
+through the same object, and conversation memory comes in with the call
+(plan history and summary), never from the executor.
+
+gRPC channels don't survive fork: gunicorn.conf.py calls post_fork() in
+each worker to rebuild the model clients (one per model, shared by all the
+worker's executors) and empty the pool.
+"""
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from .metrics import AI_EXECUTOR_POOL_BUILDS
+
+logger = logging.getLogger('gameplan.ai.pool')
+
+
+class ExecutorPool:
+    """
+    Keeps up to `size` idle executors made by `build()`. acquire() hands one
+    out exclusively; when all are busy a new one is built and, if the pool is
+    full by the time it comes back, dropped. ainvoke() has the Runnable
+    signature, so the pool can stand in for an executor.
+    """
+
+    def __init__(self, build, size):
+        self._build = build
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _new(self, reason):
+        AI_EXECUTOR_POOL_BUILDS.inc(reason=reason)
+        return self._build()
+
+    def _check_pid(self):
+        # Executors inherited through a fork nobody told us about
+        if self._pid != os.getpid():
+            self.reset()
+
+    def warm(self):
+        """Fill the pool up to its size."""
+        while not self._idle.full():
+            try:
+                self._idle.put_nowait(self._new('warm'))
+            except queue.Full:
+                break
+
+    def reset(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            self._pid = os.getpid()
+
+    @contextmanager
+    def acquire(self):
+        self._check_pid()
+        try:
+            executor = self._idle.get_nowait()
+        except queue.Empty:
+            executor = self._new('busy')
+        try:
+            yield executor
+        finally:
+            try:
+                self._idle.put_nowait(executor)
+            except queue.Full:
+                pass
+
+    async def ainvoke(self, inputs, config=None, **kwargs):
+        with self.acquire() as executor:
+            return await executor.ainvoke(inputs, config=config, **kwargs)
+
+
+def rebuild_clients(*models):
+    """Give each chat model fresh API clients (their channels don't survive fork)."""
+    for model in models:
+        if getattr(model, 'client', None) is not None:
+            model.validate_environment()
+
+
+def post_fork():
+    """Make this worker's model clients and executors. Called from gunicorn's post_fork hook."""
+    from . import agent
+
+    rebuild_clients(*{id(model): model for model in agent.models}.values())
+    agent.executor_pool.reset()
+    agent.executor_pool.warm()
+    logger.info("worker %s: rebuilt model clients, %s executors ready", os.getpid(), agent.executor_pool.size)
@@ -0,0 +1,224 @@
+"""
+Routing between the cheap no-tool path and the full agent, and hedging of
+slow model calls. Wired up in ai/agent.py.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackManager
+from langchain_core.runnables import Runnable
+
+from .metrics import AI_HEDGED_REQUESTS, AI_ROUTE_DECISIONS
+
+logger = logging.getLogger('gameplan.ai.router')
+
+FAST = 'fast'
+AGENT = 'agent'
+
+# Questions that need live data: always go to the agent, which can search
+REALTIME_PATTERN = re.compile(
+    r'\b(today|tonight|tomorrow|yesterday|latest|live|score|scores|result|results|fixture|fixtures|'
+    r'standings?|table|transfer|news|this (week|weekend|season))\b',
+    re.IGNORECASE,
+)
+
+# Acknowledgements and edits of the previous answer: no new facts needed
+FOLLOW_UP_PATTERN = re.compile(
+    r'^\s*(thanks|thank you|thx|ty|ok(ay)?|cool|great|nice|perfect|awesome|got it|sounds good|'
+    r'hi|hello|hey|bye|good (morning|evening|night)|'
+    r'(can you |please )?(make it|make that) (shorter|longer|simpler|clearer|more concise|more detailed)|'
+    r'shorter|simpler|simplify( it| that)?|rephrase( it| that)?|reword( it| that)?|'
+    r'summari[sz]e( it| that| this)?|tl;?dr|(can you )?repeat( that)?|explain (it|that) again|'
+    r'translate (it|that|this)\b.*)\W*$',
+    re.IGNORECASE,
+)
+
+MAX_FAST_WORDS = 12
+
+
+def classify_request(user_input):
+    """Return (route, reason) for a user message."""
+    if REALTIME_PATTERN.search(user_input):
+        return AGENT, 'realtime'
+    if len(user_input.split()) <= MAX_FAST_WORDS and FOLLOW_UP_PATTERN.match(user_input):
+        return FAST, 'follow-up'
+    return AGENT, 'default'
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies (seconds) for one route."""
+
+    def __init__(self, size=200, min_samples=20):
+        self._samples = deque(maxlen=size)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self._min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+# Model calls, for the hedge thresholds
+latency = {FAST: LatencyWindow(), AGENT: LatencyWindow()}
+# Whole responses (every step of an agent run), for log_decision
+response_latency = {FAST: LatencyWindow(), AGENT: LatencyWindow()}
+
+# A hedge only goes out if one of AI_HEDGE_SLOTS is free right now, so a
+# busy worker stops hedging instead of doubling its upstream load
+_slots = threading.BoundedSemaphore(settings.AI_HEDGE_SLOTS)
+
+
+def hedge_after(route):
+    """Seconds to wait before hedging a call on `route`, or None (no hedge yet)."""
+    if not settings.AI_HEDGE_ENABLED:
+        return None
+    threshold = latency[route].percentile(settings.AI_HEDGE_PERCENTILE)
+    if threshold is None:
+        return None
+    return max(threshold, settings.AI_HEDGE_MIN_MS / 1000)
+
+
+def _schedule(coro):
+    """Start `coro` as a task holding a slot, or close it and return None if there is none."""
+    if not _slots.acquire(blocking=False):
+        coro.close()
+        return None
+    task = asyncio.ensure_future(coro)
+    task.add_done_callback(lambda _: _slots.release())
+    return task
+
+
+class _Attempt:
+    """
+    The config of one attempt of a hedged call. Callback handlers that can
+    fork() (usage, trace, metrics) get a fresh instance per attempt, so the
+    loser, which may still be running after the request has stored its
+    usage and trace, never touches the request's handlers; merge() folds the
+    winner's back in. Other handlers are shared.
+    """
+
+    def __init__(self, config):
+        self._forks = {}
+        callbacks = (config or {}).get('callbacks')
+        if isinstance(callbacks, BaseCallbackManager):
+            callbacks = callbacks.copy()
+            callbacks.handlers = [self._fork(handler) for handler in callbacks.handlers]
+            callbacks.inheritable_handlers = [self._fork(handler) for handler in callbacks.inheritable_handlers]
+        elif callbacks:
+            callbacks = [self._fork(handler) for handler in callbacks]
+        self.config = {**(config or {}), 'callbacks': callbacks}
+
+    def _fork(self, handler):
+        if not hasattr(handler, 'fork'):
+            return handler
+        if id(handler) not in self._forks:
+            self._forks[id(handler)] = (handler, handler.fork())
+        return self._forks[id(handler)][1]
+
+    def merge(self):
+        for handler, fork in self._forks.values():
+            handler.merge(fork)
+
+
+async def ainvoke_hedged(route, runnable, inputs, config=None):
+    """
+    Invoke `runnable`, and if it hasn't answered within the route's latency
+    percentile, fire an identical second request and take whichever
+    finishes first; the other is cancelled. Without enough history to know
+    the percentile, or without a free slot, this is a plain ainvoke.
+    """
+    threshold = hedge_after(route)
+    started = time.perf_counter()
+    if threshold is None:
+        result = await runnable.ainvoke(inputs, config=config)
+        latency[route].add(time.perf_counter() - started)
+        return result
+
+    primary_attempt = _Attempt(config)
+    primary = asyncio.ensure_future(runnable.ainvoke(inputs, config=primary_attempt.config))
+    done, _ = await asyncio.wait([primary], timeout=threshold)
+    hedge_attempt = _Attempt(config)
+    hedge = None if done else _schedule(runnable.ainvoke(inputs, config=hedge_attempt.config))
+    if hedge is None:
+        try:
+            return await primary
+        finally:
+            primary_attempt.merge()
+            latency[route].add(time.perf_counter() - started)
+
+    attempts = {primary: ('primary', primary_attempt), hedge: ('hedge', hedge_attempt)}
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                winner, attempt = attempts[task]
+                attempt.merge()
+                latency[route].add(time.perf_counter() - started)
+                AI_HEDGED_REQUESTS.inc(route=route, winner=winner)
+                logger.info("hedged %s call after %.0f ms, %s answered first", route, threshold * 1000, winner)
+                return task.result()
+    finally:
+        # Nobody waits for the loser on the event loop: cancel it
+        for task in pending:
+            task.cancel()
+    primary_attempt.merge()
+    raise error
+
+
+class Hedged(Runnable):
+    """
+    `runnable` with its ainvoke hedged on `route`. Wraps a single model call
+    (the agent's planning step), never a tool-using loop, so a hedge repeats
+    the model request only, not the web searches. Chat turns run async;
+    invoke() is a plain call.
+    """
+
+    def __init__(self, route, runnable):
+        self.route = route
+        self.runnable = runnable
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        # AgentExecutor picks its agent class from this
+        return self.runnable.OutputType
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await ainvoke_hedged(self.route, self.runnable, input, config)
+
+
+def log_decision(route, reason, elapsed):
+    """Log a routing decision and, for the fast path, the time saved against the agent's median."""
+    AI_ROUTE_DECISIONS.inc(route=route, reason=reason)
+    response_latency[route].add(elapsed)
+    agent_median = response_latency[AGENT].percentile(50)
+    saved_ms = (agent_median - elapsed) * 1000 if route == FAST and agent_median is not None else None
+    logger.info(
+        "routed to %s (%s) in %.0f ms%s",
+        route, reason, elapsed * 1000,
+        f", ~{saved_ms:.0f} ms saved vs agent median" if saved_ms is not None else '',
+        extra={'ai_route': {'route': route, 'reason': reason, 'latency_ms': round(elapsed * 1000), 'saved_ms': saved_ms}},
+    )
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import AgentTrace, DailyTokenUsage
+
+
+class DailyTokenUsageSerializer(serializers.ModelSerializer):
+    total_tokens = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = DailyTokenUsage
+        fields = ['date', 'prompt_tokens', 'completion_tokens', 'tool_call_tokens', 'tool_calls', 'runs', 'total_tokens']
+
+
+class AgentTraceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AgentTrace
+        fields = ['id', 'request_id', 'message_index', 'duration_ms', 'attempts', 'failed', 'spans', 'created_at']
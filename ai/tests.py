@@ -0,0 +1,153 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+
+from . import router
+from .agent import agenerate_ai_response, generate_titles
+from .models import DailyTokenUsage, TokenUsage
+from .tracing import TraceCallback
+from .usage import TokenUsageCallback, get_tokens_used_today, has_remaining_quota, record_usage
+
+
+def slow_first_call(calls, seconds=0.3):
+    """Stand-in for utils.fakes.asimulate_call: the first model call is slow, the rest answer at once."""
+    async def asimulate(service, error_factory):
+        calls.append(service)
+        if len(calls) == 1:
+            await asyncio.sleep(seconds)
+
+    return asimulate
+
+
+# Every model call slower than 50 ms is hedged
+@override_settings(AI_HEDGE_ENABLED=True, AI_HEDGE_MIN_MS=50)
+class HedgingTests(TestCase):
+    def setUp(self):
+        windows = {route: router.LatencyWindow() for route in (router.FAST, router.AGENT)}
+        for window in windows.values():
+            for _ in range(20):
+                window.add(0.001)
+        patcher = mock.patch.dict(router.latency, windows)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.calls = []
+        for target, fake in (
+            ('ai.fakes.asimulate_call', slow_first_call(self.calls)),
+            # It would close the test case's connection, mid-transaction
+            ('sports.tools.close_old_connections', lambda: None),
+        ):
+            patcher = mock.patch(target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_agent_hedges_the_model_call_not_the_tools(self):
+        usage, trace = TokenUsageCallback(), TraceCallback()
+        with mock.patch.object(router.AI_HEDGED_REQUESTS, 'inc') as hedged:
+            output = asyncio.run(agenerate_ai_response("latest results in the league", callbacks=[usage, trace]))
+        self.assertTrue(output.startswith("[offline]"))
+        hedged.assert_called_once_with(route=router.AGENT, winner='hedge')
+
+        # Three model requests went out (the slow one, its hedge, the answer) but
+        # only the winner's counts; the tool ran once
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(usage.llm_calls, 2)
+        self.assertEqual(usage.tool_calls, 1)
+        self.assertEqual([span['kind'] for span in trace.spans].count('tool'), 1)
+        self.assertEqual([span['kind'] for span in trace.spans].count('llm'), 2)
+        self.assertEqual([span['id'] for span in trace.spans], list(range(len(trace.spans))))
+
+    def test_fast_path_hedge_cancels_the_loser(self):
+        usage = TokenUsageCallback()
+        with mock.patch.object(router.AI_HEDGED_REQUESTS, 'inc') as hedged:
+            output = asyncio.run(agenerate_ai_response("thanks", callbacks=[usage]))
+        self.assertTrue(output.startswith("[offline]"))
+        hedged.assert_called_once_with(route=router.FAST, winner='hedge')
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(usage.llm_calls, 1)
+
+    def test_no_free_slot_means_no_hedge(self):
+        usage = TokenUsageCallback()
+        with mock.patch.object(router, '_slots', mock.Mock(**{'acquire.return_value': False})):
+            asyncio.run(agenerate_ai_response("thanks", callbacks=[usage]))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(usage.llm_calls, 1)
+
+
+def usage(prompt_tokens, completion_tokens, tool_calls=0):
+    callback = TokenUsageCallback()
+    callback.prompt_tokens, callback.completion_tokens = prompt_tokens, completion_tokens
+    callback.tool_calls, callback.llm_calls = tool_calls, 1
+    return callback
+
+
+class UsageTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+
+    def test_runs_roll_up_into_the_day(self):
+        record_usage(self.user, None, 1, usage(100, 20, tool_calls=1))
+        record_usage(self.user, None, 3, usage(300, 40))
+
+        self.assertEqual(TokenUsage.objects.filter(user=self.user).count(), 2)
+        day = DailyTokenUsage.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual((day.prompt_tokens, day.completion_tokens, day.tool_calls, day.runs), (400, 60, 1, 2))
+        self.assertEqual(get_tokens_used_today(self.user), 460)
+
+    def test_quota_counts_today_only(self):
+        DailyTokenUsage.objects.create(
+            user=self.user, date=timezone.localdate() - timedelta(days=1), prompt_tokens=10_000, runs=1,
+        )
+        with override_settings(AI_DAILY_TOKEN_QUOTAS={'free': 500}):
+            self.assertTrue(has_remaining_quota(self.user))
+            record_usage(self.user, None, 1, usage(450, 50))
+            self.assertFalse(has_remaining_quota(self.user))
+        with override_settings(AI_DAILY_TOKEN_QUOTAS={'free': 0}):
+            self.assertTrue(has_remaining_quota(self.user))
+
+    def test_another_request_creating_the_day_first(self):
+        record_usage(self.user, None, 1, usage(100, 20))
+        real_update = QuerySet.update
+        updates = []
+
+        def update(queryset, **kwargs):
+            # The first UPDATE runs before the other request's INSERT commits
+            updates.append(queryset.model)
+            if len(updates) == 1:
+                return 0
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            record_usage(self.user, None, 3, usage(300, 40))
+
+        self.assertEqual(updates, [DailyTokenUsage, DailyTokenUsage])
+        day = DailyTokenUsage.objects.get(user=self.user)
+        self.assertEqual((day.prompt_tokens, day.completion_tokens, day.runs), (400, 60, 2))
+
+
+class TitleParsingTests(TestCase):
+    excerpts = {3: "User: rondos?\nAssistant: ...", 7: "User: pressing?\nAssistant: ..."}
+
+    def titles(self, content):
+        reply = mock.Mock(invoke=mock.Mock(return_value=AIMessage(content=content)))
+        with mock.patch('ai.agent.title_chain', reply):
+            return generate_titles(self.excerpts)
+
+    def test_fenced_json_is_read_and_cleaned_up(self):
+        content = '```json\n{"3": "\\"Rondo progressions\\"", "7": "Pressing triggers."}\n```'
+        self.assertEqual(self.titles(content), {3: "Rondo progressions", 7: "Pressing triggers"})
+
+    def test_unknown_ids_and_blank_titles_are_dropped(self):
+        content = '{"3": "  ", "7": "Pressing triggers", "9": "Not asked for", "x": "Not an id"}'
+        self.assertEqual(self.titles(content), {7: "Pressing triggers"})
+
+    def test_unparsable_output_gives_no_titles(self):
+        self.assertEqual(self.titles("Here are some titles: Rondos, Pressing"), {})
+        self.assertEqual(self.titles('{"3": "Rondos",}'), {})
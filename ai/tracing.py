@@ -0,0 +1,192 @@
+import random
+import time
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.request_id import get_request_id
+
+from .models import AgentTrace
+
+MAX_SPANS = 200
+MAX_TEXT = 300
+
+
+def _short(value):
+    text = str(value)
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT] + '...'
+
+
+class TraceCallback(BaseCallbackHandler):
+    """
+    Records every chain, chat model and tool step of an agent run as a span
+    tree (spans point at their parent by id). Each top-level chain run is one
+    attempt, so retries in agenerate_ai_response show up as sibling roots;
+    plumbing chains inside an agent step (prompt, parser) fold into the step.
+    Prompts and replies are not kept, only names, timings, token counts,
+    truncated tool input and errors. Use one instance per run.
+    """
+
+    run_inline = True  # in async runs, keep events in order rather than farm them out to threads
+
+    def __init__(self):
+        self.request_id = get_request_id()
+        self.spans = []
+        self._open = {}  # run_id -> span
+        self._folded = {}  # run_id of an unrecorded plumbing chain -> its nearest recorded ancestor
+        self._started = time.perf_counter()
+        self._base = 0  # id of this instance's first span (non-zero in a fork)
+        self.finished_at = None
+
+    def fork(self):
+        """
+        A fresh instance for one attempt of a hedged call (ai.router), on the
+        same clock and able to attach its spans to this trace's open ones;
+        merge() the winner's back.
+        """
+        fork = type(self)()
+        fork.request_id = self.request_id
+        fork._started = self._started
+        fork._open = dict(self._open)
+        fork._folded = dict(self._folded)
+        fork._base = self._base + len(self.spans)
+        return fork
+
+    def merge(self, other):
+        shift = self._base + len(self.spans) - other._base
+        for span in other.spans:
+            if len(self.spans) >= MAX_SPANS:
+                break
+            span = {**span, 'id': span['id'] + shift}
+            if span['parent'] is not None and span['parent'] >= other._base:
+                span['parent'] += shift
+            if span['parent'] is None and span['kind'] == 'chain':
+                span['attempt'] = 1 + sum(1 for s in self.spans if s['parent'] is None and s['kind'] == 'chain')
+            self.spans.append(span)
+
+    def _offset_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def _parent(self, parent_run_id):
+        return self._open.get(parent_run_id) or self._folded.get(parent_run_id)
+
+    def _start(self, kind, serialized, run_id, parent_run_id, **attrs):
+        if self._base + len(self.spans) >= MAX_SPANS:
+            return
+        parent = self._parent(parent_run_id)
+        span = {
+            'id': self._base + len(self.spans),
+            'parent': parent['id'] if parent else None,
+            'kind': kind,
+            'name': (serialized or {}).get('name') or kind,
+            'start_ms': self._offset_ms(),
+            'end_ms': None,
+            **attrs,
+        }
+        if parent is None and kind == 'chain':
+            span['attempt'] = 1 + sum(1 for s in self.spans if s['parent'] is None and s['kind'] == 'chain')
+        self.spans.append(span)
+        self._open[run_id] = span
+
+    def _end(self, run_id, error=None, **attrs):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return None
+        span['end_ms'] = self._offset_ms()
+        span['duration_ms'] = round(span['end_ms'] - span['start_ms'], 1)
+        if error is not None:
+            span['error'] = _short(f"{type(error).__name__}: {error}")
+        span.update(attrs)
+        return span
+
+    # --- chains (the executor itself and the agent's runnable steps) ---
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        parent = self._parent(parent_run_id)
+        if parent is not None and parent['parent'] is not None:
+            # Prompt formatting, output parsing and the like inside an agent
+            # step: fold into the step rather than record a span each
+            self._folded[run_id] = parent
+            return
+        name = kwargs.get('name') or (serialized or {}).get('name')
+        self._start('chain', {'name': name}, run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if self._folded.pop(run_id, None) is None:
+            self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        if self._folded.pop(run_id, None) is None:
+            self._end(run_id, error=error)
+
+    # --- model calls ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start('llm', serialized, run_id, parent_run_id, input_messages=sum(len(batch) for batch in messages))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start('llm', serialized, run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {'input_tokens': 0, 'output_tokens': 0}
+        tool_calls = []
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, 'message', None)
+                for key, value in (getattr(message, 'usage_metadata', None) or {}).items():
+                    if key in usage:
+                        usage[key] += value
+                tool_calls.extend(call['name'] for call in getattr(message, 'tool_calls', None) or [])
+        self._end(run_id, tool_calls=tool_calls, **usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # --- tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start('tool', serialized, run_id, parent_run_id, input=_short(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def duration_ms(self):
+        end = self.finished_at or time.perf_counter()
+        return int((end - self._started) * 1000)
+
+    @property
+    def attempts(self):
+        return max((span.get('attempt', 0) for span in self.spans), default=0) or 1
+
+    @property
+    def failed(self):
+        roots = [span for span in self.spans if span['parent'] is None]
+        return not roots or 'error' in roots[-1]
+
+
+def should_keep(trace):
+    """Tail sampling: failures and slow runs are always kept, the rest at AI_TRACE_SAMPLE_RATE."""
+    if trace.failed or trace.duration_ms >= settings.AI_TRACE_SLOW_MS:
+        return True
+    return random.random() < settings.AI_TRACE_SAMPLE_RATE
+
+
+def save_trace(trace, user, plan, message_index=None):
+    """Store `trace` if it is sampled. Returns the AgentTrace or None."""
+    trace.finish()
+    if not should_keep(trace):
+        return None
+    return AgentTrace.objects.create(
+        user=user,
+        plan=plan,
+        message_index=message_index,
+        request_id=trace.request_id,
+        duration_ms=trace.duration_ms,
+        attempts=trace.attempts,
+        failed=trace.failed,
+        spans=trace.spans,
+    )
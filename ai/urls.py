@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import get_usage
+
+urlpatterns = [
+    path('', get_usage, name='get_usage'),
+]
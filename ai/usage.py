@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .models import TokenUsage, DailyTokenUsage
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Collects token counts across every LLM and tool call of one agent run."""
+
+    run_inline = True  # counters only: fine to call on the event loop
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_call_tokens = 0
+        self.tool_calls = 0
+        self.llm_calls = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, 'message', None)
+                usage = getattr(message, 'usage_metadata', None) or {}
+                self.prompt_tokens += usage.get('input_tokens', 0)
+                # Output of a planning step that only asks for a tool is billed separately
+                if getattr(message, 'tool_calls', None):
+                    self.tool_call_tokens += usage.get('output_tokens', 0)
+                else:
+                    self.completion_tokens += usage.get('output_tokens', 0)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.tool_calls += 1
+
+    def fork(self):
+        """A fresh instance for one attempt of a hedged call (ai.router); merge() the winner's back."""
+        return type(self)()
+
+    def merge(self, other):
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.tool_call_tokens += other.tool_call_tokens
+        self.tool_calls += other.tool_calls
+        self.llm_calls += other.llm_calls
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens + self.tool_call_tokens
+
+
+def record_usage(user, plan, message_index, usage, latency_ms=0):
+    """Store one run's usage and add it to the user's rollup for today."""
+    counts = {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'tool_call_tokens': usage.tool_call_tokens,
+        'tool_calls': usage.tool_calls,
+    }
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        TokenUsage.objects.create(
+            user=user,
+            plan=plan,
+            message_index=message_index,
+            llm_calls=usage.llm_calls,
+            latency_ms=latency_ms,
+            **counts,
+        )
+
+        increments = {field: F(field) + value for field, value in counts.items()}
+        increments['runs'] = F('runs') + 1
+        if DailyTokenUsage.objects.filter(user=user, date=today).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                DailyTokenUsage.objects.create(user=user, date=today, runs=1, **counts)
+        except IntegrityError:
+            # Another request created today's row first
+            DailyTokenUsage.objects.filter(user=user, date=today).update(**increments)
+
+
+def get_daily_quota(account_type):
+    """Daily token allowance for an account type; None means unlimited."""
+    quota = settings.AI_DAILY_TOKEN_QUOTAS.get(account_type.lower())
+    return quota or None
+
+
+def get_tokens_used_today(user):
+    row = (
+        DailyTokenUsage.objects
+        .filter(user=user, date=timezone.localdate())
+        .values('prompt_tokens', 'completion_tokens', 'tool_call_tokens')
+        .first()
+    )
+    return sum(row.values()) if row else 0
+
+
+def has_remaining_quota(user):
+    quota = get_daily_quota(user.account_type)
+    if quota is None:
+        return True
+    return get_tokens_used_today(user) < quota
+
+
+def get_plan_usage(plan):
+    return TokenUsage.objects.filter(plan=plan).aggregate(
+        prompt_tokens=Sum('prompt_tokens'),
+        completion_tokens=Sum('completion_tokens'),
+        tool_call_tokens=Sum('tool_call_tokens'),
+        tool_calls=Sum('tool_calls'),
+    )
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from utils.queries import query_budget
+
+from .models import AgentTrace, DailyTokenUsage
+from .serializers import AgentTraceSerializer, DailyTokenUsageSerializer
+from .usage import get_daily_quota
+
+
+# --- GET /api/usage/ ---
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_usage(request):
+    user = request.user
+    today = timezone.localdate()
+
+    try:
+        days = min(max(int(request.query_params.get('days', 7)), 1), 90)
+    except ValueError:
+        days = 7
+
+    history = DailyTokenUsage.objects.filter(
+        user=user,
+        date__gt=today - timedelta(days=days),
+    ).order_by('-date')
+
+    used_today = next((row.total_tokens for row in history if row.date == today), 0)
+    account_type = user.account_type
+    quota = get_daily_quota(account_type)
+
+    return Response({
+        "date": today,
+        "account_type": account_type,
+        "daily_quota": quota,
+        "used_today": used_today,
+        "remaining_today": max(quota - used_today, 0) if quota is not None else None,
+        "history": DailyTokenUsageSerializer(history, many=True).data,
+    })
+
+
+# --- GET /api/chats/{chat_id}/messages/{message_index}/traces/ (staff only) ---
+# Sampled span trees for the run that produced an assistant message. Failed
+# runs have no message index and are listed with ?failed=1.
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_message_traces(request, chat_id, message_index):
+    traces = AgentTrace.objects.filter(plan_id=chat_id).order_by('-created_at')
+    if request.query_params.get('failed') == '1':
+        traces = traces.filter(failed=True)
+    else:
+        traces = traces.filter(message_index=message_index)
+    return Response(AgentTraceSerializer(traces[:20], many=True).data)
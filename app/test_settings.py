@@ -0,0 +1,20 @@
+"""
+Settings for the test suite. `manage.py test` uses them by default; with
+another runner, set DJANGO_SETTINGS_MODULE=app.test_settings.
+"""
+import os
+
+# Read while app.settings loads: tests never reach the real services
+os.environ.setdefault('OFFLINE_MODE', 'true')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import DATABASES, DB_REPLICAS, env  # noqa: E402
+
+# A view running more queries than its @query_budget fails the test
+QUERY_BUDGET_STRICT = env.bool('QUERY_BUDGET_STRICT', default=True)
+
+# Two mirrors of default for the routing tests (utils/tests.py), which turn
+# them on with override_settings(DB_REPLICAS=...)
+if not DB_REPLICAS:
+    for alias in ('replica1', 'replica2'):
+        DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
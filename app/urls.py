@@ -3,12 +3,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from utils.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
     path('api/chats/', include('plans.urls')),
     path('api/classes/', include('classes.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/usage/', include('ai.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
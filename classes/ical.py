@@ -0,0 +1,80 @@
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+
+FEED_SALT = 'classes.calendar-feed'
+
+
+def make_feed_token(user):
+    return signing.dumps({'u': user.id, 'v': user.calendar_feed_version}, salt=FEED_SALT, compress=True)
+
+
+def read_feed_token(token):
+    """Return (user id, feed version) for a feed token, or None if it is invalid."""
+    try:
+        payload = signing.loads(token, salt=FEED_SALT)
+        # Tokens from before feed versions were introduced are version 0
+        return payload['u'], payload.get('v', 0)
+    except (signing.BadSignature, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _escape(text):
+    return (
+        str(text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _timestamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def iter_calendar(rows, domain):
+    """
+    Yield an iCalendar document line by line for saved-class rows (dicts
+    with id, plan_title, notes, pinned_date, updated_at), so the feed never has
+    to be built in memory.
+    """
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//GamePlan//Saved Classes//EN\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield 'X-WR-CALNAME:GamePlan classes\r\n'
+
+    for row in rows:
+        yield (
+            'BEGIN:VEVENT\r\n'
+            + _fold(f"UID:savedclass-{row['id']}@{domain}")
+            + _fold(f"DTSTAMP:{_timestamp(row['updated_at'])}")
+            + _fold(f"DTSTART:{_timestamp(row['pinned_date'])}")
+            + 'DURATION:PT1H\r\n'
+            + _fold(f"SUMMARY:{_escape(row['plan_title'])}")
+            + (_fold(f"DESCRIPTION:{_escape(row['notes'])}") if row['notes'] else '')
+            + 'END:VEVENT\r\n'
+        )
+
+    yield 'END:VCALENDAR\r\n'
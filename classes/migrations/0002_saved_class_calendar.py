@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0001_initial'),
+        ('plans', '0003_plan_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedclass',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='savedclass',
+            index=models.Index(fields=['user', 'pinned_date'], name='saved_class_user_pinned_idx'),
+        ),
+    ]
@@ -10,9 +10,13 @@ class SavedClass(models.Model):
     pinned_date = models.DateTimeField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'django"."saved_class'
+        indexes = [
+            models.Index(fields=['user', 'pinned_date'], name='saved_class_user_pinned_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.email}"
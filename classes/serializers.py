@@ -1,6 +1,21 @@
+from datetime import datetime, time, timedelta
+
+from django.utils.dateparse import parse_date
+from django.utils.timezone import make_aware
 from rest_framework import serializers
 from .models import SavedClass
 
+
+def with_plan_title(queryset):
+    """
+    Join the plan for SavedClassSerializer.get_title, without one query per
+    row and without loading the plan's conversation.
+    """
+    return queryset.select_related('plan').only(
+        'id', 'notes', 'pinned_date', 'created_at', 'plan', 'plan__title',
+    )
+
+
 class SavedClassSerializer(serializers.ModelSerializer):
     title = serializers.SerializerMethodField()
 
@@ -15,3 +30,52 @@ class SavedClassSerializer(serializers.ModelSerializer):
 class SetTitleSerializer(serializers.Serializer):
     plan_id = serializers.IntegerField()
     title = serializers.CharField()
+
+
+class PinToCalendarSerializer(serializers.Serializer):
+    class_id = serializers.IntegerField()
+    pinned_date = serializers.DateTimeField(allow_null=True)  # null unpins
+
+
+class CalendarRangeSerializer(serializers.Serializer):
+    # Accepts dates ("2025-08-01") as well as full ISO datetimes. A bare date
+    # as `date_to` covers that whole day: it comes back as `date_before`, the
+    # next midnight, to be compared with < rather than <=.
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("'from' must be before 'to'.")
+        day = parse_date(self.initial_data['date_to']) if 'date_to' in data else None
+        if day is not None:
+            del data['date_to']
+            data['date_before'] = make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        return data
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    REQUIRED_FIELDS = {
+        'retitle': ['plan_id', 'title'],
+        'save': ['plan_id'],
+        'pin': ['class_id', 'pinned_date'],
+        'unpin': ['class_id'],
+        'delete': ['plan_id'],
+    }
+
+    op = serializers.ChoiceField(choices=list(REQUIRED_FIELDS))
+    plan_id = serializers.IntegerField(required=False)
+    class_id = serializers.IntegerField(required=False)
+    title = serializers.CharField(required=False, max_length=255)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    pinned_date = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        missing = [field for field in self.REQUIRED_FIELDS[data['op']] if field not in data]
+        if missing:
+            raise serializers.ValidationError(f"'{data['op']}' requires: {', '.join(missing)}.")
+        return data
+
+
+class BatchMutationSerializer(serializers.Serializer):
+    operations = BatchOperationSerializer(many=True, allow_empty=False, max_length=200)
@@ -0,0 +1,132 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+from rest_framework.test import APIClient
+
+from plans.models import Plan, PlanSearchIndex
+from utils.testing import QueryBudgetTestCase, asgi_get
+from .models import SavedClass
+
+
+class CalendarTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pin(self, title, pinned_date):
+        plan = Plan.objects.create(user=self.user, title=title)
+        return SavedClass.objects.create(user=self.user, plan=plan, title=title, pinned_date=pinned_date)
+
+    def titles(self, query):
+        response = self.client.get(f'/api/classes/calendar/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.json()['results']]
+
+    def test_date_only_to_covers_the_whole_day(self):
+        self.pin("Morning", make_aware(datetime(2025, 8, 31, 0, 0)))
+        self.pin("Evening", make_aware(datetime(2025, 8, 31, 18, 30)))
+        self.pin("Next day", make_aware(datetime(2025, 9, 1, 0, 0)))
+
+        self.assertEqual(self.titles('from=2025-08-31&to=2025-08-31'), ["Morning", "Evening"])
+        self.assertEqual(self.titles('to=2025-08-31T18:00:00'), ["Morning"])
+
+    def test_from_after_to_is_rejected(self):
+        response = self.client.get('/api/classes/calendar/?from=2025-09-01&to=2025-08-31')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rotating_the_feed_revokes_old_urls(self):
+        self.pin("Evening", make_aware(datetime(2025, 8, 31, 18, 30)))
+        old_url = self.client.get('/api/classes/calendar/feed/').json()['url']
+        feed = self.client.get(old_url)
+        self.assertEqual(feed.status_code, 200)
+        self.assertIn("SUMMARY:Evening", b''.join(feed.streaming_content).decode())
+
+        new_url = self.client.post('/api/classes/calendar/feed/').json()['url']
+        self.assertNotEqual(new_url, old_url)
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+    def test_feed_streams_under_asgi(self):
+        self.pin("Evening", make_aware(datetime(2025, 8, 31, 18, 30)))
+        url = self.client.get('/api/classes/calendar/feed/').json()['url']
+        response, body = asgi_get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(body, b''.join(self.client.get(url).streaming_content))
+        self.assertIn("SUMMARY:Evening", body.decode())
+
+    def test_tampered_feed_token_is_not_found(self):
+        url = self.client.get('/api/classes/calendar/feed/').json()['url']
+        self.assertEqual(self.client.get(url.replace('.ics', 'x.ics')).status_code, 404)
+
+
+class BatchMutationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def saved_plans(self, count):
+        plans = []
+        for index in range(count):
+            plan = Plan.objects.create(user=self.user, title=f"Session {index}", is_saved=True)
+            SavedClass.objects.create(user=self.user, plan=plan, title=plan.title, notes=f"notes {index}")
+            plans.append(plan)
+        return plans
+
+    def delete_queries(self, plans):
+        operations = [{'op': 'delete', 'plan_id': plan.id} for plan in plans]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/classes/batch/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['succeeded'], len(plans))
+        return len(queries)
+
+    def test_delete_runs_a_constant_number_of_queries(self):
+        one = self.delete_queries(self.saved_plans(1))
+        many = self.delete_queries(self.saved_plans(20))
+        self.assertEqual(one, many)
+        self.assertFalse(Plan.objects.filter(user=self.user).exists())
+        self.assertFalse(SavedClass.objects.filter(user=self.user).exists())
+        self.assertFalse(PlanSearchIndex.objects.filter(user=self.user).exists())
+
+    def test_deleting_only_the_class_clears_its_notes(self):
+        plan = self.saved_plans(1)[0]
+        self.assertEqual(PlanSearchIndex.objects.get(plan=plan).notes, "notes 0")
+        SavedClass.objects.filter(plan=plan).delete()
+        self.assertEqual(PlanSearchIndex.objects.get(plan=plan).notes, "")
+
+
+class ClassesBudgetTests(QueryBudgetTestCase):
+    def saved_plan(self, index, pinned_date=None):
+        plan = Plan.objects.create(user=self.user, title=f"Session {index}", is_saved=True)
+        saved_class = SavedClass.objects.create(user=self.user, plan=plan, title=plan.title, pinned_date=pinned_date)
+        return plan, saved_class
+
+    def test_calendar(self):
+        for index in range(8):
+            self.saved_plan(index, make_aware(datetime(2025, 8, 1 + index, 18, 0)))
+        self.assertWithinBudget('get', '/api/classes/calendar/?from=2025-08-01&to=2025-08-31', status=200)
+        self.assertWithinBudget('get', '/api/classes/saved/', status=200)
+        url = self.assertWithinBudget('get', '/api/classes/calendar/feed/', status=200).json()['url']
+        self.assertWithinBudget('post', '/api/classes/calendar/feed/', status=200)
+        url = self.assertWithinBudget('get', '/api/classes/calendar/feed/', status=200).json()['url']
+        self.assertWithinBudget('get', url, status=200)
+
+    def test_batch(self):
+        unsaved = [Plan.objects.create(user=self.user, title=f"Draft {index}") for index in range(5)]
+        saved = [self.saved_plan(index) for index in range(5)]
+        operations = (
+            [{'op': 'retitle', 'plan_id': plan.id, 'title': 'Renamed'} for plan in unsaved]
+            + [{'op': 'save', 'plan_id': plan.id, 'notes': 'keep'} for plan in unsaved]
+            + [{'op': 'pin', 'class_id': saved_class.id, 'pinned_date': '2025-08-31T18:00:00Z'} for _, saved_class in saved]
+            + [{'op': 'unpin', 'class_id': saved_class.id} for _, saved_class in saved[:2]]
+            + [{'op': 'delete', 'plan_id': plan.id} for plan, _ in saved[2:]]
+        )
+        response = self.assertWithinBudget('post', '/api/classes/batch/', {'operations': operations}, status=200)
+        self.assertEqual(response.json()['failed'], 0)
@@ -6,6 +6,9 @@ from .views import (
     CreateManualClassView,
     PinnedCalendarView,
     PinToCalendarView,
+    CalendarFeedView,
+    calendar_ics_feed,
+    BatchMutationView,
 )
 
 urlpatterns = [
@@ -14,5 +17,8 @@ urlpatterns = [
     path('saved/', SavedClassListView.as_view()),
     path('create/', CreateManualClassView.as_view()),
     path('calendar/', PinnedCalendarView.as_view()),
+    path('calendar/feed/', CalendarFeedView.as_view()),
+    path('calendar/<str:token>.ics', calendar_ics_feed, name='calendar-ics-feed'),
     path('pin/', PinToCalendarView.as_view()),
+    path('batch/', BatchMutationView.as_view()),
 ]
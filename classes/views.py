@@ -3,13 +3,32 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.timezone import now
+from django.views.decorators.http import condition, require_GET
 
 from plans.models import Plan
+from users.models import User
+from plans.search import update_indexed_text
+from utils.queries import query_budget
+from utils.streaming import streaming_content
 from .models import SavedClass
-from .serializers import SetTitleSerializer, SavedClassSerializer
+from .ical import iter_calendar, make_feed_token, read_feed_token
+from .serializers import (
+    SetTitleSerializer,
+    SavedClassSerializer,
+    with_plan_title,
+    PinToCalendarSerializer,
+    CalendarRangeSerializer,
+    BatchMutationSerializer,
+)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def set_title(request):
@@ -21,13 +40,14 @@ def set_title(request):
         try:
             plan = Plan.objects.get(id=plan_id, user=request.user)
             plan.title = title
-            plan.save()
+            plan.save(update_fields=['title', 'updated_at'])
             return Response({'message': 'Title updated successfully'})
         except Plan.DoesNotExist:
             return Response({'error': 'Plan not found'}, status=status.HTTP_404_NOT_FOUND)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(post=7)
 class SaveClassView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -48,7 +68,7 @@ class SaveClassView(APIView):
                 notes=notes
             )
             plan.is_saved = True
-            plan.save()
+            plan.save(update_fields=['is_saved', 'updated_at'])
 
             serializer = SavedClassSerializer(saved_class)
             return Response(serializer.data, status=201)
@@ -57,14 +77,7 @@ class SaveClassView(APIView):
             return Response({'detail': 'Plan not found.'}, status=404)
 
 
-class SavedClassListView(generics.ListAPIView):
-    serializer_class = SavedClassSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        return SavedClass.objects.filter(user=self.request.user).order_by('-created_at')
-
-
+@query_budget(post=8)
 class CreateManualClassView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -97,25 +110,275 @@ class CreateManualClassView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+def _pinned_classes(request):
+    """Pinned classes for the user, bounded by the optional ?from= / ?to= range."""
+    params = {}
+    if request.query_params.get('from'):
+        params['date_from'] = request.query_params['from']
+    if request.query_params.get('to'):
+        params['date_to'] = request.query_params['to']
+
+    serializer = CalendarRangeSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    date_range = serializer.validated_data
+
+    queryset = SavedClass.objects.filter(user=request.user, pinned_date__isnull=False)
+    if 'date_from' in date_range:
+        queryset = queryset.filter(pinned_date__gte=date_range['date_from'])
+    if 'date_to' in date_range:
+        queryset = queryset.filter(pinned_date__lte=date_range['date_to'])
+    if 'date_before' in date_range:
+        queryset = queryset.filter(pinned_date__lt=date_range['date_before'])
+    return queryset
+
+
+def _collection_state(request, queryset):
+    # Computed once per request and shared by the ETag and Last-Modified checks
+    if not hasattr(request, '_collection_state'):
+        request._collection_state = queryset.aggregate(
+            count=Count('id'),
+            class_modified=Max('updated_at'),
+            plan_modified=Max('plan__updated_at'),  # titles come from the plan
+        )
+    return request._collection_state
+
+
+def _collection_last_modified(state):
+    stamps = [stamp for stamp in (state['class_modified'], state['plan_modified']) if stamp]
+    return max(stamps) if stamps else None
+
+
+def _collection_etag(prefix, request, state):
+    last_modified = _collection_last_modified(state)
+    return "{}-{}-{}-{}".format(
+        prefix,
+        state['count'],
+        last_modified.timestamp() if last_modified else 0,
+        request.META.get('QUERY_STRING', ''),
+    )
+
+
+def calendar_last_modified(request, *args, **kwargs):
+    return _collection_last_modified(_collection_state(request, _pinned_classes(request)))
+
+
+def calendar_etag(request, *args, **kwargs):
+    return _collection_etag('cal', request, _collection_state(request, _pinned_classes(request)))
+
+
+def saved_classes_last_modified(request, *args, **kwargs):
+    return _collection_last_modified(_collection_state(request, SavedClass.objects.filter(user=request.user)))
+
+
+def saved_classes_etag(request, *args, **kwargs):
+    return _collection_etag('saved', request, _collection_state(request, SavedClass.objects.filter(user=request.user)))
+
+
+@query_budget(get=4)
+@method_decorator(condition(etag_func=saved_classes_etag, last_modified_func=saved_classes_last_modified), name='get')
+class SavedClassListView(generics.ListAPIView):
+    serializer_class = SavedClassSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return with_plan_title(SavedClass.objects.filter(user=self.request.user)).order_by('-created_at')
+
+
+@query_budget(get=4)
+@method_decorator(condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified), name='get')
 class PinnedCalendarView(generics.ListAPIView):
     serializer_class = SavedClassSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return SavedClass.objects.filter(user=self.request.user, pinned_date__isnull=False)
+        return with_plan_title(_pinned_classes(self.request)).order_by('pinned_date', 'id')
 
 
+@query_budget(post=3)
 class PinToCalendarView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        class_id = request.data.get('class_id')
-        date_str = request.data.get('pinned_date')
+        serializer = PinToCalendarSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            saved_class = SavedClass.objects.get(id=class_id, user=request.user)
-            saved_class.pinned_date = date_str
-            saved_class.save()
+            saved_class = SavedClass.objects.get(id=serializer.validated_data['class_id'], user=request.user)
+            saved_class.pinned_date = serializer.validated_data['pinned_date']
+            saved_class.save(update_fields=['pinned_date', 'updated_at'])
+            if saved_class.pinned_date is None:
+                return Response({'detail': 'Removed from calendar.'})
             return Response({'detail': 'Pinned to calendar.'})
         except SavedClass.DoesNotExist:
             return Response({'detail': 'Class not found.'}, status=404)
+
+
+@query_budget(get=1, post=3)
+class CalendarFeedView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def _url(self, request):
+        token = make_feed_token(request.user)
+        return request.build_absolute_uri(reverse('calendar-ics-feed', args=[token]))
+
+    def get(self, request):
+        return Response({'url': self._url(request)})
+
+    def post(self, request):
+        """Revoke every feed URL handed out so far and return a new one."""
+        user = request.user
+        User.objects.filter(pk=user.pk).update(calendar_feed_version=F('calendar_feed_version') + 1)
+        user.refresh_from_db(fields=['calendar_feed_version'])
+        return Response({'url': self._url(request)})
+
+
+# --- GET /api/classes/calendar/<token>.ics ---
+# Calendar apps can't send a Bearer token, so the feed is authorized by a
+# signed token in the URL instead. The token carries the user's feed
+# version, so POST calendar/feed/ revokes it.
+@query_budget(2)
+@require_GET
+def calendar_ics_feed(request, token):
+    claims = read_feed_token(token)
+    if claims is None:
+        raise Http404("Calendar feed not found.")
+    user_id, version = claims
+    if not User.objects.filter(pk=user_id, calendar_feed_version=version).exists():
+        raise Http404("Calendar feed not found.")
+
+    rows = (
+        SavedClass.objects
+        .filter(user_id=user_id, pinned_date__isnull=False)
+        .order_by('pinned_date', 'id')
+        .values('id', 'notes', 'pinned_date', 'updated_at', plan_title=F('plan__title'))
+        .iterator(chunk_size=500)
+    )
+    response = StreamingHttpResponse(
+        streaming_content(request, iter_calendar(rows, request.get_host())),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="gameplan.ics"'
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+@query_budget(post=24)
+class BatchMutationView(APIView):
+    """
+    Apply a list of retitle / save / pin / unpin / delete operations in one
+    transaction with a fixed number of bulk queries, whatever the batch size.
+
+    Operations are grouped by kind and applied in that order (retitle, save,
+    pin/unpin, delete); for repeated operations on the same object the last
+    one wins. Failures (unknown ids, already saved) are reported per item
+    and don't prevent the other operations from being applied.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchMutationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        operations = serializer.validated_data['operations']
+        results = [{'index': i, 'op': op['op'], 'status': 'ok'} for i, op in enumerate(operations)]
+
+        def fail(i, detail):
+            results[i]['status'] = 'error'
+            results[i]['detail'] = detail
+
+        plan_ids = {op['plan_id'] for op in operations if 'plan_id' in op}
+        class_ids = {op['class_id'] for op in operations if 'class_id' in op}
+        timestamp = now()
+
+        with transaction.atomic():
+            plans = Plan.objects.select_for_update().filter(
+                user=request.user, id__in=plan_ids
+            ).only('id', 'user_id', 'title', 'is_saved').in_bulk() if plan_ids else {}
+            saved_classes = SavedClass.objects.select_for_update().filter(
+                user=request.user, id__in=class_ids
+            ).in_bulk() if class_ids else {}
+
+            changed_plans = {}
+            new_classes = {}
+            changed_classes = {}
+            deleted_plan_ids = set()
+
+            for i, op in enumerate(operations):
+                if op['op'] == 'retitle':
+                    plan = plans.get(op['plan_id'])
+                    if not plan:
+                        fail(i, 'Plan not found.')
+                        continue
+                    plan.title = op['title']
+                    plan.updated_at = timestamp
+                    changed_plans[plan.id] = plan
+
+            for i, op in enumerate(operations):
+                if op['op'] == 'save':
+                    plan = plans.get(op['plan_id'])
+                    if not plan:
+                        fail(i, 'Plan not found.')
+                        continue
+                    if plan.is_saved:
+                        fail(i, 'Already saved.')
+                        continue
+                    plan.is_saved = True
+                    plan.updated_at = timestamp
+                    changed_plans[plan.id] = plan
+                    new_classes[i] = SavedClass(
+                        user=request.user,
+                        plan=plan,
+                        title=op.get('title', 'Untitled Class'),
+                        notes=op.get('notes', ''),
+                    )
+
+            for i, op in enumerate(operations):
+                if op['op'] in ('pin', 'unpin'):
+                    saved_class = saved_classes.get(op['class_id'])
+                    if not saved_class:
+                        fail(i, 'Class not found.')
+                        continue
+                    saved_class.pinned_date = op['pinned_date'] if op['op'] == 'pin' else None
+                    saved_class.updated_at = timestamp
+                    changed_classes[saved_class.id] = saved_class
+
+            for i, op in enumerate(operations):
+                if op['op'] == 'delete':
+                    if op['plan_id'] not in plans:
+                        fail(i, 'Plan not found.')
+                        continue
+                    deleted_plan_ids.add(op['plan_id'])
+
+            # Nothing to update on rows that are about to be deleted
+            for plan_id in deleted_plan_ids:
+                changed_plans.pop(plan_id, None)
+
+            if changed_plans:
+                Plan.objects.bulk_update(changed_plans.values(), ['title', 'is_saved', 'updated_at'])
+            if new_classes:
+                SavedClass.objects.bulk_create(new_classes.values())
+                for i, saved_class in new_classes.items():
+                    results[i]['class_id'] = saved_class.id
+            if changed_classes:
+                SavedClass.objects.bulk_update(changed_classes.values(), ['pinned_date', 'updated_at'])
+            if deleted_plan_ids:
+                # Classes and search index rows cascade; SavedClass's post_delete
+                # receiver leaves the index alone when the plan goes too
+                Plan.objects.filter(id__in=deleted_plan_ids).only('id').delete()
+
+            # Bulk writes skip the post_save signals that maintain the search index
+            update_indexed_text('title', {plan.id: plan.title for plan in changed_plans.values()})
+            update_indexed_text('notes', {
+                saved_class.plan_id: saved_class.notes
+                for saved_class in new_classes.values()
+                if saved_class.plan_id not in deleted_plan_ids
+            })
+
+        failed = sum(result['status'] == 'error' for result in results)
+        return Response({
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed,
+        })
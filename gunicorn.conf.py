@@ -0,0 +1,40 @@
+"""
+gunicorn settings: gunicorn app.wsgi (this file is picked up automatically).
+
+The app is loaded in the master before forking, so Django, LangChain, the
+prompts and the agent are imported and built once and shared copy-on-write
+by all workers. What can't cross a fork (database connections and pools, the
+model APIs' gRPC channels) is closed in the master and rebuilt in each worker.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))  # agent runs with retries can take a while
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before the first fork.
+    # Resolving the URLconf imports every view, and with them ai.agent.
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
+    # A pool's background threads don't survive fork either: workers open their own
+    for connection in connections.all():
+        if getattr(connection, 'pool', None):
+            connection.close_pool()
+
+
+def post_fork(server, worker):
+    from ai.pool import post_fork as rebuild_agent_clients
+
+    rebuild_agent_clients()
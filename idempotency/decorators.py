@@ -0,0 +1,251 @@
+"""
+Idempotency-Key support for POST endpoints that clients retry.
+
+    @query_budget(18)
+    @async_api_view(['POST'])
+    @permission_classes([IsAuthenticated])
+    @idempotent
+    async def send_message_to_chat(request, chat_id): ...
+
+    @method_decorator(idempotent)
+    def post(self, request): ...
+
+Goes directly on the handler (below @permission_classes), so it runs after
+authentication. Requests without the header are untouched. The first
+request with a key claims it in IdempotencyKey and runs. A retry with the
+same key and body gets the stored response back with an
+Idempotent-Replayed header. A retry that arrives while the first request
+is still running waits for it, polling every IDEMPOTENCY_POLL_SECONDS for
+up to IDEMPOTENCY_WAIT_SECONDS, and gets a 409 if it is still running by
+then. Reusing a key with a different body gets a 422.
+
+Only answers a retry should get again are stored, for
+IDEMPOTENCY_KEY_TTL_HOURS: 2xx, and the 400, 404 and 422 the same request
+would get again. On anything else (a 403 or 429 that may pass later, an
+upstream failure, any 5xx) or when the view raises, the key is released so
+the client can retry for real. A claim whose request died without
+finishing is taken over after IDEMPOTENCY_LOCK_SECONDS.
+"""
+import asyncio
+import hashlib
+import inspect
+import time
+from datetime import timedelta
+from functools import wraps
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.metrics import IDEMPOTENT_REQUESTS
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+RUN, WAIT, DONE = 'run', 'wait', 'done'
+
+
+def fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = orjson.dumps(data, option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(b'\n'.join([request.method.encode(), request.path.encode(), body])).hexdigest()
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status, headers={'Idempotent-Replayed': 'true'})
+
+
+def _claim(user, key, request_fingerprint):
+    """
+    Claim `key` for this request or look at who has it. Returns
+    (RUN, record) when this request should run the view, (WAIT, record)
+    while another request is running it, or (DONE, response) to send as is.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    record, created = IdempotencyKey.objects.get_or_create(
+        user=user, key=key,
+        defaults={'fingerprint': request_fingerprint, 'locked_at': now, 'expires_at': expires_at},
+    )
+    if created:
+        return RUN, record
+
+    abandoned = (
+        record.response_status is None
+        and record.locked_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    )
+    if record.expires_at <= now or abandoned:
+        # Only one of several retries gets to take it over
+        taken = IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+            fingerprint=request_fingerprint, response_status=None, response_body=None,
+            locked_at=now, expires_at=expires_at,
+        )
+        if taken:
+            record.fingerprint, record.locked_at, record.expires_at = request_fingerprint, now, expires_at
+            record.response_status = record.response_body = None
+            return RUN, record
+        return WAIT, record
+
+    if record.fingerprint != request_fingerprint:
+        return DONE, Response(
+            {"error": f"This {HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.response_status is not None:
+        return DONE, _replay(record)
+    return WAIT, record
+
+
+# Client errors the same request would get again; other 4xx may pass on a retry
+REPLAYABLE_ERRORS = {
+    status.HTTP_400_BAD_REQUEST,
+    status.HTTP_404_NOT_FOUND,
+    status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+
+def _replayable(response):
+    if not isinstance(response, Response):
+        return False
+    return status.is_success(response.status_code) or response.status_code in REPLAYABLE_ERRORS
+
+
+def _finish(record, response):
+    """Store the response for retries, or release the key if a retry could get a different one."""
+    # Filtering on locked_at leaves the key alone if another request took it over
+    claim = IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at)
+    if _replayable(response):
+        claim.update(response_status=response.status_code, response_body=response.data)
+    else:
+        claim.delete()
+
+
+def _release(record):
+    IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at).delete()
+
+
+def _timed_out():
+    return Response(
+        {"error": f"A request with this {HEADER} is still in progress. Retry later."},
+        status=status.HTTP_409_CONFLICT,
+        headers={'Retry-After': str(max(1, round(settings.IDEMPOTENCY_POLL_SECONDS)))},
+    )
+
+
+def _bad_key(key):
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def _outcome(response, waited):
+    if 'Idempotent-Replayed' not in response.headers:
+        return 'rejected'
+    return 'waited' if waited else 'replayed'
+
+
+def _record_outcome(request, outcome):
+    IDEMPOTENT_REQUESTS.inc(outcome=outcome)
+    # The queries of a replay are key lookups, not the view's: no query budget
+    request._request.idempotent_replay = outcome != 'new'
+
+
+class _Claim:
+    """
+    One request's go at a key. attempt() (sync, it queries) returns RUN once
+    the key is claimed, WAIT while another request has it (poll again after
+    IDEMPOTENCY_POLL_SECONDS), or the response to send instead of running
+    the view: a replay, a 422, or a 409 once the wait is over. After the
+    view, finish() stores or releases the key; release() if it raised.
+    """
+
+    def __init__(self, request, key):
+        self.request = request
+        self.key = key
+        self.fingerprint = None
+        self.record = None
+        self.deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        self.waited = False
+
+    def attempt(self):
+        if self.fingerprint is None:
+            self.fingerprint = fingerprint(self.request)
+        state, result = _claim(self.request.user, self.key, self.fingerprint)
+        if state == DONE:
+            _record_outcome(self.request, _outcome(result, self.waited))
+            return result
+        if state == RUN:
+            self.record = result
+            _record_outcome(self.request, 'new')
+            return RUN
+        if time.monotonic() >= self.deadline:
+            _record_outcome(self.request, 'timed_out')
+            return _timed_out()
+        self.waited = True
+        return WAIT
+
+    def finish(self, response):
+        _finish(self.record, response)
+
+    def release(self):
+        _release(self.record)
+
+
+def idempotent(view):
+    """Honour an Idempotency-Key header on `view` (a DRF handler, sync or async)."""
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return await view(request, *args, **kwargs)
+            bad = _bad_key(key)
+            if bad is not None:
+                return bad
+
+            claim = _Claim(request, key)
+            while (step := await sync_to_async(claim.attempt)()) is WAIT:
+                await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+            if step is not RUN:
+                return step
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(claim.release)()
+                raise
+            await sync_to_async(claim.finish)(response)
+            return response
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        bad = _bad_key(key)
+        if bad is not None:
+            return bad
+
+        claim = _Claim(request, key)
+        while (step := claim.attempt()) is WAIT:
+            time.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+        if step is not RUN:
+            return step
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            claim.release()
+            raise
+        claim.finish(response)
+        return response
+    return wrapper
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key a user sent, claimed by the first request that carried
+    it. response_status stays null while that request runs; afterwards the
+    response is kept until expires_at so retries get it back.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of the method, path and body
+
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+
+    locked_at = models.DateTimeField()  # when the request running it started
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'django"."idempotency_key'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),  # purge_idempotency_keys
+        ]
+
+    def __str__(self):
+        return f"{self.key} - {self.user_id}"
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from rest_framework import status
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from utils.async_views import async_api_view
+
+from .decorators import idempotent
+from .models import IdempotencyKey
+
+calls = []
+
+
+class Echo(APIView):
+    permission_classes = [IsAuthenticated]
+    # A status to answer with, or an exception to raise
+    answer = status.HTTP_201_CREATED
+
+    @method_decorator(idempotent)
+    def post(self, request):
+        calls.append(request.data)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return Response({'call': len(calls)}, status=self.answer)
+
+
+@async_api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+async def async_echo(request):
+    calls.append(request.data)
+    if isinstance(Echo.answer, Exception):
+        raise Echo.answer
+    return Response({'call': len(calls)}, status=Echo.answer)
+
+
+class IdempotentTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.factory = APIRequestFactory()
+
+    def post(self, data=None, key='key-1', view=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        request = self.factory.post('/echo/', data or {'drill': 'rondo'}, format='json', **headers)
+        force_authenticate(request, self.user)
+        if view is async_echo:
+            return async_to_sync(async_echo)(request)
+        return Echo.as_view()(request)
+
+    def in_flight(self, **fields):
+        """Turn the stored key back into the claim of a request still running."""
+        IdempotencyKey.objects.filter(key='key-1').update(response_status=None, response_body=None, **fields)
+
+    def test_retry_gets_the_stored_response(self):
+        for view in (Echo, async_echo):
+            with self.subTest(view=view):
+                calls.clear()
+                IdempotencyKey.objects.all().delete()
+                first = self.post(view=view)
+                replay = self.post(view=view)
+                self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(replay.data, first.data)
+                self.assertEqual(replay['Idempotent-Replayed'], 'true')
+                self.assertEqual(len(calls), 1)
+
+    def test_requests_without_a_key_are_untouched(self):
+        self.post(key=None)
+        self.post(key=None)
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_reused_key_with_a_different_body_is_rejected(self):
+        self.post()
+        response = self.post({'drill': 'overlap'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(len(calls), 1)
+
+    def test_retry_waits_for_the_running_request(self):
+        first = self.post()
+        self.in_flight()
+
+        def first_finishes(seconds):
+            IdempotencyKey.objects.filter(key='key-1').update(response_status=201, response_body=first.data)
+
+        with mock.patch('idempotency.decorators.time.sleep', side_effect=first_finishes) as sleep:
+            replay = self.post()
+        sleep.assert_called_once()
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_retry_gives_up_waiting_with_a_409(self):
+        self.post()
+        self.in_flight()
+        self.assertEqual(self.post().status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(calls), 1)
+
+    def test_abandoned_claim_is_taken_over(self):
+        self.post()
+        self.in_flight(locked_at=timezone.now() - timedelta(hours=1))
+        response = self.post()
+        self.assertEqual(response.data, {'call': 2})
+        self.assertEqual(IdempotencyKey.objects.get(key='key-1').response_body, {'call': 2})
+
+    def test_only_answers_worth_replaying_are_stored(self):
+        for answer, stored in (
+            (status.HTTP_200_OK, True),
+            (status.HTTP_400_BAD_REQUEST, True),
+            (status.HTTP_404_NOT_FOUND, True),
+            (status.HTTP_403_FORBIDDEN, False),
+            (status.HTTP_429_TOO_MANY_REQUESTS, False),
+            (status.HTTP_500_INTERNAL_SERVER_ERROR, False),
+            (status.HTTP_503_SERVICE_UNAVAILABLE, False),
+        ):
+            with self.subTest(answer=answer), mock.patch.object(Echo, 'answer', answer):
+                self.post(key=f'key-{answer}')
+                self.assertEqual(IdempotencyKey.objects.filter(key=f'key-{answer}').exists(), stored)
+
+    def test_released_key_runs_the_retry(self):
+        for view in (Echo, async_echo):
+            with self.subTest(view=view):
+                calls.clear()
+                with mock.patch.object(Echo, 'answer', status.HTTP_502_BAD_GATEWAY):
+                    self.post(view=view)
+                self.assertEqual(self.post(view=view).data, {'call': 2})
+
+    def test_view_raising_releases_the_key(self):
+        for view in (Echo, async_echo):
+            with self.subTest(view=view):
+                IdempotencyKey.objects.all().delete()
+                with mock.patch.object(Echo, 'answer', RuntimeError("boom")), self.assertRaises(RuntimeError):
+                    self.post(view=view)
+                self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class PurgeTests(TestCase):
+    def test_purge_deletes_only_expired_keys(self):
+        user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        now = timezone.now()
+        for index in range(3):
+            IdempotencyKey.objects.create(
+                user=user, key=f'old-{index}', fingerprint='x', locked_at=now, expires_at=now - timedelta(minutes=1),
+            )
+        IdempotencyKey.objects.create(user=user, key='live', fingerprint='x', locked_at=now, expires_at=now + timedelta(hours=1))
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', chunk_size=2, stdout=out)
+        self.assertIn("Deleted 3 expired", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
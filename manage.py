@@ -3,7 +3,9 @@ import os
 import sys
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    # The test suite has its own settings; other runners point DJANGO_SETTINGS_MODULE at them
+    default_settings = 'app.test_settings' if sys.argv[1:2] == ['test'] else 'app.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
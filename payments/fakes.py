@@ -0,0 +1,115 @@
+"""
+In-memory stand-in for the parts of the stripe module the payments views
+use, for OFFLINE_MODE. Imported as `stripe` by payments/stripe_client.py.
+"""
+import itertools
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import stripe as _stripe
+from django.conf import settings
+
+from utils.fakes import simulate_call
+
+error = _stripe.error
+api_key = None
+
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_customers = {}
+_subscriptions = {}
+
+
+class StripeObject(dict):
+    """dict with attribute access, like stripe.StripeObject."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _call():
+    simulate_call('stripe', lambda: error.APIConnectionError("Injected offline Stripe failure"))
+
+
+def _new_id(prefix):
+    return f"{prefix}_offline_{next(_ids)}"
+
+
+def _subscription(subscription_id, price_id=None):
+    period_end = int(time.time()) + 30 * 24 * 3600
+    return StripeObject(
+        id=subscription_id,
+        object='subscription',
+        status='active',
+        current_period_end=period_end,
+        cancel_at_period_end=False,
+        items=StripeObject(data=[StripeObject(
+            id=_new_id('si'),
+            current_period_end=period_end,
+            price=StripeObject(id=price_id or settings.STRIPE_PRICE_MONTHLY),
+        )]),
+    )
+
+
+class Customer:
+    @staticmethod
+    def create(**params):
+        _call()
+        customer = StripeObject(id=_new_id('cus'), object='customer', **params)
+        with _lock:
+            _customers[customer.id] = customer
+        return customer
+
+    @staticmethod
+    def retrieve(customer_id, **params):
+        _call()
+        with _lock:
+            return _customers.setdefault(customer_id, StripeObject(id=customer_id, object='customer'))
+
+
+class _Session:
+    @staticmethod
+    def create(**params):
+        _call()
+        session_id = _new_id('cs')
+        return StripeObject(
+            id=session_id,
+            object='checkout.session',
+            url=f"{settings.FRONTEND_DOMAIN}/offline-checkout/{session_id}",
+            **params,
+        )
+
+
+checkout = SimpleNamespace(Session=_Session)
+
+
+class Subscription:
+    @staticmethod
+    def retrieve(subscription_id, **params):
+        _call()
+        with _lock:
+            return _subscriptions.setdefault(subscription_id, _subscription(subscription_id))
+
+    @staticmethod
+    def modify(subscription_id, **params):
+        _call()
+        with _lock:
+            subscription = _subscriptions.setdefault(subscription_id, _subscription(subscription_id))
+            items = params.pop('items', None)
+            if items:
+                subscription['items']['data'][0]['price'] = StripeObject(id=items[0].get('price'))
+            params.pop('proration_behavior', None)
+            subscription.update(params)
+            return subscription
+
+
+class Webhook:
+    @staticmethod
+    def construct_event(payload, sig_header, secret):
+        # No signature to check offline: trust the local payload
+        return json.loads(payload)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:20
+
+from django.db import migrations
+
+from utils.trigram import trigram_indexes
+
+
+class Migration(migrations.Migration):
+    atomic = False  # the indexes are built CONCURRENTLY
+
+    dependencies = [
+        ('payments', '0002_subscription_plan_type'),
+    ]
+
+    operations = [
+        trigram_indexes('"django"."subscriptions"', {
+            'subscriptions_customer_trgm': 'stripe_customer_id',
+            'subscriptions_subscription_trgm': 'stripe_subscription_id',
+        }),
+    ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+
+from utils.metrics import Histogram
+
+if settings.OFFLINE_MODE:
+    from . import fakes as stripe
+else:
+    import stripe
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+STRIPE_API_SECONDS = Histogram(
+    'gameplan_stripe_api_duration_seconds',
+    'Latency of outgoing Stripe API calls by operation.',
+    ['operation'],
+)
+STRIPE_WEBHOOK_SECONDS = Histogram(
+    'gameplan_stripe_webhook_duration_seconds',
+    'Time to process a verified Stripe webhook, by event type.',
+    ['event_type'],
+)
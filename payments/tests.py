@@ -0,0 +1,55 @@
+from unittest import mock
+
+from idempotency.models import IdempotencyKey
+from utils.testing import QueryBudgetTestCase
+
+from .models import Subscription
+from .stripe_client import stripe
+
+
+class PaymentsBudgetTests(QueryBudgetTestCase):
+    def test_checkout(self):
+        # The first checkout creates the Stripe customer and the Subscription
+        first = self.assertWithinBudget('post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'}, status=200)
+        self.assertIn('checkout_url', first.json())
+        self.assertTrue(Subscription.objects.filter(user=self.user).exclude(stripe_customer_id=None).exists())
+        self.assertWithinBudget('post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'}, status=200)
+
+    def test_checkout_with_idempotency_key(self):
+        headers = {'Idempotency-Key': 'checkout-1'}
+        first = self.assertWithinBudget(
+            'post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'}, headers=headers, status=200,
+        )
+        replay = self.assertWithinBudget(
+            'post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'}, headers=headers, status=200,
+        )
+        self.assertEqual(replay.json(), first.json())
+
+    def test_stripe_failures_release_the_idempotency_key(self):
+        headers = {'Idempotency-Key': 'checkout-1'}
+        for error, expected in (
+            (stripe.error.APIConnectionError("unreachable"), 503),
+            (stripe.error.RateLimitError("slow down"), 503),
+            (stripe.error.APIError("stripe is down"), 502),
+            (RuntimeError("connection to 10.0.0.5 refused"), 500),
+        ):
+            with self.subTest(error=type(error).__name__):
+                with mock.patch.object(stripe.checkout.Session, 'create', side_effect=error):
+                    response = self.assertWithinBudget(
+                        'post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'},
+                        headers=headers, status=expected,
+                    )
+                self.assertFalse(IdempotencyKey.objects.filter(key='checkout-1').exists())
+
+        # Internal error text stays in the log
+        self.assertEqual(response.json(), {'error': "Couldn't start checkout. Please try again."})
+
+        # The retry goes through to Stripe again
+        self.assertWithinBudget(
+            'post', '/api/payments/create-checkout-session/', {'price_id': 'price_monthly'}, headers=headers, status=200,
+        )
+
+    def test_manage_subscription(self):
+        self.assertWithinBudget('get', '/api/payments/subscription/manage/', status=200)
+        Subscription.objects.create(user=self.user, stripe_customer_id='cus_1', plan='pro', is_active=True)
+        self.assertWithinBudget('get', '/api/payments/subscription/manage/', status=200)
@@ -5,7 +5,7 @@ from .models import Subscription
 def has_active_subscription_or_trial(user):
     # Check active Stripe subscription
     try:
-        subscription = Subscription.objects.get(user=user)
+        subscription = user.subscription  # cached on the user, shared with account_type
         if subscription.is_active and subscription.current_period_end and subscription.current_period_end > timezone.now():
             return True
     except Subscription.DoesNotExist:
@@ -1,10 +1,10 @@
 import os
-import stripe
 import logging
 from datetime import datetime
 
 from django.conf import settings
 from django.http import HttpResponse
+from django.utils.decorators import method_decorator
 from django.utils.timezone import make_aware
 from django.views.decorators.csrf import csrf_exempt
 
@@ -14,18 +14,32 @@ from rest_framework import status, permissions
 
 from .models import Subscription
 from .serializers import SubscriptionSerializer  # <-- import your serializer
+from .stripe_client import STRIPE_API_SECONDS, STRIPE_WEBHOOK_SECONDS, stripe
+from idempotency.decorators import idempotent
+from utils.db_routing import read_from_primary
+from utils.queries import query_budget
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 logger = logging.getLogger(__name__)
 
 # Load your Stripe price IDs from environment
 MONTHLY_PRICE_ID = os.getenv('STRIPE_PRICE_MONTHLY')
 YEARLY_PRICE_ID = os.getenv('STRIPE_PRICE_YEARLY')
 
+HANDLED_WEBHOOK_EVENTS = {
+    'customer.subscription.created',
+    'customer.subscription.updated',
+    'customer.subscription.deleted',
+    'invoice.paid',
+}
 
+
+# A first checkout creates the Subscription (7 queries); an Idempotency-Key adds 5
+@query_budget(post=12)
 class CreateCheckoutSessionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    # A retried request must not create a second customer and session
+    @method_decorator(idempotent)
     def post(self, request):
         user = request.user
         price_id = request.data.get('price_id')  # should be monthly or yearly Stripe price ID
@@ -33,34 +47,56 @@ class CreateCheckoutSessionView(APIView):
         try:
             # Create or retrieve Stripe customer
             if not hasattr(user, 'subscription') or not user.subscription.stripe_customer_id:
-                customer = stripe.Customer.create(email=user.email)
+                with STRIPE_API_SECONDS.time(operation='customer.create'):
+                    customer = stripe.Customer.create(email=user.email)
                 subscription, _ = Subscription.objects.get_or_create(user=user)
                 subscription.stripe_customer_id = customer.id
                 subscription.plan = "standard"  # default until payment confirmed
                 subscription.plan_type = None
                 subscription.save()
             else:
-                customer = stripe.Customer.retrieve(user.subscription.stripe_customer_id)
+                with STRIPE_API_SECONDS.time(operation='customer.retrieve'):
+                    customer = stripe.Customer.retrieve(user.subscription.stripe_customer_id)
 
             # Create Stripe Checkout session
-            checkout_session = stripe.checkout.Session.create(
-                customer=customer.id,
-                payment_method_types=['card'],
-                line_items=[{
-                    'price': price_id,
-                    'quantity': 1,
-                }],
-                mode='subscription',
-                success_url=settings.FRONTEND_DOMAIN + '/dashboard',
-                cancel_url=settings.FRONTEND_DOMAIN + '/pricing',
-            )
+            with STRIPE_API_SECONDS.time(operation='checkout.session.create'):
+                checkout_session = stripe.checkout.Session.create(
+                    customer=customer.id,
+                    payment_method_types=['card'],
+                    line_items=[{
+                        'price': price_id,
+                        'quantity': 1,
+                    }],
+                    mode='subscription',
+                    success_url=settings.FRONTEND_DOMAIN + '/dashboard',
+                    cancel_url=settings.FRONTEND_DOMAIN + '/pricing',
+                )
             return Response({'checkout_url': checkout_session.url})
 
-        except Exception as e:
-            logger.error(f"Error creating checkout session: {e}")
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Stripe unreachable or throttling us: the client should retry, so no 400
+        # (which the Idempotency-Key would replay)
+        except (stripe.error.APIConnectionError, stripe.error.RateLimitError) as e:
+            logger.warning(f"Stripe unavailable creating checkout session: {e}")
+            return Response(
+                {'error': "Payments are temporarily unavailable. Please try again."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '5'},
+            )
+        except stripe.error.StripeError as e:
+            logger.error(f"Stripe error creating checkout session: {e}")
+            return Response({'error': e.user_message or str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        # Anything else is our fault: a 500 isn't replayed, and the details stay in the log
+        except Exception:
+            logger.exception("Error creating checkout session")
+            return Response(
+                {'error': "Couldn't start checkout. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
 
+# Subscriptions change in webhooks, which replicas may not have caught up with
+@read_from_primary
+@query_budget(get=2)
 class ManageSubscriptionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -86,6 +122,7 @@ class ManageSubscriptionView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@query_budget(4)
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
@@ -97,6 +134,12 @@ def stripe_webhook(request):
         logger.error(f"Webhook signature verification failed: {e}")
         return HttpResponse(status=400)
 
+    event_type = event['type'] if event['type'] in HANDLED_WEBHOOK_EVENTS else 'other'
+    with STRIPE_WEBHOOK_SECONDS.time(event_type=event_type):
+        return _handle_webhook_event(event)
+
+
+def _handle_webhook_event(event):
     from users.models import User  # avoid circular import issues
 
     # Helper function to determine plan_type from price_id
@@ -161,7 +204,8 @@ def stripe_webhook(request):
 
         if subscription_id:
             # Retrieve fresh subscription data from Stripe
-            stripe_sub = stripe.Subscription.retrieve(subscription_id)
+            with STRIPE_API_SECONDS.time(operation='subscription.retrieve'):
+                stripe_sub = stripe.Subscription.retrieve(subscription_id)
             current_period_end_ts = stripe_sub.get('current_period_end')
             current_period_end = (
                 make_aware(datetime.fromtimestamp(current_period_end_ts))
@@ -204,6 +248,7 @@ def stripe_webhook(request):
 
     return HttpResponse(status=200)
 
+@query_budget(post=2)
 class UpdateSubscriptionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -220,20 +265,22 @@ class UpdateSubscriptionView(APIView):
                 return Response({'error': 'No active subscription found'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Retrieve current Stripe subscription
-            stripe_sub = stripe.Subscription.retrieve(stripe_sub_id)
+            with STRIPE_API_SECONDS.time(operation='subscription.retrieve'):
+                stripe_sub = stripe.Subscription.retrieve(stripe_sub_id)
 
             # Assume only one subscription item
             sub_item_id = stripe_sub['items']['data'][0]['id']
 
             # Update subscription item to new price
-            updated_sub = stripe.Subscription.modify(
-                stripe_sub_id,
-                items=[{
-                    'id': sub_item_id,
-                    'price': new_price_id,
-                }],
-                proration_behavior='create_prorations',  # prorate the change
-            )
+            with STRIPE_API_SECONDS.time(operation='subscription.modify'):
+                updated_sub = stripe.Subscription.modify(
+                    stripe_sub_id,
+                    items=[{
+                        'id': sub_item_id,
+                        'price': new_price_id,
+                    }],
+                    proration_behavior='create_prorations',  # prorate the change
+                )
 
             return Response({'message': 'Subscription updated', 'subscription': updated_sub})
 
@@ -244,6 +291,7 @@ class UpdateSubscriptionView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(post=2)
 class CancelSubscriptionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -256,10 +304,11 @@ class CancelSubscriptionView(APIView):
                 return Response({'error': 'No active subscription to cancel'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Cancel subscription at period end
-            canceled_sub = stripe.Subscription.modify(
-                stripe_sub_id,
-                cancel_at_period_end=True
-            )
+            with STRIPE_API_SECONDS.time(operation='subscription.modify'):
+                canceled_sub = stripe.Subscription.modify(
+                    stripe_sub_id,
+                    cancel_at_period_end=True
+                )
 
             return Response({'message': 'Subscription cancellation scheduled at period end', 'subscription': canceled_sub})
 
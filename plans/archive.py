@@ -0,0 +1,165 @@
+"""
+Cold storage for old conversations.
+
+`manage.py archive_conversations` moves the conversation of every plan left
+untouched for PLAN_ARCHIVE_AFTER_DAYS into ArchivedConversation as one zstd
+frame (compressed against a dictionary trained on earlier conversations,
+when there is one), and leaves an empty list and archived_at behind, so the
+hot plan table keeps only small rows.
+
+Code that needs a conversation reads it through plan_conversation() (or
+aplan_conversation(), or conversations() for many plans at once), which
+decompress archived ones, so callers never see the difference; load plans
+with select_related('archive') to save a query. A plan that gets a new
+chat turn is restore()d first and becomes hot again.
+"""
+import functools
+import time
+
+import orjson
+import zstandard
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .functions import JSONArrayLength
+from .models import ArchivedConversation, CompressionDictionary, Plan
+
+DEFAULT_TITLE = Plan._meta.get_field('title').default
+
+# zstd needs a fair number of samples to train anything useful
+MIN_DICTIONARY_SAMPLES = 100
+
+
+@functools.lru_cache(maxsize=8)
+def _dictionary(dictionary_id):
+    # Dictionaries are never changed once written, so they can be cached for good
+    data = CompressionDictionary.objects.values_list('data', flat=True).get(id=dictionary_id)
+    return zstandard.ZstdCompressionDict(bytes(data))
+
+
+def compressor(dictionary=None, level=None):
+    level = settings.PLAN_ARCHIVE_ZSTD_LEVEL if level is None else level
+    if dictionary is None:
+        return zstandard.ZstdCompressor(level=level)
+    return zstandard.ZstdCompressor(level=level, dict_data=_dictionary(dictionary.id))
+
+
+def decompress_conversation(data, dictionary_id=None):
+    if dictionary_id is None:
+        decompressor = zstandard.ZstdDecompressor()
+    else:
+        decompressor = zstandard.ZstdDecompressor(dict_data=_dictionary(dictionary_id))
+    return orjson.loads(decompressor.decompress(bytes(data)))
+
+
+def plan_conversation(plan):
+    """The plan's conversation, decompressed from the archive if it was moved there."""
+    if plan.archived_at is None:
+        return plan.conversation
+    archive = plan.archive
+    return decompress_conversation(archive.data, archive.dictionary_id)
+
+
+async def aplan_conversation(plan):
+    if plan.archived_at is None:
+        return plan.conversation
+    return await sync_to_async(plan_conversation)(plan)
+
+
+def conversations(plans):
+    """{plan id: conversation} for `plans`, reading all the archived ones in one query."""
+    result = {plan.id: plan.conversation for plan in plans}
+    archived = [plan.id for plan in plans if plan.archived_at is not None]
+    if archived:
+        rows = ArchivedConversation.objects.filter(plan_id__in=archived).values_list('plan_id', 'data', 'dictionary_id')
+        for plan_id, data, dictionary_id in rows:
+            result[plan_id] = decompress_conversation(data, dictionary_id)
+    return result
+
+
+def restore(plan):
+    """Move an archived plan's conversation back into the plan row (and onto `plan`)."""
+    with transaction.atomic():
+        archive = ArchivedConversation.objects.select_for_update().filter(plan_id=plan.id).first()
+        if archive is None:
+            # Restored by a concurrent request in the meantime
+            plan.refresh_from_db(fields=['conversation', 'archived_at'])
+            return
+        plan.conversation = decompress_conversation(archive.data, archive.dictionary_id)
+        plan.archived_at = None
+        # update() leaves updated_at alone: the plan's content hasn't changed
+        Plan.objects.filter(id=plan.id).update(conversation=plan.conversation, archived_at=None)
+        archive.delete()
+
+
+def archivable_plans(cutoff):
+    """Hot plans with a conversation, untouched since `cutoff`."""
+    return (
+        Plan.objects
+        .filter(archived_at__isnull=True, updated_at__lt=cutoff)
+        # The title worker still needs their opening exchange
+        .exclude(title=DEFAULT_TITLE, title_attempted=False)
+        .annotate(message_count=JSONArrayLength('conversation'))
+        .filter(message_count__gt=0)
+    )
+
+
+def train_dictionary(cutoff, samples=2000, size=112640):
+    """Train a zstd dictionary on the conversations next in line for archival, and store it."""
+    conversations = archivable_plans(cutoff).order_by('id').values_list('conversation', flat=True)[:samples]
+    data = [orjson.dumps(conversation) for conversation in conversations]
+    if len(data) < MIN_DICTIONARY_SAMPLES:
+        raise ValueError(f"Only {len(data)} conversations to train on; need at least {MIN_DICTIONARY_SAMPLES}.")
+    trained = zstandard.train_dictionary(size, data)
+    return CompressionDictionary.objects.create(
+        data=trained.as_bytes(), dict_id=trained.dict_id(), sample_count=len(data),
+    )
+
+
+def archive_batch(plan_ids, cutoff, compressor, dictionary=None):
+    """
+    Archive whichever of `plan_ids` still qualify (plans written to since they
+    were picked, or locked by a chat turn, are skipped). Every frame is
+    decompressed and checked before the plans are emptied. Returns
+    [(raw bytes, compressed bytes, decompression seconds)] per plan archived.
+    """
+    stats = []
+    with transaction.atomic():
+        rows = (
+            archivable_plans(cutoff)
+            .filter(id__in=plan_ids)
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'conversation')
+        )
+        archives = []
+        for plan_id, conversation in rows:
+            raw = orjson.dumps(conversation)
+            data = compressor.compress(raw)
+
+            started = time.perf_counter()
+            if decompress_conversation(data, dictionary and dictionary.id) != conversation:
+                raise ValueError(f"Plan {plan_id}: archived conversation doesn't round-trip")
+            stats.append((len(raw), len(data), time.perf_counter() - started))
+
+            archives.append(ArchivedConversation(
+                plan_id=plan_id, data=data, dictionary=dictionary,
+                message_count=len(conversation), raw_size=len(raw),
+            ))
+        if not archives:
+            return stats
+
+        # A stale row from an archive that a chat turn overtook may be in the way
+        ArchivedConversation.objects.bulk_create(
+            archives,
+            update_conflicts=True,
+            unique_fields=['plan'],
+            update_fields=['data', 'dictionary', 'message_count', 'raw_size'],
+        )
+        # update() sends no signals, so the search index keeps the text, and
+        # leaves updated_at (and with it the plan's ETag) alone
+        Plan.objects.filter(id__in=[archive.plan_id for archive in archives]).update(
+            conversation=[], archived_at=timezone.now(),
+        )
+    return stats
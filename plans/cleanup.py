@@ -0,0 +1,84 @@
+"""
+Empty plans.
+
+Every "new chat" click used to insert a plan, and most were never written
+to. CreateNewPlanView now hands back the user's latest plan while it is
+still empty (reuse_empty_plan), and `manage.py purge_empty_plans` deletes
+the empty plans left behind, in short chunks so no lock is held for long.
+
+A plan counts as empty when it has no messages (and wasn't emptied by
+archival), still has its default title and isn't a SavedClass's plan. The
+purge never touches a user's latest plan: that is the one chat turns go
+to, so the user may still be looking at it.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from classes.models import SavedClass
+
+from .archive import DEFAULT_TITLE
+from .models import Plan
+
+
+def empty_plans():
+    # NOT EXISTS rather than saved_class__isnull: the purge locks these rows,
+    # and the nullable side of an outer join can't be locked
+    saved = SavedClass.objects.filter(plan=OuterRef('pk'))
+    return Plan.objects.filter(conversation=[], archived_at__isnull=True, title=DEFAULT_TITLE).exclude(Exists(saved))
+
+
+def reuse_empty_plan(user):
+    """The user's latest plan if it is still empty (touched so the purge leaves it be), else None."""
+    latest = Plan.objects.filter(user=user).order_by('-created_at').values('id')[:1]
+    plan = empty_plans().filter(id__in=latest).first()
+    if plan is None:
+        return None
+    plan.updated_at = timezone.now()
+    # Re-checked in the UPDATE: a message or a purge may have got there first
+    if not empty_plans().filter(id=plan.id).update(updated_at=plan.updated_at):
+        return None
+    return plan
+
+
+def purgeable_plans(cutoff):
+    """Empty plans untouched since `cutoff` that aren't their user's latest."""
+    newer = Plan.objects.filter(user=OuterRef('user'), created_at__gt=OuterRef('created_at'))
+    return empty_plans().filter(updated_at__lt=cutoff).filter(Exists(newer))
+
+
+def purge_empty_plans(cutoff, chunk_size=500, limit=None, pause=0.0):
+    """
+    Delete purgeable plans `chunk_size` at a time, one short transaction per
+    chunk. Rows locked by a request are skipped, and rows changed since
+    they were picked are re-checked under the lock. Returns
+    {'deleted', 'users', 'chunks', 'slowest_chunk'} (seconds).
+    """
+    stats = {'deleted': 0, 'users': set(), 'chunks': 0, 'slowest_chunk': 0.0}
+    last_id = 0
+    while limit is None or stats['deleted'] < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - stats['deleted'])
+        started = time.perf_counter()
+        with transaction.atomic():
+            rows = list(
+                purgeable_plans(cutoff)
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'user_id')[:size]
+            )
+            if not rows:
+                break
+            # Cascades to the search index rows and clears usage and trace links
+            Plan.objects.filter(id__in=[plan_id for plan_id, _ in rows]).delete()
+        stats['slowest_chunk'] = max(stats['slowest_chunk'], time.perf_counter() - started)
+        stats['chunks'] += 1
+        stats['deleted'] += len(rows)
+        stats['users'].update(user_id for _, user_id in rows)
+        last_id = rows[-1][0]
+        if pause:
+            time.sleep(pause)
+    stats['users'] = len(stats['users'])
+    return stats
@@ -0,0 +1,69 @@
+import json
+
+from django.db import connections, router
+
+from .archive import decompress_conversation
+from .models import ArchivedConversation, Plan
+
+
+def _messages_sql(connection):
+    table = connection.ops.quote_name(Plan._meta.db_table)
+    return (
+        f"SELECT t.idx - 1, t.message FROM {table} p "
+        f"CROSS JOIN LATERAL jsonb_array_elements(p.conversation) WITH ORDINALITY AS t(message, idx) "
+        f"WHERE p.id = %s AND t.idx - 1 >= %s AND t.idx - 1 < %s {{time_filter}} "
+        f"ORDER BY t.idx {{direction}} LIMIT %s",
+        "AND t.message ->> 'created_at' > %s",
+    )
+
+
+def _archived_messages(plan_id, start, stop, limit, newest_first, after_time):
+    # An archived conversation is one compressed frame: slice it here instead
+    archive = ArchivedConversation.objects.values_list('data', 'dictionary_id').filter(plan_id=plan_id).first()
+    if archive is None:
+        return None
+    conversation = decompress_conversation(*archive)
+    messages = [
+        (index, message) for index, message in enumerate(conversation[start:stop], start)
+        if not after_time or (message.get('created_at') or '') > after_time
+    ]
+    return messages[-limit:] if newest_first else messages[:limit]
+
+
+def fetch_messages(plan_id, start, stop, limit, newest_first=False, after_time=None, archived=False):
+    """
+    Return [(index, message), ...] for conversation[start:stop], at most
+    `limit` of them, in conversation order. With `newest_first` the limit
+    keeps the messages closest to `stop` (for paging backwards).
+
+    The array is expanded in the database, so only the requested messages
+    travel to Django, never the whole conversation (unless the plan is
+    `archived`, see plans.archive).
+    """
+    if archived:
+        messages = _archived_messages(plan_id, start, stop, limit, newest_first, after_time)
+        if messages is not None:
+            return messages
+
+    # Same database the ORM reads the plan from (a replica on safe requests)
+    connection = connections[router.db_for_read(Plan)]
+    sql, time_filter = _messages_sql(connection)
+    params = [plan_id, start, stop]
+    if after_time:
+        params.append(after_time)
+    else:
+        time_filter = ''
+    params.append(limit)
+
+    sql = sql.format(time_filter=time_filter, direction='DESC' if newest_first else 'ASC')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    messages = [
+        (index, json.loads(message) if isinstance(message, str) else message)
+        for index, message in rows
+    ]
+    if newest_first:
+        messages.reverse()
+    return messages
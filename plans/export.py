@@ -0,0 +1,74 @@
+import orjson
+import zstandard
+from django.db.models import F
+from django.utils import timezone
+
+from classes.models import SavedClass
+from .archive import decompress_conversation
+from .models import Plan
+from utils.renderers import dumps
+
+PLAN_FIELDS = ('id', 'title', 'conversation', 'is_saved', 'pinned_date', 'created_at', 'updated_at')
+SAVED_CLASS_FIELDS = ('id', 'plan_id', 'title', 'notes', 'pinned_date', 'created_at', 'updated_at')
+
+
+def _line(record_type, data):
+    return dumps({"type": record_type, **data}, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def iter_user_export(user, chunk_size=200):
+    """
+    Yield the user's data as NDJSON lines (bytes): one user record, then every plan
+    (with its conversation) and every saved class. Rows are read through
+    .iterator(), which uses a server-side cursor on Postgres, so memory stays
+    flat whatever the number of plans.
+    """
+    yield _line("user", {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "exported_at": timezone.now(),
+    })
+
+    # Archived conversations come along in the same query and are decompressed here
+    plans = Plan.objects.filter(user=user).order_by('id').values(
+        *PLAN_FIELDS, archive_data=F('archive__data'), archive_dictionary=F('archive__dictionary_id'),
+    )
+    for plan in plans.iterator(chunk_size=chunk_size):
+        data, dictionary_id = plan.pop('archive_data'), plan.pop('archive_dictionary')
+        if data is not None and not plan['conversation']:
+            plan['conversation'] = decompress_conversation(data, dictionary_id)
+        yield _line("plan", plan)
+
+    saved_classes = SavedClass.objects.filter(user=user).order_by('id').values(*SAVED_CLASS_FIELDS)
+    for saved_class in saved_classes.iterator(chunk_size=chunk_size):
+        yield _line("saved_class", saved_class)
+
+
+def buffer_chunks(lines, buffer_size=64 * 1024):
+    """Group lines into chunks of roughly `buffer_size` bytes."""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def zstd_compress_chunks(chunks, level=3):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(user, compress=False):
+    chunks = buffer_chunks(iter_user_export(user))
+    return zstd_compress_chunks(chunks) if compress else chunks
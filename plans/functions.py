@@ -0,0 +1,11 @@
+from django.db.models import Func, IntegerField
+
+
+class JSONArrayLength(Func):
+    """Length of a JSON array column, computed in the database."""
+    function = 'JSONB_ARRAY_LENGTH'
+    arity = 1
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='JSON_ARRAY_LENGTH', **extra_context)
@@ -0,0 +1,126 @@
+"""Synthetic data and helpers for the benchmark commands. Not a command itself."""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from classes.models import SavedClass
+from payments.models import Subscription
+from plans.models import Plan
+
+BENCH_PASSWORD = "bench-password"
+
+TEAMS = [
+    "Arsenal", "Chelsea", "Liverpool", "Barcelona", "Real Madrid", "Bayern", "Juventus",
+    "Inter", "Ajax", "Benfica", "Celtic", "Porto", "Napoli", "Dortmund", "Lakers", "Celtics",
+]
+TOPICS = [
+    "pressing drill", "rondo", "passing triangle", "finishing session", "set piece routine",
+    "counter attack pattern", "high line", "zonal marking", "man marking", "overlapping fullback",
+    "warm up", "conditioning circuit", "small sided game", "goalkeeper distribution", "recovery run",
+]
+QUESTIONS = [
+    "How should I coach a {topic} for under 12s?",
+    "What formation did {team} use last season?",
+    "Give me a 20 minute {topic} for a squad of 14.",
+    "Who scored for {team} in their last match?",
+    "Can you adapt the {topic} for a wet pitch?",
+]
+ANSWERS = [
+    "Start the {topic} with four cones in a square, two touch maximum, switch roles every two minutes.",
+    "{team} mostly set up in a 4-3-3 with an aggressive press and inverted wingers.",
+    "Run the {topic} in three blocks of six minutes with active rest between blocks.",
+    "Focus the {topic} on body shape before the first touch and scanning before receiving.",
+]
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Run against a throwaway test database, never the configured one."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _turns(rng, count):
+    conversation = []
+    for _ in range(count):
+        values = {"team": rng.choice(TEAMS), "topic": rng.choice(TOPICS)}
+        conversation.append({"role": "user", "content": rng.choice(QUESTIONS).format(**values)})
+        conversation.append({"role": "assistant", "content": rng.choice(ANSWERS).format(**values)})
+    return conversation
+
+
+def seed_corpus(users=10, plans_per_user=100, turns=6, saved_ratio=0.2, seed=42, batch_size=1000,
+                subscribed=False):
+    """
+    Create users with plans and saved classes in bulk (and an active Pro
+    subscription each when `subscribed`). Returns the users.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S%f')
+
+    created_users = []
+    for i in range(users):
+        user = User.objects.create_user(
+            username=f"bench_{stamp}_{i}",
+            email=f"bench_{stamp}_{i}@example.com",
+            password=BENCH_PASSWORD,
+        )
+        created_users.append(user)
+
+        plans = Plan.objects.bulk_create(
+            [
+                Plan(
+                    user=user,
+                    title=f"{rng.choice(TEAMS)} {rng.choice(TOPICS)}",
+                    conversation=_turns(rng, rng.randint(1, turns)),
+                )
+                for _ in range(plans_per_user)
+            ],
+            batch_size=batch_size,
+        )
+        saved = [plan for plan in plans if rng.random() < saved_ratio]
+        SavedClass.objects.bulk_create(
+            [
+                SavedClass(
+                    user=user,
+                    plan=plan,
+                    title=plan.title,
+                    notes=f"Remember the {rng.choice(TOPICS)} variation",
+                    pinned_date=timezone.now() + timedelta(days=rng.randint(-30, 30)),
+                )
+                for plan in saved
+            ],
+            batch_size=batch_size,
+        )
+        Plan.objects.filter(id__in=[plan.id for plan in saved]).update(is_saved=True)
+
+    if subscribed:
+        Subscription.objects.bulk_create([
+            Subscription(
+                user=user,
+                plan='pro',
+                plan_type='monthly',
+                is_active=True,
+                current_period_end=timezone.now() + timedelta(days=30),
+            )
+            for user in created_users
+        ])
+
+    return created_users
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from zstandard import ZstdError
+
+from plans.archive import archivable_plans, archive_batch, compressor, train_dictionary
+from plans.models import CompressionDictionary
+from ._seed import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compress the conversations of plans untouched for --older-than-days into the plan_archive "
+        "table (zstd, with the latest trained dictionary unless --no-dictionary), and report the "
+        "bytes saved and the time each archived read spends decompressing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Default PLAN_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=200, help="Plans per transaction.")
+        parser.add_argument('--limit', type=int, default=None, help="Archive at most this many plans.")
+        parser.add_argument('--train-dictionary', action='store_true',
+                            help="Train a new dictionary on the conversations about to be archived, and use it.")
+        parser.add_argument('--dictionary-samples', type=int, default=2000)
+        parser.add_argument('--dictionary-size', type=int, default=112640, help="Bytes.")
+        parser.add_argument('--no-dictionary', action='store_true')
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        cutoff = timezone.now() - timedelta(days=settings.PLAN_ARCHIVE_AFTER_DAYS if days is None else days)
+
+        if options['no_dictionary']:
+            dictionary = None
+        elif options['train_dictionary']:
+            try:
+                dictionary = train_dictionary(
+                    cutoff, samples=options['dictionary_samples'], size=options['dictionary_size'],
+                )
+            except (ValueError, ZstdError) as e:
+                raise CommandError(f"Couldn't train a dictionary: {e}")
+            self.stdout.write(
+                f"Trained dictionary {dictionary.id} ({len(dictionary.data)} bytes) "
+                f"on {dictionary.sample_count} conversations."
+            )
+        else:
+            dictionary = CompressionDictionary.objects.order_by('-id').first()
+
+        frame_compressor = compressor(dictionary)
+        stats = []
+        last_id = 0
+        while options['limit'] is None or len(stats) < options['limit']:
+            batch_size = options['batch_size']
+            if options['limit'] is not None:
+                batch_size = min(batch_size, options['limit'] - len(stats))
+            plan_ids = list(
+                archivable_plans(cutoff).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not plan_ids:
+                break
+            stats.extend(archive_batch(plan_ids, cutoff, frame_compressor, dictionary))
+            last_id = plan_ids[-1]
+
+        if not stats:
+            self.stdout.write(self.style.SUCCESS("No conversations to archive."))
+            return
+
+        raw = sum(sample[0] for sample in stats)
+        compressed = sum(sample[1] for sample in stats)
+        read_ms = [sample[2] * 1000 for sample in stats]
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {len(stats)} conversations "
+            f"({'dictionary ' + str(dictionary.id) if dictionary else 'no dictionary'}): "
+            f"{raw / 1024:.1f} KiB of JSON -> {compressed / 1024:.1f} KiB "
+            f"({raw / compressed:.1f}x, {100 - compressed * 100 / raw:.0f}% saved). "
+            f"Decompressing adds {percentile(read_ms, 50):.3f} ms per read "
+            f"(p95 {percentile(read_ms, 95):.3f} ms)."
+        ))
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from classes.models import SavedClass
+from plans.models import Plan
+from ._seed import BENCH_PASSWORD, TOPICS, benchmark_database, percentile, seed_corpus
+
+# name -> relative weight in the request mix
+SCENARIOS = {
+    'login': 1,
+    'signup': 0.5,
+    'chat_send': 2,
+    'chat_list': 3,
+    'plan_detail': 3,
+    'recent_preview': 2,
+    'calendar': 2,
+}
+
+
+class _Session:
+    """One simulated client: a logged-in user and the ids it can touch."""
+
+    def __init__(self, user, plan_ids, rng):
+        self.user = user
+        self.plan_ids = plan_ids
+        self.rng = rng
+        self.client = Client(raise_request_exception=False)
+        self.token = None
+
+    def login(self):
+        response = self.client.post(
+            '/api/login/', {'email': self.user.email, 'password': BENCH_PASSWORD}, content_type='application/json'
+        )
+        self.token = response.json()['access']
+        return response
+
+    def get(self, path):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def post(self, path, data):
+        return self.client.post(path, data, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def run(self, scenario):
+        if scenario == 'login':
+            return self.login()
+        if scenario == 'signup':
+            suffix = f"{threading.get_ident()}_{time.perf_counter_ns()}"
+            return self.client.post('/api/signup/', {
+                'username': f'signup_{suffix}',
+                'email': f'signup_{suffix}@example.com',
+                'password': BENCH_PASSWORD,
+                'confirm_password': BENCH_PASSWORD,
+                'agree_terms': True,
+            }, content_type='application/json')
+        if scenario == 'chat_send':
+            plan_id = self.rng.choice(self.plan_ids)
+            return self.post(f'/api/chats/{plan_id}/send/', {'message': f"Plan a {self.rng.choice(TOPICS)}"})
+        if scenario == 'chat_list':
+            return self.get('/api/chats/')
+        if scenario == 'plan_detail':
+            return self.get(f'/api/chats/{self.rng.choice(self.plan_ids)}/')
+        if scenario == 'recent_preview':
+            return self.get('/api/chats/recent-messages/')
+        if scenario == 'calendar':
+            return self.get('/api/classes/calendar/')
+        raise ValueError(scenario)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a test database and drive the real API routes with concurrent clients against a "
+        "stubbed LLM and Stripe. Reports latency percentiles, throughput and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--plans-per-user', type=int, default=200)
+        parser.add_argument('--turns', type=int, default=10, help="Max exchanges per seeded plan.")
+        parser.add_argument('--clients', type=int, default=16, help="Concurrent client threads.")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per client.")
+        parser.add_argument('--llm-latency-ms', type=int, default=300)
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        llm_latency = options['llm_latency_ms'] / 1000
+
+        async def fake_llm(message, *args, **kwargs):
+            await asyncio.sleep(llm_latency)
+            return f"Here is a plan for: {message}"
+
+        with benchmark_database(keepdb=options['keepdb']), \
+                mock.patch('plans.views.agenerate_ai_response', fake_llm), \
+                mock.patch('payments.views.stripe'):
+            results = self.run(options)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def run(self, options):
+        started = time.perf_counter()
+        users = seed_corpus(
+            users=options['users'],
+            plans_per_user=options['plans_per_user'],
+            turns=options['turns'],
+            subscribed=True,
+        )
+        seed_seconds = time.perf_counter() - started
+
+        plan_ids = {}
+        for user_id, plan_id in Plan.objects.values_list('user_id', 'id'):
+            plan_ids.setdefault(user_id, []).append(plan_id)
+
+        scenarios = options['scenarios']
+        weights = [SCENARIOS[name] for name in scenarios]
+        samples = {name: [] for name in scenarios}
+        lock = threading.Lock()
+
+        def client_thread(index):
+            rng = random.Random(index)
+            user = users[index % len(users)]
+            session = _Session(user, plan_ids[user.id], rng)
+            session.login()
+            try:
+                for _ in range(options['requests']):
+                    scenario = rng.choices(scenarios, weights)[0]
+                    with CaptureQueriesContext(connection) as queries:
+                        request_started = time.perf_counter()
+                        response = session.run(scenario)
+                        elapsed = (time.perf_counter() - request_started) * 1000
+                    with lock:
+                        samples[scenario].append((elapsed, len(queries), response.status_code))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client_thread, args=(i,)) for i in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+        total_requests = sum(len(rows) for rows in samples.values())
+        report = {}
+        for name, rows in samples.items():
+            if not rows:
+                continue
+            latencies = [row[0] for row in rows]
+            queries = [row[1] for row in rows]
+            report[name] = {
+                'requests': len(rows),
+                'errors': sum(1 for row in rows if row[2] >= 400),
+                'latency_ms': {
+                    'p50': round(percentile(latencies, 50), 2),
+                    'p95': round(percentile(latencies, 95), 2),
+                    'p99': round(percentile(latencies, 99), 2),
+                    'max': round(max(latencies), 2),
+                },
+                'queries_per_request': {
+                    'mean': round(sum(queries) / len(queries), 2),
+                    'max': max(queries),
+                },
+            }
+
+        return {
+            'run_at': timezone.now().isoformat(),
+            'config': {
+                key: options[key]
+                for key in ('users', 'plans_per_user', 'turns', 'clients', 'requests', 'llm_latency_ms', 'scenarios')
+            },
+            'seed': {
+                'seconds': round(seed_seconds, 2),
+                'plans': sum(len(ids) for ids in plan_ids.values()),
+                'saved_classes': SavedClass.objects.count(),
+            },
+            'wall_seconds': round(wall_seconds, 2),
+            'total_requests': total_requests,
+            'throughput_rps': round(total_requests / wall_seconds, 2) if wall_seconds else None,
+            'scenarios': report,
+        }
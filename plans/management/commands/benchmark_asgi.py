@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from plans.models import Plan
+from ._seed import BENCH_PASSWORD, TOPICS, benchmark_database, percentile, seed_corpus
+
+SERVERS = ('wsgi', 'asgi')
+METRICS_TOKEN = 'benchmark-asgi'
+
+
+def _database_url():
+    db = connection.settings_dict
+    host = quote(db['HOST'] or 'localhost', safe='')  # may be a unix socket directory
+    url = (
+        f"postgres://{quote(db['USER'] or '')}:{quote(db['PASSWORD'] or '')}"
+        f"@{host}:{db['PORT'] or 5432}/{db['NAME']}"
+    )
+    sslmode = db.get('OPTIONS', {}).get('sslmode')
+    return f"{url}?sslmode={sslmode}" if sslmode else url
+
+
+def _wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server didn't start listening on port {port} within {timeout}s")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent chats one WSGI worker (gunicorn, gthread) and one ASGI worker "
+        "(uvicorn) sustain while the LLM is slow. Both servers run the real app in OFFLINE_MODE "
+        "against a seeded test database, with the fake LLM answering after --llm-latency-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200],
+                            help="Simultaneous chat messages per round, one level at a time.")
+        parser.add_argument('--rounds', type=int, default=3, help="Rounds per concurrency level.")
+        parser.add_argument('--llm-latency-ms', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=8, help="Threads of the gunicorn worker.")
+        parser.add_argument('--db-pool-max-size', type=int, default=10,
+                            help="DB_POOL_MAX_SIZE of the servers: far fewer connections than concurrent chats.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            results = self.run(options)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    @contextmanager
+    def serve(self, server, options):
+        port = options['port']
+        if server == 'wsgi':
+            command = [
+                sys.executable, '-m', 'gunicorn', 'app.wsgi', '-c', 'gunicorn.conf.py',
+                '--workers', '1', '--threads', str(options['threads']), '--bind', f'127.0.0.1:{port}',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', 'app.asgi:application',
+                '--workers', '1', '--host', '127.0.0.1', '--port', str(port), '--no-access-log',
+                # Connections sit idle between levels; don't let the client reuse a closed one
+                '--timeout-keep-alive', '120',
+            ]
+        env = {
+            **os.environ,
+            'OFFLINE_MODE': '1',
+            'OFFLINE_LLM_LATENCY_MS': str(options['llm_latency_ms']),
+            'DATABASE_URL': _database_url(),
+            'AI_TRACE_SAMPLE_RATE': '0',
+            'AI_HEDGE_ENABLED': '0',
+            'QUERY_BUDGET_STRICT': '0',
+            'METRICS_TOKEN': METRICS_TOKEN,
+            'DB_POOL_MAX_SIZE': str(options['db_pool_max_size']),
+        }
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_port(port, process)
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    async def login(self, client, users):
+        tokens = {}
+        for user in users:
+            response = await client.post('/api/login/', json={'email': user.email, 'password': BENCH_PASSWORD})
+            response.raise_for_status()
+            tokens[user.id] = response.json()['access']
+        return tokens
+
+    async def pool_timeouts(self, client):
+        """Checkouts the server gave up on so far (gameplan_db_pool_timeouts_total, all aliases)."""
+        response = await client.get('/metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'})
+        response.raise_for_status()
+        return sum(
+            float(line.rsplit(' ', 1)[1])
+            for line in response.text.splitlines()
+            if line.startswith('gameplan_db_pool_timeouts_total')
+        )
+
+    async def load(self, base_url, users, plan_ids, options):
+        rng = random.Random(11)
+        limits = httpx.Limits(max_connections=max(options['concurrency']), max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+            tokens = await self.login(client, users)
+
+            async def send():
+                user = rng.choice(users)
+                started = time.perf_counter()
+                response = await client.post(
+                    f'/api/chats/{rng.choice(plan_ids[user.id])}/send/',
+                    json={'message': f"Plan a {rng.choice(TOPICS)}"},
+                    headers={'Authorization': f'Bearer {tokens[user.id]}'},
+                )
+                return (time.perf_counter() - started) * 1000, response.status_code
+
+            levels = {}
+            for concurrency in options['concurrency']:
+                samples = []
+                timeouts_before = await self.pool_timeouts(client)
+                started = time.perf_counter()
+                for _ in range(options['rounds']):
+                    samples.extend(await asyncio.gather(*(send() for _ in range(concurrency))))
+                wall_seconds = time.perf_counter() - started
+
+                latencies = [sample[0] for sample in samples]
+                levels[concurrency] = {
+                    'requests': len(samples),
+                    'errors': sum(1 for sample in samples if sample[1] >= 400),
+                    'latency_ms': {
+                        'p50': round(percentile(latencies, 50), 2),
+                        'p95': round(percentile(latencies, 95), 2),
+                        'max': round(max(latencies), 2),
+                    },
+                    # Requests that waited DB_POOL_TIMEOUT for a connection and failed
+                    'db_pool_timeouts': int(await self.pool_timeouts(client) - timeouts_before),
+                    'wall_seconds': round(wall_seconds, 2),
+                    'throughput_rps': round(len(samples) / wall_seconds, 2),
+                    # Chats the server actually had waiting on the LLM at once
+                    # (throughput x LLM latency): close to the level when it
+                    # overlaps them, capped near its thread count when it can't
+                    'served_concurrently': round(len(samples) / wall_seconds * options['llm_latency_ms'] / 1000, 1),
+                }
+            return levels
+
+    def run(self, options):
+        users = seed_corpus(users=options['users'], plans_per_user=5, turns=3, subscribed=True)
+        plan_ids = {}
+        for user_id, plan_id in Plan.objects.values_list('user_id', 'id'):
+            plan_ids.setdefault(user_id, []).append(plan_id)
+        # The servers open their own connections to the test database
+        connection.close()
+
+        servers = {}
+        for server in options['servers']:
+            self.stderr.write(f"Benchmarking {server}...")
+            with self.serve(server, options) as base_url:
+                servers[server] = asyncio.run(self.load(base_url, users, plan_ids, options))
+
+        return {
+            'run_at': timezone.now().isoformat(),
+            'config': {
+                key: options[key]
+                for key in ('users', 'concurrency', 'rounds', 'llm_latency_ms', 'threads', 'db_pool_max_size')
+            },
+            'servers': servers,
+        }
@@ -0,0 +1,70 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from plans.search import rebuild_index, search_plans
+from ._seed import TEAMS, TOPICS, benchmark_database, percentile, seed_corpus
+
+
+class Command(BaseCommand):
+    help = "Seed a large corpus in a test database and measure plan search latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--plans-per-user', type=int, default=2500)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            results = self.run(options)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def run(self, options):
+        rng = random.Random(7)
+
+        started = time.perf_counter()
+        users = seed_corpus(users=options['users'], plans_per_user=options['plans_per_user'])
+        seed_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = rebuild_index()
+        index_seconds = time.perf_counter() - started
+
+        page_size = options['page_size']
+        latencies = []
+        hits = 0
+        for _ in range(options['queries']):
+            user = rng.choice(users)
+            query = rng.choice([rng.choice(TOPICS), rng.choice(TEAMS), f"{rng.choice(TEAMS)} {rng.choice(TOPICS)}"])
+
+            started = time.perf_counter()
+            results = search_plans(user, query)
+            total = results.count() if hasattr(results, 'count') else len(results)
+            page = list(results[:page_size])
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += bool(total and page)
+
+        return {
+            'plans': indexed,
+            'users': len(users),
+            'seed_seconds': round(seed_seconds, 2),
+            'index_seconds': round(index_seconds, 2),
+            'index_plans_per_second': round(indexed / index_seconds, 1) if index_seconds else None,
+            'queries': len(latencies),
+            'queries_with_results': hits,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'max': round(max(latencies), 2) if latencies else 0.0,
+            },
+        }
@@ -0,0 +1,84 @@
+import gzip
+import json
+import random
+import time
+
+import orjson
+import zstandard
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from utils.renderers import ORJSONRenderer
+from ._seed import _turns
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _plan_payload(rng, turns):
+    now = timezone.now()
+    conversation = _turns(rng, turns)
+    for message in conversation:
+        message["created_at"] = now.isoformat()
+    return {
+        "id": rng.randint(1, 10 ** 6),
+        "title": "Pressing drill",
+        "conversation": conversation,
+        "is_saved": False,
+        "pinned_date": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare stdlib/DRF and orjson serialization, and gzip/zstd sizes, on realistic plan payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, nargs='+', default=[5, 50, 250, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(3)
+        repeat = options['repeat']
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+        zstd = zstandard.ZstdCompressor(level=3)
+
+        results = []
+        for turns in options['turns']:
+            payload = _plan_payload(rng, turns)
+            body = fast.render(payload)
+            results.append({
+                'turns': turns,
+                'render_ms': {
+                    'drf_json': round(_best_of(lambda: drf.render(payload), repeat), 3),
+                    'orjson': round(_best_of(lambda: fast.render(payload), repeat), 3),
+                },
+                'parse_ms': {
+                    'json': round(_best_of(lambda: json.loads(body), repeat), 3),
+                    'orjson': round(_best_of(lambda: orjson.loads(body), repeat), 3),
+                },
+                'compress_ms': {
+                    'gzip': round(_best_of(lambda: gzip.compress(body, compresslevel=6), repeat), 3),
+                    'zstd': round(_best_of(lambda: zstd.compress(body), repeat), 3),
+                },
+                'bytes': {
+                    'drf_json': len(drf.render(payload)),
+                    'orjson': len(body),
+                    'gzip': len(gzip.compress(body, compresslevel=6)),
+                    'zstd': len(zstd.compress(body)),
+                },
+            })
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
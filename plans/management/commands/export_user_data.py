@@ -0,0 +1,35 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from plans.export import export_chunks
+
+
+class Command(BaseCommand):
+    help = "Stream a user's plans, conversations and saved classes as NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--output', '-o', help="File to write to (defaults to stdout).")
+        parser.add_argument('--zstd', action='store_true', help="Compress the output with zstd.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        written = 0
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in export_chunks(user, compress=options['zstd']):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
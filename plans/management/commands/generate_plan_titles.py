@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from plans.tasks import run_title_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate titles for untitled plans after their first exchange, several plans per LLM call. "
+        "Runs until stopped unless --once is given; rate limited by PLAN_TITLE_CALLS_PER_MINUTE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Plans per LLM call (default PLAN_TITLE_BATCH_SIZE).")
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--once', action='store_true', help="Stop as soon as no untitled plans are left.")
+        parser.add_argument('--idle-sleep', type=float, default=30, help="Seconds to wait when there is nothing to do.")
+
+    def handle(self, *args, **options):
+        titled = run_title_worker(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            idle_sleep=None if options['once'] else options['idle_sleep'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Titled {titled} plans."))
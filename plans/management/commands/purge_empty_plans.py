@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from plans.cleanup import purge_empty_plans, purgeable_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete plans that never got a message and have been untouched for --older-than-hours, "
+        "a chunk at a time (one short transaction each), and report how many went. Meant for cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=int, default=None,
+                            help="Default PLAN_PURGE_EMPTY_AFTER_HOURS.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Plans per transaction.")
+        parser.add_argument('--limit', type=int, default=None, help="Delete at most this many plans.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between chunks.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be deleted.")
+
+    def handle(self, *args, **options):
+        hours = options['older_than_hours']
+        cutoff = timezone.now() - timedelta(hours=settings.PLAN_PURGE_EMPTY_AFTER_HOURS if hours is None else hours)
+
+        if options['dry_run']:
+            count = purgeable_plans(cutoff).count()
+            self.stdout.write(f"{count} empty plans untouched since {cutoff:%Y-%m-%d %H:%M} UTC would be deleted.")
+            return
+
+        stats = purge_empty_plans(
+            cutoff, chunk_size=options['chunk_size'], limit=options['limit'], pause=options['pause'],
+        )
+        if not stats['deleted']:
+            self.stdout.write(self.style.SUCCESS("No empty plans to purge."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['deleted']} empty plans of {stats['users']} users "
+            f"untouched since {cutoff:%Y-%m-%d %H:%M} UTC, in {stats['chunks']} chunks "
+            f"(longest transaction {stats['slowest_chunk'] * 1000:.0f} ms)."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from plans.tasks import run_summary_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold the older turns of long conversations into their rolling summary, once a chat turn marks them due. "
+        "Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Due plans fetched per query.")
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--once', action='store_true', help="Stop as soon as no summaries are due.")
+        parser.add_argument('--idle-sleep', type=float, default=30, help="Seconds to wait when there is nothing to do.")
+
+    def handle(self, *args, **options):
+        refreshed = run_summary_worker(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            idle_sleep=None if options['once'] else options['idle_sleep'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} summaries."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='summary_upto',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0003_plan_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(condition=models.Q(('title', 'Untitled Plan')), fields=['id'], name='plan_untitled_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0004_plan_untitled_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('dict_id', models.PositiveBigIntegerField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'django"."plan_archive_dictionary',
+            },
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedConversation',
+            fields=[
+                ('plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='plans.plan')),
+                ('data', models.BinaryField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('raw_size', models.PositiveIntegerField()),
+                ('dictionary', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='plans.compressiondictionary')),
+            ],
+            options={
+                'db_table': 'django"."plan_archive',
+            },
+        ),
+    ]
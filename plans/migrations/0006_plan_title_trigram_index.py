@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:20
+
+from django.db import migrations
+
+from utils.trigram import trigram_indexes
+
+
+class Migration(migrations.Migration):
+    atomic = False  # the indexes are built CONCURRENTLY
+
+    dependencies = [
+        ('plans', '0005_plan_archive'),
+    ]
+
+    operations = [
+        trigram_indexes('"django"."plan"', {
+            'plan_title_trgm': 'title',
+        }),
+    ]
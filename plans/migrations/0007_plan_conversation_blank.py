@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0006_plan_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plan',
+            name='conversation',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
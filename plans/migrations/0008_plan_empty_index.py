@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0007_plan_conversation_blank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('conversation', [])), fields=['user', 'created_at'], name='plan_empty_idx'),
+        ),
+    ]
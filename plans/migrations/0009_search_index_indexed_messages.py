@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:09
+
+from django.db import migrations, models
+
+
+def count_indexed_messages(apps, schema_editor):
+    # Rows indexed so far hold the whole conversation (archived ones too)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'UPDATE "django"."plan_search_index" AS i SET indexed_messages = CASE '
+            'WHEN p.archived_at IS NULL THEN JSONB_ARRAY_LENGTH(p.conversation) '
+            'ELSE COALESCE(a.message_count, 0) END '
+            'FROM "django"."plan" AS p LEFT JOIN "django"."plan_archive" AS a ON a.plan_id = p.id '
+            'WHERE p.id = i.plan_id'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0008_plan_empty_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plansearchindex',
+            name='indexed_messages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_indexed_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0009_search_index_indexed_messages'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='summary_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(condition=models.Q(('summary_due_at__isnull', False)), fields=['summary_due_at'], name='plan_summary_due_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-19 20:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0010_plan_summary_due'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='title_attempted',
+            field=models.BooleanField(default=False),
+        ),
+        # RemoveIndex drops the index unqualified, which misses the "django" schema
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    [
+                        'DROP INDEX IF EXISTS "django"."plan_untitled_idx"',
+                        'CREATE INDEX "plan_untitled_idx" ON "django"."plan" ("id") '
+                        "WHERE (\"title\" = 'Untitled Plan' AND NOT \"title_attempted\")",
+                    ],
+                    reverse_sql=[
+                        'DROP INDEX IF EXISTS "django"."plan_untitled_idx"',
+                        'CREATE INDEX "plan_untitled_idx" ON "django"."plan" ("id") '
+                        "WHERE \"title\" = 'Untitled Plan'",
+                    ],
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(model_name='plan', name='plan_untitled_idx'),
+                migrations.AddIndex(
+                    model_name='plan',
+                    index=models.Index(
+                        condition=models.Q(('title', 'Untitled Plan'), ('title_attempted', False)),
+                        fields=['id'],
+                        name='plan_untitled_idx',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,14 +1,28 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
 
 class Plan(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255, default="Untitled Plan")
-    conversation = models.JSONField(default=list)
+    conversation = models.JSONField(default=list, blank=True)
     is_saved = models.BooleanField(default=False)
+    # Set by the title worker when neither the model nor the question gave a
+    # title, so the plan leaves its queue and keeps its default title
+    title_attempted = models.BooleanField(default=False)
     pinned_date = models.DateTimeField(null=True, blank=True)
 
+    # Rolling summary of conversation[:summary_upto], refreshed in the background
+    summary = models.TextField(blank=True, default='')
+    summary_upto = models.PositiveIntegerField(default=0)
+    # Set by the chat turn that makes a refresh due, cleared by the summary worker
+    summary_due_at = models.DateTimeField(null=True, blank=True)
+
+    # Set when the conversation has been moved to ArchivedConversation (and
+    # emptied here); read it through plans.archive, never directly
+    archived_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -16,6 +30,68 @@ class Plan(models.Model):
         return f"{self.title} - {self.user.email}"
 
     class Meta:
-        db_table = 'django"."plan' 
-   
-    
+        db_table = 'django"."plan'
+        indexes = [
+            # Lets the background title worker find untitled plans without a scan
+            models.Index(
+                fields=['id'], condition=models.Q(title='Untitled Plan', title_attempted=False), name='plan_untitled_idx',
+            ),
+            # The summary worker's queue (plans/tasks.py)
+            models.Index(
+                fields=['summary_due_at'], condition=models.Q(summary_due_at__isnull=False), name='plan_summary_due_idx',
+            ),
+            # Serves "new chat" reuse and the empty plan purge (plans/cleanup.py)
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=models.Q(conversation=[], archived_at__isnull=True),
+                name='plan_empty_idx',
+            ),
+        ]
+
+
+class PlanSearchIndex(models.Model):
+    """
+    Denormalized search document for a plan: its title, the text of every
+    message and the notes of its SavedClass. Kept in sync on write by
+    plans.signals; the GIN index is created in the migration.
+    """
+    plan = models.OneToOneField(Plan, on_delete=models.CASCADE, primary_key=True, related_name='search_index')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    notes = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True)
+    # Messages of the conversation in body, so a chat turn only appends the new ones
+    indexed_messages = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'django"."plan_search_index'
+
+
+class CompressionDictionary(models.Model):
+    """zstd dictionary trained on a sample of conversations (see plans.archive)."""
+    data = models.BinaryField()
+    dict_id = models.PositiveBigIntegerField()  # zstd's own id, recorded in every frame it compresses
+    sample_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'django"."plan_archive_dictionary'
+
+
+class ArchivedConversation(models.Model):
+    """
+    Cold copy of an old plan's conversation: its JSON as one zstd frame,
+    compressed against `dictionary` when set. Written and read by
+    plans.archive.
+    """
+    plan = models.OneToOneField(Plan, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    data = models.BinaryField()
+    dictionary = models.ForeignKey(CompressionDictionary, null=True, blank=True, on_delete=models.PROTECT)
+    message_count = models.PositiveIntegerField()
+    raw_size = models.PositiveIntegerField()  # bytes of JSON before compression
+
+    class Meta:
+        db_table = 'django"."plan_archive'
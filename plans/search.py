@@ -0,0 +1,157 @@
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField,
+)
+from django.db.models import Case, F, Func, TextField, Value, When
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from .archive import conversations
+from .models import Plan, PlanSearchIndex
+
+SEARCH_CONFIG = 'english'
+
+
+def conversation_text(conversation):
+    return "\n".join(
+        str(message.get("content", "")) for message in conversation or [] if isinstance(message, dict)
+    )
+
+
+def _search_vector():
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('notes', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def _refresh_vectors(plan_ids):
+    """Recompute the search vectors of the given plans from the stored columns."""
+    PlanSearchIndex.objects.filter(plan_id__in=plan_ids).update(search_vector=_search_vector())
+
+
+def index_plans(plans):
+    """
+    Upsert the search documents for `plans` in a constant number of queries,
+    whatever the number of plans.
+    """
+    plans = list(plans)
+    if not plans:
+        return
+
+    plan_ids = [plan.id for plan in plans]
+    # Imported here: classes depends on plans, not the other way round
+    from classes.models import SavedClass
+    notes = dict(SavedClass.objects.filter(plan_id__in=plan_ids).values_list('plan_id', 'notes'))
+    texts = conversations(plans)
+
+    PlanSearchIndex.objects.bulk_create(
+        [
+            PlanSearchIndex(
+                plan_id=plan.id,
+                user_id=plan.user_id,
+                title=plan.title,
+                body=conversation_text(texts[plan.id]),
+                notes=notes.get(plan.id) or '',
+                indexed_messages=len(texts[plan.id] or []),
+            )
+            for plan in plans
+        ],
+        update_conflicts=True,
+        unique_fields=['plan'],
+        update_fields=['user', 'title', 'body', 'notes', 'indexed_messages', 'updated_at'],
+    )
+    _refresh_vectors(plan_ids)
+
+
+def index_new_messages(plan):
+    """
+    Add the messages appended to `plan` since it was last indexed, in two
+    queries whose cost doesn't grow with the conversation: the new text is
+    appended to body and its vector concatenated to search_vector. Anything
+    other than an append (a plan never indexed, a shorter conversation)
+    falls back to index_plans().
+    """
+    indexed = (
+        PlanSearchIndex.objects.filter(plan_id=plan.id).values_list('indexed_messages', flat=True).first()
+    )
+    conversation = plan.conversation or []
+    if indexed is None or plan.archived_at is not None or indexed > len(conversation):
+        index_plans([plan])
+        return
+    if indexed == len(conversation):
+        return
+
+    text = conversation_text(conversation[indexed:])
+    separator = '\n' if indexed else ''
+    # Conditional on the count read above, so a concurrent turn can't be appended twice
+    updated = PlanSearchIndex.objects.filter(plan_id=plan.id, indexed_messages=indexed).update(
+        body=Concat(F('body'), Value(separator + text), output_field=TextField()),
+        search_vector=Func(
+            Coalesce(F('search_vector'), Value('', output_field=SearchVectorField())),
+            SearchVector(Value(text), weight='C', config=SEARCH_CONFIG),
+            template='%(expressions)s', arg_joiner=' || ', output_field=SearchVectorField(),
+        ),
+        indexed_messages=len(conversation),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        index_plans([plan])
+
+
+def update_indexed_text(field, values):
+    """
+    Set one text column ('title' or 'notes') of many index rows in a single
+    UPDATE, for writes that bypass signals (bulk_create / bulk_update).
+    `values` maps plan id to the new text.
+    """
+    if not values:
+        return
+    whens = [When(plan_id=plan_id, then=Value(text or '')) for plan_id, text in values.items()]
+    updated = PlanSearchIndex.objects.filter(plan_id__in=list(values)).update(
+        **{field: Case(*whens, output_field=TextField())}
+    )
+    if updated:
+        _refresh_vectors(list(values))
+
+
+def update_plan_notes(plan_id, notes):
+    update_indexed_text('notes', {plan_id: notes})
+
+
+def search_plans(user, query):
+    """
+    Ranked search over the user's plan titles, messages and class notes.
+    Returns a sliceable of dicts with plan_id, title, snippet and rank.
+    """
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return (
+        PlanSearchIndex.objects
+        .filter(user=user, search_vector=search_query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            snippet=SearchHeadline(
+                'body', search_query, config=SEARCH_CONFIG,
+                start_sel='<b>', stop_sel='</b>', max_words=30, min_words=10,
+            ),
+        )
+        .order_by('-rank', '-plan_id')
+        .values('plan_id', 'title', 'snippet', 'rank')
+    )
+
+
+def rebuild_index(chunk_size=500):
+    """Reindex every plan, chunk by chunk. Returns the number of plans indexed."""
+    total = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            Plan.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'user_id', 'title', 'conversation', 'archived_at')[:chunk_size]
+        )
+        if not chunk:
+            return total
+        index_plans(chunk)
+        total += len(chunk)
+        last_id = chunk[-1].id
@@ -19,3 +19,9 @@ class PlanSummarySerializer(serializers.ModelSerializer):
         model = Plan
         fields = ['id', 'title', 'is_saved', 'pinned_date', 'created_at', 'updated_at']
 
+
+class PlanSearchResultSerializer(serializers.Serializer):
+    plan_id = serializers.IntegerField()
+    title = serializers.CharField()
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
@@ -0,0 +1,37 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from classes.models import SavedClass
+from .models import Plan
+from .search import index_new_messages, index_plans, update_plan_notes
+
+INDEXED_PLAN_FIELDS = {'title', 'conversation', 'user'}
+
+
+@receiver(post_save, sender=Plan)
+def index_plan_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        update_fields = set(update_fields)
+        if not INDEXED_PLAN_FIELDS & update_fields:
+            return
+        # A chat turn: only the new messages need indexing
+        if INDEXED_PLAN_FIELDS & update_fields == {'conversation'}:
+            index_new_messages(instance)
+            return
+    index_plans([instance])
+
+
+@receiver(post_save, sender=SavedClass)
+def index_notes_on_save(sender, instance, **kwargs):
+    update_plan_notes(instance.plan_id, instance.notes)
+
+
+@receiver(post_delete, sender=SavedClass)
+def unindex_notes_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleted in a cascade (from its plan or its user): the plan and its index
+    # row go in the same delete, so there is nothing to clear
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not SavedClass:
+        return
+    update_plan_notes(instance.plan_id, '')
@@ -0,0 +1,208 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.json import KT
+from django.db.models.functions import Left
+from django.utils import timezone
+
+from .archive import DEFAULT_TITLE, plan_conversation
+from .functions import JSONArrayLength
+from .models import Plan
+from .search import update_indexed_text
+from ai.agent import generate_titles, summarize_conversation
+from ai.models import TokenUsage
+from ai.usage import TokenUsageCallback, record_usage
+
+logger = logging.getLogger(__name__)
+
+
+# --- Rolling summaries ---
+# A chat turn that leaves more than PLAN_SUMMARY_TRIGGER messages unsummarized
+# sets summary_due_at; a worker (manage.py refresh_plan_summaries) folds them
+# into the summary one plan at a time, and meters each call like a chat run.
+
+# A plan whose refresh failed is tried again after this long
+SUMMARY_RETRY_DELAY = timedelta(minutes=5)
+
+
+def needs_summary(plan):
+    return len(plan.conversation) - plan.summary_upto > settings.PLAN_SUMMARY_TRIGGER
+
+
+def refresh_plan_summary(plan_id):
+    """Fold the turns since the last summary (minus the recent tail) into it. Returns True if it moved."""
+    plan = Plan.objects.select_related('user', 'archive').get(id=plan_id)
+    conversation = plan_conversation(plan)
+    # Only advance if no other worker moved the summary in the meantime.
+    # update() leaves conversation and updated_at untouched.
+    unchanged = Plan.objects.filter(id=plan_id, summary_upto=plan.summary_upto)
+
+    cutoff = len(conversation) - settings.PLAN_SUMMARY_KEEP_RECENT
+    if cutoff <= plan.summary_upto:
+        unchanged.update(summary_due_at=None)
+        return False
+
+    usage = TokenUsageCallback()
+    started = time.monotonic()
+    try:
+        summary = summarize_conversation(plan.summary, conversation[plan.summary_upto:cutoff], callbacks=[usage])
+    finally:
+        # Spent on the user's behalf, so it counts against their quota
+        record_usage(plan.user, plan, None, usage, int((time.monotonic() - started) * 1000))
+
+    return bool(unchanged.update(summary=summary, summary_upto=cutoff, summary_due_at=None))
+
+
+def due_summaries(limit):
+    return list(
+        Plan.objects.filter(summary_due_at__lte=timezone.now())
+        .order_by('summary_due_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def run_summary_worker(batch_size=50, max_batches=None, idle_sleep=30, stdout=None):
+    """
+    Refresh due summaries, longest waiting first. A plan whose refresh fails
+    is put back for SUMMARY_RETRY_DELAY, so it can't hold up the others.
+    Stops after `max_batches`, or when idle if `idle_sleep` is None.
+    """
+    batches = refreshed = 0
+
+    while max_batches is None or batches < max_batches:
+        plan_ids = due_summaries(batch_size)
+        for plan_id in plan_ids:
+            try:
+                refreshed += refresh_plan_summary(plan_id)
+            except Exception:
+                logger.exception("Failed to refresh summary for plan %s", plan_id)
+                Plan.objects.filter(id=plan_id).update(summary_due_at=timezone.now() + SUMMARY_RETRY_DELAY)
+        batches += 1
+        if stdout and plan_ids:
+            stdout.write(f"Refreshed {refreshed} summaries")
+
+        if not plan_ids:
+            if idle_sleep is None:
+                break
+            time.sleep(idle_sleep)
+    return refreshed
+
+
+# --- Background titles ---
+# Plans are created as "Untitled Plan"; once the first exchange is in, a
+# worker (manage.py generate_plan_titles) titles them several per LLM call.
+# A plan nothing can be made of (the model skipped it and the question has
+# no words) is marked title_attempted and keeps its default title.
+
+TITLE_EXCERPT_CHARS = 400
+
+
+def untitled_plans(limit):
+    """
+    {plan_id: excerpt} for up to `limit` untitled plans with at least one
+    exchange. Only the first question and answer are read, cut down in the
+    database, never the whole conversation.
+    """
+    rows = (
+        Plan.objects
+        .filter(title=DEFAULT_TITLE, title_attempted=False)
+        .annotate(
+            message_count=JSONArrayLength('conversation'),
+            question=Left(KT('conversation__0__content'), TITLE_EXCERPT_CHARS),
+            answer=Left(KT('conversation__1__content'), TITLE_EXCERPT_CHARS),
+        )
+        .filter(message_count__gte=2)
+        .order_by('id')
+        .values_list('id', 'question', 'answer')[:limit]
+    )
+    return {plan_id: f"User: {question}\nAssistant: {answer}" for plan_id, question, answer in rows}
+
+
+def fallback_title(excerpt):
+    """
+    First words of the user's question, for plans the model gave no title
+    for; '' when the question has no words.
+    """
+    question = excerpt.split('\n', 1)[0].removeprefix('User: ')
+    words = question.split()
+    title = ' '.join(words[:6]).rstrip('?.!,')
+    if not any(char.isalnum() for char in title):
+        return ''
+    return title + ('...' if len(words) > 6 else '')
+
+
+def title_batch(batch_size):
+    """Title one batch of untitled plans. Returns the number of plans retitled."""
+    excerpts = untitled_plans(batch_size)
+    if not excerpts:
+        return 0
+
+    titles = generate_titles(excerpts)
+    titles = {plan_id: titles.get(plan_id) or fallback_title(text) for plan_id, text in excerpts.items()}
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Skip plans retitled by hand (or locked by a chat turn) since we read them
+        still_untitled = Plan.objects.select_for_update(skip_locked=True).filter(
+            id__in=list(titles), title=DEFAULT_TITLE,
+        ).values_list('id', flat=True)
+        plans, untitleable = [], []
+        for plan_id in still_untitled:
+            if titles[plan_id] and titles[plan_id] != DEFAULT_TITLE:
+                plans.append(Plan(id=plan_id, title=titles[plan_id], updated_at=now))
+            else:
+                untitleable.append(plan_id)
+        # updated_at moves too, so list and detail ETags see the new title
+        Plan.objects.bulk_update(plans, ['title', 'updated_at'])
+        update_indexed_text('title', {plan.id: plan.title for plan in plans})
+        Plan.objects.filter(id__in=untitleable).update(title_attempted=True)
+    return len(plans)
+
+
+def chat_is_busy():
+    """True while interactive chat traffic is above PLAN_TITLE_BUSY_RUNS_PER_MINUTE."""
+    since = timezone.now() - timedelta(minutes=1)
+    recent_runs = TokenUsage.objects.filter(created_at__gte=since).count()
+    return recent_runs >= settings.PLAN_TITLE_BUSY_RUNS_PER_MINUTE
+
+
+def run_title_worker(batch_size=None, max_batches=None, idle_sleep=30, stdout=None):
+    """
+    Title untitled plans batch after batch. Model calls are spaced to stay
+    under PLAN_TITLE_CALLS_PER_MINUTE, and the worker backs off entirely
+    while chat traffic is busy, so it never competes with users for quota.
+    Stops after `max_batches`, or when idle if `idle_sleep` is None.
+    """
+    batch_size = batch_size or settings.PLAN_TITLE_BATCH_SIZE
+    interval = 60 / settings.PLAN_TITLE_CALLS_PER_MINUTE
+    batches = titled = 0
+
+    while max_batches is None or batches < max_batches:
+        if chat_is_busy():
+            logger.info("Chat traffic is busy, pausing title generation")
+            time.sleep(interval)
+            continue
+
+        started = time.monotonic()
+        try:
+            count = title_batch(batch_size)
+            # Plans that couldn't be titled leave the queue too, so look before idling
+            idle = count == 0 and not untitled_plans(1)
+        except Exception:
+            logger.exception("Title batch failed")
+            count, idle = 0, True
+        batches += 1
+        titled += count
+        if stdout and count:
+            stdout.write(f"Titled {count} plans")
+
+        if idle:
+            if idle_sleep is None:
+                break
+            time.sleep(idle_sleep)
+        else:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    return titled
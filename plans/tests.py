@@ -0,0 +1,522 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+import orjson
+import zstandard
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from google.api_core.exceptions import InternalServerError
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ai.models import DailyTokenUsage, TokenUsage
+from ai.usage import TokenUsageCallback
+from classes.models import SavedClass
+from utils.testing import QueryBudgetTestCase, asgi_get
+
+from .archive import archive_batch, compressor
+from .cleanup import purge_empty_plans, purgeable_plans
+from .models import ArchivedConversation, Plan, PlanSearchIndex
+from .search import search_plans
+from .tasks import (
+    fallback_title, needs_summary, refresh_plan_summary, run_summary_worker, run_title_worker, title_batch,
+    untitled_plans,
+)
+
+
+def turn(text):
+    return [{"role": "user", "content": f"question about {text}"}, {"role": "assistant", "content": f"answer on {text}"}]
+
+
+def archive(*plans):
+    """Archive `plans` now, as manage.py archive_conversations does once they are old enough."""
+    return archive_batch([plan.id for plan in plans], timezone.now() + timedelta(days=1), compressor())
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.plan = Plan.objects.create(user=self.user, title="Passing drills", conversation=turn("rondos"))
+
+    def add_turn(self, text):
+        self.plan.conversation.extend(turn(text))
+        self.plan.save(update_fields=['conversation', 'archived_at', 'updated_at'])
+
+    def found(self, query):
+        return [row['plan_id'] for row in search_plans(self.user, query)]
+
+    def test_chat_turn_appends_only_new_messages(self):
+        self.add_turn("overlaps")
+        index = PlanSearchIndex.objects.get(plan=self.plan)
+        self.assertEqual(index.indexed_messages, 4)
+        self.assertEqual(
+            index.body,
+            "question about rondos\nanswer on rondos\nquestion about overlaps\nanswer on overlaps",
+        )
+        self.assertEqual(self.found("overlaps"), [self.plan.id])
+        self.assertEqual(self.found("rondos"), [self.plan.id])
+
+    def test_chat_turn_cost_does_not_grow_with_conversation(self):
+        def turn_queries(text):
+            with CaptureQueriesContext(connection) as queries:
+                self.add_turn(text)
+            return len(queries)
+
+        first = turn_queries("pressing")
+        for index in range(50):
+            self.add_turn(f"topic{index}")
+        self.assertEqual(turn_queries("counters"), first)
+        self.assertEqual(self.found("counters"), [self.plan.id])
+
+    def test_shortened_conversation_is_reindexed_in_full(self):
+        self.plan.conversation = turn("finishing")[:1]
+        self.plan.save(update_fields=['conversation', 'updated_at'])
+        index = PlanSearchIndex.objects.get(plan=self.plan)
+        self.assertEqual(index.indexed_messages, 1)
+        self.assertEqual(self.found("rondos"), [])
+        self.assertEqual(self.found("finishing"), [self.plan.id])
+
+    def test_title_change_reindexes(self):
+        self.plan.title = "Set pieces"
+        self.plan.save(update_fields=['title', 'updated_at'])
+        self.assertEqual(self.found("pieces"), [self.plan.id])
+
+
+class ChatBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.plan = Plan.objects.create(user=self.user, title="Passing drills", conversation=turn("rondos"))
+
+    def test_new_chat(self):
+        created = self.assertWithinBudget('post', '/api/chats/new/', status=201)
+        reused = self.assertWithinBudget('post', '/api/chats/new/', status=200)
+        self.assertEqual(created.json()['id'], reused.json()['id'])
+
+    def test_send_message(self):
+        self.assertWithinBudget('post', f'/api/chats/{self.plan.id}/send/', {'message': 'next drill?'}, status=200)
+        self.assertWithinBudget(
+            'post', f'/api/chats/{self.plan.id}/send/', {'message': 'and after?'},
+            headers={'Idempotency-Key': 'send-1'}, status=200,
+        )
+
+    def test_send_to_latest_plan(self):
+        self.assertWithinBudget('post', '/api/chats/', {'message': 'thanks'}, status=200)
+
+    def test_reads(self):
+        for path in (
+            '/api/chats/',
+            '/api/chats/last/',
+            f'/api/chats/{self.plan.id}/',
+            f'/api/chats/{self.plan.id}/messages/?since=0&limit=1',
+            '/api/chats/all/',
+            '/api/chats/recent-messages/',
+            '/api/chats/search/?q=rondos',
+        ):
+            with self.subTest(path=path):
+                self.assertWithinBudget('get', path, status=200)
+
+
+class ChatUsageTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.plan = Plan.objects.create(user=self.user, title="Passing drills", conversation=turn("rondos"))
+
+    def test_over_quota_is_refused_before_the_model_call(self):
+        # A user on trial gets the standard allowance
+        DailyTokenUsage.objects.create(
+            user=self.user, date=timezone.localdate(), prompt_tokens=settings.AI_DAILY_TOKEN_QUOTAS['standard'], runs=1,
+        )
+        with mock.patch('plans.views.agenerate_ai_response') as generate:
+            self.assertWithinBudget('post', f'/api/chats/{self.plan.id}/send/', {'message': 'next drill?'}, status=429)
+            self.assertWithinBudget('post', '/api/chats/', {'message': 'next drill?'}, status=429)
+        generate.assert_not_called()
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.conversation, turn("rondos"))
+
+    def test_failed_run_still_counts_its_tokens(self):
+        async def fail_after_spending(message, callbacks, **kwargs):
+            reply = AIMessage(content="", usage_metadata={'input_tokens': 120, 'output_tokens': 30, 'total_tokens': 150})
+            for callback in callbacks:
+                if isinstance(callback, TokenUsageCallback):
+                    callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=reply)]]))
+            raise InternalServerError("model down")
+
+        with mock.patch('plans.views.agenerate_ai_response', fail_after_spending), self.assertRaises(InternalServerError):
+            self.client.post(
+                f'/api/chats/{self.plan.id}/send/', {'message': 'next drill?'}, content_type='application/json', headers=self.auth,
+            )
+
+        run = TokenUsage.objects.get(user=self.user)
+        self.assertIsNone(run.message_index)
+        self.assertEqual((run.prompt_tokens, run.completion_tokens), (120, 30))
+        self.assertEqual(DailyTokenUsage.objects.get(user=self.user).runs, 1)
+
+
+def turns(count):
+    return [message for index in range(count) for message in turn(f"topic{index}")]
+
+
+@override_settings(PLAN_SUMMARY_TRIGGER=4, PLAN_SUMMARY_KEEP_RECENT=2)
+class SummaryTests(QueryBudgetTestCase):
+    def test_chat_turn_marks_the_summary_due(self):
+        plan = Plan.objects.create(user=self.user, conversation=turns(1))
+        self.assertFalse(needs_summary(plan))
+        self.assertWithinBudget('post', f'/api/chats/{plan.id}/send/', {'message': 'next drill?'}, status=200)
+        plan.refresh_from_db()
+        self.assertIsNone(plan.summary_due_at)
+
+        self.assertWithinBudget('post', f'/api/chats/{plan.id}/send/', {'message': 'and after?'}, status=200)
+        plan.refresh_from_db()
+        self.assertTrue(needs_summary(plan))
+        self.assertIsNotNone(plan.summary_due_at)
+
+    def test_refresh_folds_all_but_the_recent_turns_and_meters_the_call(self):
+        plan = Plan.objects.create(user=self.user, conversation=turns(4), summary_due_at=timezone.now())
+        self.assertTrue(refresh_plan_summary(plan.id))
+
+        plan.refresh_from_db()
+        self.assertEqual(plan.summary_upto, 6)
+        self.assertTrue(plan.summary)
+        self.assertIsNone(plan.summary_due_at)
+        run = TokenUsage.objects.get(user=self.user, plan=plan)
+        self.assertGreater(run.prompt_tokens, 0)
+        self.assertEqual(DailyTokenUsage.objects.get(user=self.user).runs, 1)
+
+        # Nothing new to fold
+        self.assertFalse(refresh_plan_summary(plan.id))
+
+    def test_refresh_loses_to_a_concurrent_one(self):
+        plan = Plan.objects.create(user=self.user, conversation=turns(4), summary_due_at=timezone.now())
+
+        def overtaken(summary, messages, callbacks):
+            Plan.objects.filter(id=plan.id).update(summary="theirs", summary_upto=6, summary_due_at=None)
+            return "ours"
+
+        with mock.patch('plans.tasks.summarize_conversation', overtaken):
+            self.assertFalse(refresh_plan_summary(plan.id))
+        plan.refresh_from_db()
+        self.assertEqual((plan.summary, plan.summary_upto), ("theirs", 6))
+
+    def test_worker_puts_a_failing_plan_back(self):
+        failing = Plan.objects.create(user=self.user, conversation=turns(4), summary_due_at=timezone.now())
+        due = Plan.objects.create(user=self.user, conversation=turns(4), summary_due_at=timezone.now())
+        not_due = Plan.objects.create(user=self.user, conversation=turns(4))
+        real_refresh = refresh_plan_summary
+
+        def refresh(plan_id):
+            if plan_id == failing.id:
+                raise InternalServerError("model down")
+            return real_refresh(plan_id)
+
+        with mock.patch('plans.tasks.refresh_plan_summary', refresh):
+            self.assertEqual(run_summary_worker(idle_sleep=None), 1)
+
+        failing.refresh_from_db()
+        self.assertGreater(failing.summary_due_at, timezone.now())
+        self.assertEqual(Plan.objects.get(id=due.id).summary_upto, 6)
+        self.assertEqual(Plan.objects.get(id=not_due.id).summary_upto, 0)
+
+
+def question(text):
+    return [{"role": "user", "content": text}, {"role": "assistant", "content": "Happy to help."}]
+
+
+class TitleTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+
+    def test_fallback_is_the_opening_words_of_the_question(self):
+        self.assertEqual(fallback_title("User: Rondo ideas?\nAssistant: Try 4v2."), "Rondo ideas")
+        self.assertEqual(
+            fallback_title("User: How do I coach a high press against a back three?\nAssistant: ..."),
+            "How do I coach a high...",
+        )
+        self.assertEqual(fallback_title("User: ?? !!\nAssistant: Could you say more?"), "")
+        self.assertEqual(fallback_title("User:    \nAssistant: Hello!"), "")
+
+    def test_batch_titles_plans_and_retires_the_ones_it_cannot(self):
+        titled = Plan.objects.create(user=self.user, conversation=question("Rondo ideas for U10s?"))
+        fallback = Plan.objects.create(user=self.user, conversation=question("Warm-up for a cold morning"))
+        wordless = Plan.objects.create(user=self.user, conversation=question("???"))
+        echoed = Plan.objects.create(user=self.user, conversation=question("..."))
+        renamed = Plan.objects.create(user=self.user, conversation=question("Set pieces"))
+        Plan.objects.create(user=self.user)
+
+        def generate(excerpts):
+            self.assertEqual(set(excerpts), {titled.id, fallback.id, wordless.id, echoed.id, renamed.id})
+            # The user renames one while the model is working
+            Plan.objects.filter(id=renamed.id).update(title="Corners")
+            return {titled.id: "Rondos for U10s", echoed.id: "Untitled Plan", renamed.id: "Set pieces"}
+
+        with mock.patch('plans.tasks.generate_titles', generate):
+            self.assertEqual(title_batch(10), 2)
+
+        titles = dict(Plan.objects.values_list('id', 'title'))
+        self.assertEqual(titles[titled.id], "Rondos for U10s")
+        self.assertEqual(titles[fallback.id], "Warm-up for a cold morning")
+        self.assertEqual(titles[renamed.id], "Corners")
+        for plan in (wordless, echoed):
+            plan.refresh_from_db()
+            self.assertEqual(plan.title, "Untitled Plan")
+            self.assertTrue(plan.title_attempted)
+        self.assertEqual(PlanSearchIndex.objects.get(plan=titled).title, "Rondos for U10s")
+
+        # Nothing left to title: the model isn't asked again
+        with mock.patch('plans.tasks.generate_titles') as generate_titles:
+            self.assertEqual(title_batch(10), 0)
+        generate_titles.assert_not_called()
+        self.assertEqual(untitled_plans(10), {})
+
+    @override_settings(PLAN_TITLE_CALLS_PER_MINUTE=6000)
+    def test_worker_gets_past_batches_it_cannot_title(self):
+        for _ in range(3):
+            Plan.objects.create(user=self.user, conversation=question("?"))
+        good = Plan.objects.create(user=self.user, conversation=question("Passing patterns"))
+
+        with mock.patch('plans.tasks.generate_titles', return_value={}) as generate_titles:
+            self.assertEqual(run_title_worker(batch_size=2, max_batches=5, idle_sleep=None), 1)
+        self.assertEqual(generate_titles.call_count, 2)
+        self.assertEqual(Plan.objects.get(id=good.id).title, "Passing patterns")
+
+
+class ArchiveTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.plan = Plan.objects.create(user=self.user, title="Passing drills", conversation=turns(2))
+
+    def get(self, path, headers=None, status=200):
+        return self.assertWithinBudget('get', path, headers=headers, status=status)
+
+    def test_archived_plan_reads_the_same(self):
+        detail = self.get(f'/api/chats/{self.plan.id}/')
+        self.assertEqual(len(archive(self.plan)), 1)
+
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.conversation, [])
+        self.assertIsNotNone(self.plan.archived_at)
+        self.assertEqual(self.plan.archive.message_count, 4)
+
+        # Same content, same ETag: clients holding it get a 304
+        self.assertEqual(self.get(f'/api/chats/{self.plan.id}/').json(), detail.json())
+        self.get(f'/api/chats/{self.plan.id}/', headers={'If-None-Match': detail['ETag']}, status=304)
+
+        page = self.get(f'/api/chats/{self.plan.id}/messages/?since=1&limit=2').json()
+        self.assertEqual(page['message_count'], 4)
+        self.assertEqual([message['content'] for message in page['messages']], [
+            "answer on topic0", "question about topic1",
+        ])
+
+        export = b''.join(self.client.get('/api/chats/export/', headers=self.auth).streaming_content)
+        plan_line = orjson.loads(export.splitlines()[1])
+        self.assertEqual(plan_line['conversation'], turns(2))
+
+        # The search index keeps the text
+        self.assertEqual([row['plan_id'] for row in search_plans(self.user, "topic1")], [self.plan.id])
+
+    def test_chat_turn_restores_an_archived_plan(self):
+        archive(self.plan)
+        self.assertWithinBudget('post', f'/api/chats/{self.plan.id}/send/', {'message': 'next drill?'}, status=200)
+
+        self.plan.refresh_from_db()
+        self.assertIsNone(self.plan.archived_at)
+        self.assertEqual(self.plan.conversation[:4], turns(2))
+        self.assertEqual(len(self.plan.conversation), 6)
+        self.assertFalse(ArchivedConversation.objects.filter(plan=self.plan).exists())
+
+    def test_chat_turn_overtaking_an_archive_wins(self):
+        async def reply(message, history=None, summary=None, callbacks=None):
+            # The archiver empties the plan while the model is answering
+            await sync_to_async(archive)(self.plan)
+            return "Try a 4v2 rondo."
+
+        with mock.patch('plans.views.agenerate_ai_response', reply):
+            self.assertWithinBudget('post', f'/api/chats/{self.plan.id}/send/', {'message': 'next drill?'}, status=200)
+
+        self.plan.refresh_from_db()
+        self.assertIsNone(self.plan.archived_at)
+        self.assertEqual(len(self.plan.conversation), 6)
+        # Left behind by the overtaken archive, and ignored by reads
+        stale = ArchivedConversation.objects.get(plan=self.plan)
+        self.assertEqual(stale.message_count, 4)
+        self.assertEqual(len(self.get(f'/api/chats/{self.plan.id}/').json()['conversation']), 6)
+        self.assertEqual(self.get(f'/api/chats/{self.plan.id}/messages/').json()['message_count'], 6)
+
+        # The next archive replaces it
+        self.assertEqual(len(archive(self.plan)), 1)
+        self.assertEqual(ArchivedConversation.objects.get(plan=self.plan).message_count, 6)
+        conversation = self.get(f'/api/chats/{self.plan.id}/').json()['conversation']
+        self.assertEqual(conversation[-1]['content'], "Try a 4v2 rondo.")
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.cutoff = timezone.now() - timedelta(days=1)
+
+    def plans(self, count, user=None, **fields):
+        return [Plan.objects.create(user=user or self.user, **fields) for _ in range(count)]
+
+    def age(self, *plans):
+        # update() leaves auto_now alone
+        Plan.objects.filter(id__in=[plan.id for plan in plans]).update(updated_at=self.cutoff - timedelta(hours=1))
+
+    def remaining(self):
+        return set(Plan.objects.values_list('id', flat=True))
+
+    def test_purges_only_old_empty_plans(self):
+        empty = self.plans(2)
+        archived, = self.plans(1, conversation=turns(1), title_attempted=True)
+        self.assertEqual(len(archive(archived)), 1)
+        renamed, = self.plans(1, title="Corners")
+        saved, = self.plans(1)
+        SavedClass.objects.create(user=self.user, plan=saved, title="Tuesday session")
+        with_messages, = self.plans(1, conversation=turns(1))
+        fresh, = self.plans(1)
+        latest, = self.plans(1)
+        self.age(*empty, archived, renamed, saved, with_messages, latest)
+
+        other = get_user_model().objects.create_user('other', 'other@example.com', 'pw-123456')
+        other_old, other_latest = self.plans(2, user=other)
+        self.age(other_old, other_latest)
+
+        kept = self.remaining() - {plan.id for plan in (*empty, other_old)}
+        self.assertEqual(purgeable_plans(self.cutoff).count(), 3)
+        stats = purge_empty_plans(self.cutoff)
+        self.assertEqual((stats['deleted'], stats['users'], stats['chunks']), (3, 2, 1))
+        self.assertEqual(self.remaining(), kept)
+        self.assertEqual(purge_empty_plans(self.cutoff)['deleted'], 0)
+
+    def test_purges_in_chunks_up_to_the_limit(self):
+        empty = self.plans(5)
+        latest, = self.plans(1)
+        self.age(*empty, latest)
+
+        stats = purge_empty_plans(self.cutoff, chunk_size=2, limit=3)
+        self.assertEqual((stats['deleted'], stats['chunks']), (3, 2))
+        self.assertEqual(self.remaining(), {plan.id for plan in (*empty[3:], latest)})
+
+        stats = purge_empty_plans(self.cutoff, chunk_size=2)
+        self.assertEqual((stats['deleted'], stats['chunks']), (2, 1))
+        self.assertEqual(self.remaining(), {latest.id})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/chats/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_streams_every_plan_and_class(self):
+        hot = Plan.objects.create(user=self.user, title="Passing drills", conversation=turn("rondos"))
+        cold = Plan.objects.create(user=self.user, title="Set pieces", conversation=turn("corners"))
+        self.assertEqual(len(archive(cold)), 1)
+        SavedClass.objects.create(user=self.user, plan=hot, title="Tuesday session", notes="bring cones")
+        other = get_user_model().objects.create_user('other', 'other@example.com', 'pw-123456')
+        Plan.objects.create(user=other, title="Not mine", conversation=turn("secrets"))
+
+        lines = [orjson.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['user', 'plan', 'plan', 'saved_class'])
+        self.assertEqual(lines[0]['email'], 'coach@example.com')
+        self.assertEqual([(line['id'], line['conversation']) for line in lines[1:3]], [
+            (hot.id, turn("rondos")),
+            (cold.id, turn("corners")),
+        ])
+        self.assertEqual((lines[3]['plan_id'], lines[3]['notes']), (hot.id, "bring cones"))
+
+    def test_zstd_export_holds_the_same_lines(self):
+        for index in range(30):
+            Plan.objects.create(user=self.user, title=f"Session {index}", conversation=turns(20))
+
+        plain = self.export().splitlines()
+        compressed = self.export('?compress=zstd')
+        lines = zstandard.ZstdDecompressor().decompressobj().decompress(compressed).splitlines()
+        self.assertLess(len(compressed), len(b''.join(plain)))
+        # Only the user line's exported_at differs
+        self.assertEqual(lines[1:], plain[1:])
+        self.assertEqual(len(lines), 31)
+
+    def test_asgi_streams_chunk_by_chunk(self):
+        for index in range(30):
+            Plan.objects.create(user=self.user, title=f"Session {index}", conversation=turns(20))
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        response, body = asgi_get('/api/chats/export/?compress=zstd', headers)
+        self.assertEqual(response.status_code, 200)
+        # An async iterator: Django doesn't list() it before sending
+        self.assertTrue(response.is_async)
+        lines = zstandard.ZstdDecompressor().decompressobj().decompress(body).splitlines()
+        self.assertEqual(lines[1:], self.export().splitlines()[1:])
+
+
+def timed_turns(count, start=datetime(2025, 8, 31, 18, 0, tzinfo=dt_timezone.utc)):
+    """`count` exchanges, a minute apart, with created_at timestamps as chat turns store them."""
+    messages = []
+    for index, message in enumerate(turns(count)):
+        messages.append({**message, "created_at": (start + timedelta(minutes=index)).isoformat()})
+    return messages
+
+
+class MessagePagingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plan = Plan.objects.create(user=self.user, title="Passing drills", conversation=timed_turns(5))
+
+    def page(self, query):
+        response = self.client.get(f'/api/chats/{self.plan.id}/messages/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return [message['index'] for message in body['messages']], body
+
+    def test_since_pages_forwards(self):
+        indexes, body = self.page('since=0&limit=4')
+        self.assertEqual(indexes, [0, 1, 2, 3])
+        self.assertEqual((body['next_cursor'], body['has_more'], body['message_count']), (4, True, 10))
+        self.assertEqual(body['messages'][0]['content'], "question about topic0")
+
+        indexes, body = self.page('since=8&limit=4')
+        self.assertEqual(indexes, [8, 9])
+        self.assertEqual((body['next_cursor'], body['has_more']), (10, False))
+
+        # Polling with the cursor while nothing is new
+        indexes, body = self.page('since=10')
+        self.assertEqual(indexes, [])
+        self.assertEqual((body['next_cursor'], body['has_more']), (10, False))
+
+    def test_before_pages_backwards(self):
+        indexes, body = self.page('before=6&limit=4')
+        self.assertEqual(indexes, [2, 3, 4, 5])
+        self.assertEqual((body['previous_cursor'], body['next_cursor'], body['has_more']), (2, 6, True))
+
+        indexes, body = self.page('before=2&limit=4')
+        self.assertEqual(indexes, [0, 1])
+        self.assertFalse(body['has_more'])
+
+        # Past the end means from the end
+        indexes, body = self.page('before=50&limit=3')
+        self.assertEqual(indexes, [7, 8, 9])
+
+    def test_after_filters_on_timestamps(self):
+        indexes, body = self.page('after=2025-08-31T18:06:30%2B00:00')
+        self.assertEqual(indexes, [7, 8, 9])
+        # Naive times are in the server's time zone (UTC+6)
+        self.assertEqual(self.page('after=2025-09-01T00:06:30&limit=2')[0], [7, 8])
+
+    def test_bad_parameters(self):
+        for query in ('since=x', 'before=1.5', 'after=yesterday'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/chats/{self.plan.id}/messages/?{query}')
+                self.assertEqual(response.status_code, 400)
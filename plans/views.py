@@ -1,56 +1,191 @@
 # --- IMPORTS ---
+import hashlib
+import time
+from datetime import timezone as dt_timezone
+
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.db import connections
 from django.utils import timezone
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_datetime
 from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.db.models import Case, F, IntegerField, When
 from .models import Plan
+from .functions import JSONArrayLength
+from .archive import aplan_conversation, restore
+from .cleanup import reuse_empty_plan
+from .conversation import fetch_messages
+from .tasks import needs_summary
+from .search import search_plans
+from .export import export_chunks
+from idempotency.decorators import idempotent
 from payments.utils import has_active_subscription_or_trial
+from utils.queries import query_budget
+from utils.async_views import AsyncAPIView, async_api_view, async_condition
+from utils.streaming import streaming_content
 
 from .serializers import (
     PlanSerializer, 
     PlanSummarySerializer, 
     ChatMessageSerializer,
+    PlanSearchResultSerializer,
 )
-from ai.agent import generate_ai_response
+from ai.agent import agenerate_ai_response
+from ai.usage import TokenUsageCallback, record_usage, has_remaining_quota
+from ai.tracing import TraceCallback, save_trace
+
+
+QUOTA_EXCEEDED_ERROR = "You have reached your daily AI usage limit. Please try again tomorrow or upgrade your plan."
+
+
+def _finish_chat_turn(user, plan, usage, trace, latency_ms):
+    # Sync bookkeeping after a turn, run in one sync_to_async hop
+    record_usage(user, plan, len(plan.conversation) - 1, usage, latency_ms)
+    save_trace(trace, user, plan, len(plan.conversation) - 1)
+
+
+def _fail_chat_turn(user, plan, usage, trace, latency_ms):
+    # Attempts that ended in an error still spent tokens, and count against the quota
+    record_usage(user, plan, None, usage, latency_ms)
+    save_trace(trace, user, plan)
+
+
+def _release_connections():
+    # Hand the pooled connections (primary and replica) back, except inside a
+    # transaction (tests run in one); the next query checks one out again
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+async def _run_chat_turn(user, plan, message):
+    """Append the user message and the AI reply to the plan, and meter the run."""
+    if plan.archived_at is not None:
+        await sync_to_async(restore)(plan)
+
+    # The model sees the rolling summary plus only the turns it doesn't cover yet
+    history = plan.conversation[plan.summary_upto:]
+    plan.conversation.append({"role": "user", "content": message, "created_at": timezone.now().isoformat()})
+
+    # The request's sync thread would otherwise keep its connection for the
+    # whole model call, capping a worker's concurrent chats at DB_POOL_MAX_SIZE
+    await sync_to_async(_release_connections)()
+
+    usage = TokenUsageCallback()
+    trace = TraceCallback()
+    started = time.monotonic()
+    try:
+        ai_response = await agenerate_ai_response(message, history=history, summary=plan.summary, callbacks=[usage, trace])
+    except Exception:
+        latency_ms = int((time.monotonic() - started) * 1000)
+        await sync_to_async(_fail_chat_turn)(user, plan, usage, trace, latency_ms)
+        raise
+    latency_ms = int((time.monotonic() - started) * 1000)
+
+    plan.conversation.append({"role": "assistant", "content": ai_response, "created_at": timezone.now().isoformat()})
+    # Leave the summary alone: the summary worker may be writing it. archived_at
+    # goes too, so this copy wins over an archive taken meanwhile
+    update_fields = ['conversation', 'archived_at', 'updated_at']
+    if plan.summary_due_at is None and needs_summary(plan):
+        plan.summary_due_at = timezone.now()
+        update_fields.append('summary_due_at')
+    await plan.asave(update_fields=update_fields)
+
+    await sync_to_async(_finish_chat_turn)(user, plan, usage, trace, latency_ms)
+    return ai_response
+
+
+# --- Conditional GET ---
+# ETags come from updated_at and the message count, read without loading the
+# conversation itself, so an unchanged plan costs one narrow query and a 304.
+# Archiving a plan changes neither.
+
+async def _plan_state(queryset):
+    return await (
+        queryset
+        .annotate(message_count=Case(
+            When(archived_at__isnull=True, then=JSONArrayLength('conversation')),
+            default=F('archive__message_count'),
+            output_field=IntegerField(),
+        ))
+        .values('id', 'updated_at', 'message_count', 'archived_at')
+        .afirst()
+    )
+
+
+def _plan_etag(state):
+    if not state:
+        return None
+    return f"plan-{state['id']}-{state['updated_at'].timestamp()}-{state['message_count']}"
+
+
+async def plan_detail_etag(request, chat_id):
+    return _plan_etag(await _plan_state(Plan.objects.filter(id=chat_id, user=request.user)))
+
+
+async def last_plan_etag(request):
+    return _plan_etag(await _plan_state(Plan.objects.filter(user=request.user).order_by('-created_at')))
+
+
+async def plan_list_etag(request):
+    rows = [
+        row async for row in
+        Plan.objects.filter(user=request.user).order_by('-created_at').values_list('id', 'updated_at')[:10]
+    ]
+    digest = hashlib.sha1(
+        ",".join(f"{plan_id}:{updated_at.timestamp()}" for plan_id, updated_at in rows).encode()
+    ).hexdigest()
+    return f"plans-{digest}"
 
 
 # --- /api/chats/new ---
+@query_budget(post=8)
 class CreateNewPlanView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        # Clicking "new chat" again on a chat with no messages yet stays on it
+        plan = reuse_empty_plan(request.user)
+        if plan is not None:
+            return Response(PlanSerializer(plan).data, status=status.HTTP_200_OK)
         plan = Plan.objects.create(user=request.user)
         serializer = PlanSerializer(plan)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 # --- /api/chats/ ---
-class ChatListCreateView(APIView):
+# Chat turns on an archived plan restore it first (3 queries)
+@query_budget(get=3, post=18)
+class ChatListCreateView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        plans = Plan.objects.filter(user=request.user).order_by('-created_at')[:10]
+    @method_decorator(async_condition(plan_list_etag))
+    async def get(self, request):
+        plans = [plan async for plan in Plan.objects.filter(user=request.user).order_by('-created_at')[:10]]
         serializer = PlanSummarySerializer(plans, many=True)
         return Response(serializer.data)
 
-    def post(self, request):
+    async def post(self, request):
         serializer = ChatMessageSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         message = serializer.validated_data['message']
         try:
-            plan = Plan.objects.filter(user=request.user).latest('created_at')
+            plan = await Plan.objects.filter(user=request.user).alatest('created_at')
         except Plan.DoesNotExist:
             return Response({"error": "No plan found. Please create a new plan first."}, status=status.HTTP_404_NOT_FOUND)
 
-        plan.conversation.append({"role": "user", "content": message})
-        ai_response = generate_ai_response(message)
-        plan.conversation.append({"role": "assistant", "content": ai_response})
-        plan.save()
+        if not await sync_to_async(has_remaining_quota)(request.user):
+            return Response({"error": QUOTA_EXCEEDED_ERROR}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        ai_response = await _run_chat_turn(request.user, plan, message)
 
         return Response({
             "message": message,
@@ -60,11 +195,13 @@ class ChatListCreateView(APIView):
 
 
 # --- GET /api/chats/last ---
-@api_view(['GET'])
+@query_budget(4)
+@async_api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def get_last_plan(request):
+@async_condition(last_plan_etag)
+async def get_last_plan(request):
     user = request.user
-    last_plan = Plan.objects.filter(user=user).order_by('-created_at').first()
+    last_plan = await Plan.objects.filter(user=user).select_related('archive').order_by('-created_at').afirst()
 
     if not last_plan:
         return Response({"detail": "No plan found."}, status=404)
@@ -72,7 +209,7 @@ def get_last_plan(request):
     return Response({
         "id": last_plan.id,
         "title": last_plan.title,
-        "conversation": last_plan.conversation,
+        "conversation": await aplan_conversation(last_plan),
         "is_saved": last_plan.is_saved,
         "pinned_date": last_plan.pinned_date,
         "created_at": last_plan.created_at,
@@ -81,18 +218,22 @@ def get_last_plan(request):
 
 
 # --- GET /api/chats/{chat_id} ---
-@api_view(['GET'])
+# Archived conversations are decompressed on the way out; the first read
+# against a compression dictionary loads it (one more query per process).
+@query_budget(4)
+@async_api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def get_plan_by_id(request, chat_id):
+@async_condition(plan_detail_etag)
+async def get_plan_by_id(request, chat_id):
     try:
-        plan = Plan.objects.get(id=chat_id, user=request.user)
+        plan = await Plan.objects.select_related('archive').aget(id=chat_id, user=request.user)
     except Plan.DoesNotExist:
         return Response({"detail": "Plan not found."}, status=status.HTTP_404_NOT_FOUND)
 
     return Response({
         "id": plan.id,
         "title": plan.title,
-        "conversation": plan.conversation,
+        "conversation": await aplan_conversation(plan),
         "is_saved": plan.is_saved,
         "pinned_date": plan.pinned_date,
         "created_at": plan.created_at,
@@ -100,7 +241,69 @@ def get_plan_by_id(request, chat_id):
     })
 
 
+# --- GET /api/chats/{chat_id}/messages/?since=&before=&after=&limit= ---
+# Incremental sync: `since=N` returns messages from index N on (pass back
+# `next_cursor` to poll for new ones), `before=N` pages backwards through
+# older history, `after=<ISO time>` filters on message timestamps.
+@query_budget(4)
+@async_api_view(['GET'])
+@permission_classes([IsAuthenticated])
+async def get_plan_messages(request, chat_id):
+    state = await _plan_state(Plan.objects.filter(id=chat_id, user=request.user))
+    if not state:
+        return Response({"detail": "Plan not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        since = int(request.query_params.get('since', 0))
+        before = request.query_params.get('before')
+        before = int(before) if before is not None else None
+        limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+    except ValueError:
+        return Response({"error": "since, before and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    after_time = None
+    if request.query_params.get('after'):
+        after = parse_datetime(request.query_params['after'])
+        if after is None:
+            return Response({"error": "after must be an ISO 8601 datetime."}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(after):
+            after = timezone.make_aware(after)
+        # Stored timestamps are UTC isoformat strings, which compare in order
+        after_time = after.astimezone(dt_timezone.utc).isoformat()
+
+    total = state['message_count']
+    backwards = before is not None
+    start = 0 if backwards else max(since, 0)
+    stop = min(before, total) if backwards else total
+
+    messages = await sync_to_async(fetch_messages)(
+        state['id'], start, stop, limit, newest_first=backwards, after_time=after_time,
+        archived=state['archived_at'] is not None,
+    )
+    first_index = messages[0][0] if messages else None
+
+    if backwards:
+        next_cursor = stop
+        has_more = first_index is not None and first_index > 0
+    elif messages:
+        next_cursor = messages[-1][0] + 1
+        has_more = len(messages) == limit and next_cursor < stop
+    else:
+        next_cursor = total
+        has_more = False
+
+    return Response({
+        "plan_id": state['id'],
+        "message_count": total,
+        "messages": [{"index": index, **message} for index, message in messages],
+        "next_cursor": next_cursor,
+        "previous_cursor": first_index,
+        "has_more": has_more,
+    })
+
+
 # --- GET /api/chats/all-plans (paginated) ---
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_all_plans(request):
@@ -115,19 +318,37 @@ def list_all_plans(request):
     return paginator.get_paginated_response(serializer.data)
 
 
-# --- GET /api/chats/recent-messages ---
+# --- GET /api/chats/export/?compress=zstd (streamed NDJSON) ---
+@query_budget(1)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def get_recent_chat_preview(request):
+def export_plans(request):
+    compress = request.query_params.get('compress') == 'zstd'
+    filename = f"gameplan-export-{timezone.localdate():%Y%m%d}.ndjson"
+
+    response = StreamingHttpResponse(
+        streaming_content(request, export_chunks(request.user, compress=compress)),
+        content_type='application/zstd' if compress else 'application/x-ndjson',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}{".zst" if compress else ""}"'
+    return response
+
+
+# --- GET /api/chats/recent-messages ---
+@query_budget(3)
+@async_api_view(['GET'])
+@permission_classes([IsAuthenticated])
+async def get_recent_chat_preview(request):
     user = request.user
-    plan = Plan.objects.filter(user=user).order_by('-updated_at').first()
+    plan = await Plan.objects.filter(user=user).select_related('archive').order_by('-updated_at').afirst()
+    conversation = await aplan_conversation(plan) if plan else None
 
-    if not plan or not plan.conversation:
+    if not conversation:
         return Response({"detail": "No recent conversation found."}, status=404)
 
     user_msg = None
     ai_msg = None
-    for message in reversed(plan.conversation):
+    for message in reversed(conversation):
         if message['role'] == 'assistant' and not ai_msg:
             ai_msg = message['content']
         elif message['role'] == 'user' and not user_msg:
@@ -143,7 +364,24 @@ def get_recent_chat_preview(request):
         "updated_at": plan.updated_at,
     })
 
+# --- GET /api/chats/search/?q= (ranked, paginated) ---
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_user_plans(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = PageNumberPagination()
+    paginator.page_size = 10
+    result_page = paginator.paginate_queryset(search_plans(request.user, query), request)
+    serializer = PlanSearchResultSerializer(result_page, many=True)
+
+    return paginator.get_paginated_response(serializer.data)
+
 # --- POST /api/chats/set-title ---
+@query_budget(6)
 @api_view(['POST'])
 def set_class_title(request):
     plan_id = request.data.get('plan_id')
@@ -155,26 +393,29 @@ def set_class_title(request):
     try:
         plan = Plan.objects.get(id=plan_id)
         plan.title = title
-        plan.save()
+        plan.save(update_fields=['title', 'updated_at'])
         return Response({'message': 'Title updated successfully.'})
     except Plan.DoesNotExist:
         return Response({'error': 'Plan not found.'}, status=status.HTTP_404_NOT_FOUND)
 
 # --- POST /api/chats/{chat_id}/ ---
-@api_view(['POST'])
+# An Idempotency-Key adds 5 queries (claim, store the response)
+@query_budget(23)
+@async_api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def send_message_to_chat(request, chat_id):
+@idempotent
+async def send_message_to_chat(request, chat_id):
     user = request.user
 
     # Check subscription or trial before allowing chat
-    if not has_active_subscription_or_trial(user):
+    if not await sync_to_async(has_active_subscription_or_trial)(user):
         return Response(
             {"error": "Your free trial has ended. Please upgrade to Pro."},
             status=403
         )
 
     try:
-        plan = Plan.objects.get(id=chat_id, user=user)
+        plan = await Plan.objects.aget(id=chat_id, user=user)
     except Plan.DoesNotExist:
         return Response({"detail": "Plan not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -182,15 +423,12 @@ def send_message_to_chat(request, chat_id):
     if not message:
         return Response({"error": "Message is required."}, status=400)
 
-    # Append user message
-    plan.conversation.append({"role": "user", "content": message})
-
-    # Generate AI response
-    ai_response = generate_ai_response(message)
+    # Enforce the daily token quota before spending anything on the LLM
+    if not await sync_to_async(has_remaining_quota)(user):
+        return Response({"error": QUOTA_EXCEEDED_ERROR}, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
-    # Append assistant response
-    plan.conversation.append({"role": "assistant", "content": ai_response})
-    plan.save()
+    # Append user message, generate AI response and record token usage
+    ai_response = await _run_chat_turn(user, plan, message)
 
     return Response({
         "message": message,
@@ -0,0 +1,209 @@
+"""
+Sports data importer. A feed source returns one document of the form
+
+    {
+        "teams":    [{"slug", "name", "short_name", "country", "aliases"}],
+        "fixtures": [{"id", "competition", "season", "home", "away", "kickoff", "venue", "status"}],
+        "results":  [{"fixture", "home_score", "away_score"}],
+    }
+
+where fixtures refer to teams by slug and results to fixtures by feed id.
+Sources for JSON files, CSV files (one kind per file) and HTTP JSON feeds
+are built in; any other feed can be plugged in as a FeedSource subclass by
+dotted path. import_feed() upserts everything in a fixed number of queries.
+"""
+import csv
+import json
+from datetime import timezone as dt_timezone
+from pathlib import Path
+
+import requests
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import Fixture, Result, Team
+
+KINDS = ('teams', 'fixtures', 'results')
+
+
+class FeedError(ValueError):
+    pass
+
+
+class FeedSource:
+    def read(self):
+        """Return a feed document (see module docstring)."""
+        raise NotImplementedError
+
+
+class JSONFileSource(FeedSource):
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read(self):
+        with self.path.open(encoding='utf-8') as f:
+            return json.load(f)
+
+
+class CSVFileSource(FeedSource):
+    """One kind of record per file; the kind defaults to the file name (teams.csv, ...)."""
+
+    def __init__(self, path, kind=None):
+        self.path = Path(path)
+        self.kind = kind or self.path.stem
+        if self.kind not in KINDS:
+            raise FeedError(f"Can't tell what {self.path.name} holds; pass one of {', '.join(KINDS)}")
+
+    def read(self):
+        with self.path.open(encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        if self.kind == 'teams':
+            for row in rows:
+                row['aliases'] = [alias.strip() for alias in row.get('aliases', '').split('|') if alias.strip()]
+        return {self.kind: rows}
+
+
+class HTTPJSONSource(FeedSource):
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def read(self):
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def get_source(spec, kind=None):
+    """Build a source from a file path, an http(s) URL or a FeedSource dotted path."""
+    if spec.startswith(('http://', 'https://')):
+        return HTTPJSONSource(spec)
+    if spec.endswith('.json'):
+        return JSONFileSource(spec)
+    if spec.endswith('.csv'):
+        return CSVFileSource(spec, kind)
+    try:
+        source_class = import_string(spec)
+    except ImportError:
+        raise FeedError(f"Unknown feed source: {spec}")
+    return source_class()
+
+
+def _kickoff(value):
+    kickoff = parse_datetime(str(value or ''))
+    if kickoff is None:
+        raise FeedError(f"Bad kickoff time: {value!r}")
+    if timezone.is_naive(kickoff):
+        kickoff = timezone.make_aware(kickoff, dt_timezone.utc)
+    return kickoff
+
+
+def _last_wins(objects, key):
+    """Drop all but the last object per key: one upsert can't touch a row twice."""
+    return list({getattr(obj, key): obj for obj in objects}.values())
+
+
+def import_feed(document):
+    """
+    Upsert the teams, fixtures and results of a feed document in one
+    transaction. Records that don't validate (missing slug, unknown team,
+    bad time) are skipped and reported; when a key repeats, the last record
+    wins. Returns (counts, errors).
+    """
+    counts = dict.fromkeys(KINDS, 0)
+    errors = []
+
+    with transaction.atomic():
+        teams = []
+        for row in document.get('teams', []):
+            try:
+                if not row['slug']:
+                    raise FeedError("empty slug")
+                teams.append(Team(
+                    slug=row['slug'],
+                    name=row.get('name') or row['slug'],
+                    short_name=row.get('short_name') or '',
+                    country=row.get('country') or '',
+                    aliases=row.get('aliases') or [],
+                ))
+            except KeyError as e:
+                errors.append(f"team {row.get('slug')!r}: missing {e}")
+            except FeedError as e:
+                errors.append(f"team {row.get('slug')!r}: {e}")
+        teams = _last_wins(teams, 'slug')
+        if teams:
+            Team.objects.bulk_create(
+                teams,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=['name', 'short_name', 'country', 'aliases', 'updated_at'],
+            )
+            counts['teams'] = len(teams)
+
+        rows = document.get('fixtures', [])
+        slugs = {row.get(side) for row in rows for side in ('home', 'away')}
+        team_ids = dict(Team.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+        fixtures = []
+        for row in rows:
+            try:
+                if row.get('home') not in team_ids or row.get('away') not in team_ids:
+                    raise FeedError(f"unknown team {row.get('home')!r} or {row.get('away')!r}")
+                fixtures.append(Fixture(
+                    external_id=str(row['id']),
+                    competition=row['competition'],
+                    season=row.get('season') or '',
+                    home_team_id=team_ids[row['home']],
+                    away_team_id=team_ids[row['away']],
+                    kickoff=_kickoff(row.get('kickoff')),
+                    venue=row.get('venue') or '',
+                    status=row.get('status') or 'scheduled',
+                ))
+            except (FeedError, KeyError) as e:
+                errors.append(f"fixture {row.get('id')!r}: {e}")
+        fixtures = _last_wins(fixtures, 'external_id')
+        if fixtures:
+            Fixture.objects.bulk_create(
+                fixtures,
+                update_conflicts=True,
+                unique_fields=['external_id'],
+                update_fields=[
+                    'competition', 'season', 'home_team', 'away_team', 'kickoff', 'venue', 'status', 'updated_at',
+                ],
+            )
+            counts['fixtures'] = len(fixtures)
+
+        rows = document.get('results', [])
+        fixture_ids = dict(
+            Fixture.objects.filter(external_id__in={str(row.get('fixture')) for row in rows})
+            .values_list('external_id', 'id')
+        )
+        results = []
+        for row in rows:
+            try:
+                if str(row.get('fixture')) not in fixture_ids:
+                    raise FeedError("unknown fixture")
+                results.append(Result(
+                    fixture_id=fixture_ids[str(row['fixture'])],
+                    home_score=int(row['home_score']),
+                    away_score=int(row['away_score']),
+                ))
+            except KeyError as e:
+                errors.append(f"result for fixture {row.get('fixture')!r}: missing {e}")
+            except (FeedError, ValueError) as e:
+                errors.append(f"result for fixture {row.get('fixture')!r}: {e}")
+        results = _last_wins(results, 'fixture_id')
+        if results:
+            Result.objects.bulk_create(
+                results,
+                update_conflicts=True,
+                unique_fields=['fixture'],
+                update_fields=['home_score', 'away_score', 'updated_at'],
+            )
+            Fixture.objects.filter(id__in=[result.fixture_id for result in results]).update(
+                status='finished', updated_at=timezone.now(),
+            )
+            counts['results'] = len(results)
+
+    return counts, errors
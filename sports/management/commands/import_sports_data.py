@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sports.importers import FeedError, get_source, import_feed
+from sports.tools import aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Import teams, fixtures and results into the local sports-data store. Each source is a .json or "
+        ".csv file, an http(s) URL serving the JSON feed format, or the dotted path of a FeedSource class."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='+')
+        parser.add_argument(
+            '--kind', choices=['teams', 'fixtures', 'results'], default=None,
+            help="What a CSV source holds, when its file name doesn't say (teams.csv, fixtures.csv, results.csv).",
+        )
+
+    def handle(self, *args, **options):
+        failed = False
+        for spec in options['sources']:
+            try:
+                document = get_source(spec, options['kind']).read()
+            except (FeedError, OSError, ValueError) as e:
+                raise CommandError(f"{spec}: {e}")
+
+            counts, errors = import_feed(document)
+            summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+            self.stdout.write(f"{spec}: imported {summary}")
+            for error in errors:
+                self.stderr.write(f"  skipped {error}")
+            failed = failed or bool(errors)
+
+        aliases.clear()
+        if failed:
+            self.stdout.write(self.style.WARNING("Done, some records were skipped."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fixture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=100, unique=True)),
+                ('competition', models.CharField(max_length=150)),
+                ('season', models.CharField(blank=True, max_length=20)),
+                ('kickoff', models.DateTimeField()),
+                ('venue', models.CharField(blank=True, max_length=150)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('live', 'Live'), ('finished', 'Finished'), ('postponed', 'Postponed')], default='scheduled', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'django"."sports_fixture',
+            },
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=150)),
+                ('short_name', models.CharField(blank=True, max_length=50)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('aliases', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'django"."sports_team',
+            },
+        ),
+        migrations.CreateModel(
+            name='Result',
+            fields=[
+                ('fixture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='result', serialize=False, to='sports.fixture')),
+                ('home_score', models.PositiveSmallIntegerField()),
+                ('away_score', models.PositiveSmallIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'django"."sports_result',
+            },
+        ),
+        migrations.AddField(
+            model_name='fixture',
+            name='away_team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='away_fixtures', to='sports.team'),
+        ),
+        migrations.AddField(
+            model_name='fixture',
+            name='home_team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='home_fixtures', to='sports.team'),
+        ),
+        migrations.AddIndex(
+            model_name='fixture',
+            index=models.Index(fields=['home_team', 'kickoff'], name='sports_fixt_home_te_ac579f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixture',
+            index=models.Index(fields=['away_team', 'kickoff'], name='sports_fixt_away_te_432685_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixture',
+            index=models.Index(fields=['competition', 'season'], name='sports_fixt_competi_db9373_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixture',
+            index=models.Index(fields=['kickoff'], name='sports_fixt_kickoff_1c1087_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import models
+
+
+class Team(models.Model):
+    slug = models.SlugField(max_length=100, unique=True)
+    name = models.CharField(max_length=150)
+    short_name = models.CharField(max_length=50, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    aliases = models.JSONField(default=list, blank=True)  # other names users type, e.g. ["man utd", "united"]
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'django"."sports_team'
+
+    def __str__(self):
+        return self.name
+
+
+class Fixture(models.Model):
+    STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
+        ('live', 'Live'),
+        ('finished', 'Finished'),
+        ('postponed', 'Postponed'),
+    ]
+
+    external_id = models.CharField(max_length=100, unique=True)  # id in the source feed
+    competition = models.CharField(max_length=150)
+    season = models.CharField(max_length=20, blank=True)
+    home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='home_fixtures')
+    away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='away_fixtures')
+    kickoff = models.DateTimeField()
+    venue = models.CharField(max_length=150, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'django"."sports_fixture'
+        indexes = [
+            models.Index(fields=['home_team', 'kickoff']),
+            models.Index(fields=['away_team', 'kickoff']),
+            models.Index(fields=['competition', 'season']),
+            models.Index(fields=['kickoff']),
+        ]
+
+    def __str__(self):
+        return f"{self.home_team} vs {self.away_team} ({self.kickoff:%Y-%m-%d})"
+
+
+class Result(models.Model):
+    fixture = models.OneToOneField(Fixture, on_delete=models.CASCADE, primary_key=True, related_name='result')
+    home_score = models.PositiveSmallIntegerField()
+    away_score = models.PositiveSmallIntegerField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'django"."sports_result'
+
+    def __str__(self):
+        return f"{self.fixture}: {self.home_score}-{self.away_score}"
@@ -0,0 +1,116 @@
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+from .importers import get_source, import_feed
+from .models import Fixture, Result, Team
+from .tools import NO_DATA, aliases, lookup_sports_data
+
+SAMPLE_DATA = Path(__file__).resolve().parent / 'sample_data'
+
+
+def load(name, kind=None):
+    return import_feed(get_source(str(SAMPLE_DATA / name), kind).read())
+
+
+class ImporterTests(TestCase):
+    def test_json_feed(self):
+        counts, errors = load('premier_league.json')
+        self.assertEqual(counts, {'teams': 6, 'fixtures': 9, 'results': 6})
+        self.assertEqual(errors, [])
+        self.assertEqual(Fixture.objects.filter(status='finished').count(), 6)
+        arsenal_chelsea = Result.objects.get(fixture__external_id='pl-2526-001')
+        self.assertEqual((arsenal_chelsea.home_score, arsenal_chelsea.away_score), (2, 1))
+        self.assertEqual(Team.objects.get(slug='manchester-city').aliases, ['man city', 'mcfc'])
+
+    def test_reimport_updates_in_place(self):
+        load('premier_league.json')
+        counts, errors = load('premier_league.json')
+        self.assertEqual(counts, {'teams': 6, 'fixtures': 9, 'results': 6})
+        self.assertEqual((Team.objects.count(), Fixture.objects.count(), Result.objects.count()), (6, 9, 6))
+
+    def test_csv_files_skip_fixtures_with_unknown_teams(self):
+        counts, errors = load('teams.csv')
+        self.assertEqual((counts['teams'], errors), (2, []))
+        self.assertEqual(Team.objects.get(slug='arsenal').aliases, ['gunners', 'the arsenal'])
+
+        # Liverpool and Tottenham aren't in teams.csv
+        counts, errors = load('fixtures.csv')
+        self.assertEqual(counts['fixtures'], 0)
+        self.assertEqual(len(errors), 2)
+        self.assertIn("unknown team 'liverpool'", errors[0])
+        self.assertIn("unknown team 'tottenham-hotspur'", errors[1])
+
+        load('premier_league.json')
+        counts, errors = load('fixtures.csv')
+        self.assertEqual((counts['fixtures'], errors), (2, []))
+        self.assertEqual(Fixture.objects.filter(competition='FA Cup').count(), 2)
+
+    def test_bad_team_row_is_skipped(self):
+        counts, errors = import_feed({'teams': [
+            {'name': "No slug"},
+            {'slug': '', 'name': "Empty slug"},
+            {'slug': 'arsenal', 'name': "Arsenal"},
+        ]})
+        self.assertEqual(counts['teams'], 1)
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(list(Team.objects.values_list('slug', flat=True)), ['arsenal'])
+
+    def test_repeated_keys_last_wins(self):
+        fixture = {
+            'id': 'f1', 'competition': 'Premier League', 'home': 'arsenal', 'away': 'chelsea',
+            'kickoff': '2025-08-16T14:00:00Z',
+        }
+        counts, errors = import_feed({
+            'teams': [
+                {'slug': 'arsenal', 'name': "Arsenal FC"}, {'slug': 'chelsea'}, {'slug': 'arsenal', 'name': "Arsenal"},
+            ],
+            'fixtures': [{**fixture, 'venue': "Old venue"}, {**fixture, 'venue': "Emirates Stadium"}],
+            'results': [
+                {'fixture': 'f1', 'home_score': 0, 'away_score': 0}, {'fixture': 'f1', 'home_score': 2, 'away_score': 1},
+            ],
+        })
+        self.assertEqual(errors, [])
+        self.assertEqual(counts, {'teams': 2, 'fixtures': 1, 'results': 1})
+        self.assertEqual(Team.objects.get(slug='arsenal').name, "Arsenal")
+        self.assertEqual(Fixture.objects.get(external_id='f1').venue, "Emirates Stadium")
+        self.assertEqual(Result.objects.values_list('home_score', 'away_score').get(), (2, 1))
+
+
+class SportsToolTests(TestCase):
+    def setUp(self):
+        load('premier_league.json')
+        aliases.clear()
+        # It would close the test case's connection, mid-transaction
+        patcher = mock.patch('sports.tools.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fixtures(self):
+        self.assertEqual(
+            lookup_sports_data("next Arsenal fixture"),
+            "Upcoming fixtures:\n2027-01-09 17:30 UTC Premier League: Arsenal vs Liverpool at Emirates Stadium",
+        )
+
+    def test_results_by_alias(self):
+        self.assertEqual(
+            lookup_sports_data("latest gunners results"),
+            "Recent results:\n"
+            "2025-08-24 Premier League: Tottenham Hotspur 2-2 Arsenal\n"
+            "2025-08-16 Premier League: Arsenal 2-1 Chelsea",
+        )
+
+    def test_head_to_head(self):
+        self.assertIn("Arsenal 2-1 Chelsea", lookup_sports_data("Arsenal v Chelsea result"))
+        self.assertNotIn("Tottenham", lookup_sports_data("Arsenal v Chelsea result"))
+
+    def test_standings(self):
+        table = lookup_sports_data("Premier League table").splitlines()
+        self.assertEqual(table[0], "Premier League table (from stored results):")
+        self.assertEqual(table[1], "1. Liverpool P2 W2 D0 L0 GD+5 Pts6")
+        self.assertEqual(len(table), 7)
+
+    def test_no_data_falls_back_to_web_search(self):
+        self.assertEqual(lookup_sports_data("next Real Madrid fixture"), NO_DATA)
+        self.assertEqual(lookup_sports_data("who won the Tour de France"), NO_DATA)
@@ -0,0 +1,198 @@
+"""
+The agent's `sports-data` tool: answers fixture, result and standings
+questions from the local tables (see sports/importers.py) with a couple of
+indexed queries, and tells the agent to fall back to web-search when the
+store has nothing on the subject.
+"""
+import re
+import threading
+import time
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from langchain.agents import Tool
+
+from .models import Fixture, Result, Team
+
+ALIAS_TTL_SECONDS = 300
+MAX_ROWS = 10
+
+NO_DATA = "No local data for that; use web-search instead."
+
+_STANDINGS = re.compile(r'\b(standings?|table|league table|position|rank(ing)?s?)\b', re.IGNORECASE)
+_RESULTS = re.compile(r'\b(results?|scores?|last|recent|previous|won|lost|beat|draw)\b', re.IGNORECASE)
+_FIXTURES = re.compile(r'\b(fixtures?|next|upcoming|schedule|when|play(ing|s)?|kick ?off)\b', re.IGNORECASE)
+
+
+def normalize(name):
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+
+class _AliasIndex:
+    """Normalized team names and aliases -> team id, reloaded every ALIAS_TTL_SECONDS."""
+
+    def __init__(self):
+        self._names = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def names(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > ALIAS_TTL_SECONDS:
+            with self._lock:
+                names = {}
+                for team_id, slug, name, short_name, aliases in Team.objects.values_list(
+                    'id', 'slug', 'name', 'short_name', 'aliases',
+                ):
+                    for alias in (slug.replace('-', ' '), name, short_name, *(aliases or [])):
+                        if alias and normalize(alias):
+                            names[normalize(alias)] = team_id
+                self._names, self._loaded_at = names, time.monotonic()
+        return self._names
+
+    def find(self, text):
+        """Team ids mentioned in `text`, longest names first so "man city" beats "city"."""
+        text = f" {normalize(text)} "
+        found = []
+        for alias, team_id in sorted(self.names().items(), key=lambda item: -len(item[0])):
+            if f" {alias} " in text and team_id not in found:
+                found.append(team_id)
+                text = text.replace(f" {alias} ", " ")
+        return found
+
+    def clear(self):
+        self._loaded_at = None
+
+
+aliases = _AliasIndex()
+
+
+def _competition(query):
+    competitions = Fixture.objects.values_list('competition', flat=True).distinct()
+    text = normalize(query)
+    matches = [c for c in competitions if normalize(c) and normalize(c) in text]
+    return max(matches, key=len) if matches else None
+
+
+def _format_fixture(fixture):
+    line = f"{fixture.kickoff:%Y-%m-%d %H:%M} UTC {fixture.competition}: {fixture.home_team} vs {fixture.away_team}"
+    if fixture.venue:
+        line += f" at {fixture.venue}"
+    if fixture.status not in ('scheduled', 'finished'):
+        line += f" ({fixture.status})"
+    return line
+
+
+def _format_result(result):
+    fixture = result.fixture
+    return (
+        f"{fixture.kickoff:%Y-%m-%d} {fixture.competition}: "
+        f"{fixture.home_team} {result.home_score}-{result.away_score} {fixture.away_team}"
+    )
+
+
+def _team_filter(team_ids, prefix=''):
+    if len(team_ids) >= 2:
+        a, b = team_ids[:2]
+        return (
+            Q(**{f'{prefix}home_team_id': a, f'{prefix}away_team_id': b})
+            | Q(**{f'{prefix}home_team_id': b, f'{prefix}away_team_id': a})
+        )
+    return Q(**{f'{prefix}home_team_id': team_ids[0]}) | Q(**{f'{prefix}away_team_id': team_ids[0]})
+
+
+def upcoming_fixtures(team_ids, competition=None):
+    qs = Fixture.objects.filter(kickoff__gte=timezone.now()).exclude(status='finished')
+    if team_ids:
+        qs = qs.filter(_team_filter(team_ids))
+    if competition:
+        qs = qs.filter(competition=competition)
+    fixtures = qs.select_related('home_team', 'away_team').order_by('kickoff')[:MAX_ROWS]
+    return [_format_fixture(fixture) for fixture in fixtures]
+
+
+def recent_results(team_ids, competition=None):
+    qs = Result.objects.all()
+    if team_ids:
+        qs = qs.filter(_team_filter(team_ids, prefix='fixture__'))
+    if competition:
+        qs = qs.filter(fixture__competition=competition)
+    results = qs.select_related('fixture__home_team', 'fixture__away_team').order_by('-fixture__kickoff')[:MAX_ROWS]
+    return [_format_result(result) for result in results]
+
+
+def standings(competition):
+    """League table for the latest season of `competition`, computed from its results."""
+    season = (
+        Fixture.objects.filter(competition=competition).order_by('-kickoff').values_list('season', flat=True).first()
+    )
+    rows = Result.objects.filter(fixture__competition=competition, fixture__season=season).values_list(
+        'fixture__home_team__name', 'fixture__away_team__name', 'home_score', 'away_score',
+    )
+    table = {}
+    for home, away, home_score, away_score in rows:
+        for team, scored, conceded in ((home, home_score, away_score), (away, away_score, home_score)):
+            entry = table.setdefault(team, {'p': 0, 'w': 0, 'd': 0, 'l': 0, 'gf': 0, 'ga': 0, 'pts': 0})
+            entry['p'] += 1
+            entry['gf'] += scored
+            entry['ga'] += conceded
+            if scored > conceded:
+                entry['w'] += 1
+                entry['pts'] += 3
+            elif scored == conceded:
+                entry['d'] += 1
+                entry['pts'] += 1
+            else:
+                entry['l'] += 1
+    ordered = sorted(table.items(), key=lambda item: (-item[1]['pts'], item[1]['ga'] - item[1]['gf'], -item[1]['gf'], item[0]))
+    return [
+        f"{position}. {team} P{e['p']} W{e['w']} D{e['d']} L{e['l']} GD{e['gf'] - e['ga']:+d} Pts{e['pts']}"
+        for position, (team, e) in enumerate(ordered, start=1)
+    ]
+
+
+def lookup_sports_data(query: str) -> str:
+    """Answer a fixtures / results / standings question from the local store."""
+    # Tool calls run outside the request cycle on long-lived worker threads:
+    # drop a stale connection first, and hand this one back when done
+    close_old_connections()
+    try:
+        return _lookup(query)
+    finally:
+        close_old_connections()
+
+
+def _lookup(query):
+    team_ids = aliases.find(query)
+    competition = _competition(query)
+    sections = []
+
+    if _STANDINGS.search(query) and competition:
+        table = standings(competition)
+        if table:
+            sections.append(f"{competition} table (from stored results):\n" + "\n".join(table))
+
+    wants_results = bool(_RESULTS.search(query))
+    wants_fixtures = bool(_FIXTURES.search(query))
+    if team_ids or (competition and not sections):
+        if wants_results or not wants_fixtures:
+            lines = recent_results(team_ids, competition)
+            if lines:
+                sections.append("Recent results:\n" + "\n".join(lines))
+        if wants_fixtures or not wants_results:
+            lines = upcoming_fixtures(team_ids, competition)
+            if lines:
+                sections.append("Upcoming fixtures:\n" + "\n".join(lines))
+
+    return "\n\n".join(sections) if sections else NO_DATA
+
+
+sports_tool = Tool(
+    name="sports-data",
+    func=lookup_sports_data,
+    description=(
+        "Look up stored fixtures, recent results and league standings. Input: a short question naming "
+        "the team(s) or competition, e.g. 'next Arsenal fixture' or 'Premier League table'. Fast; try it "
+        "before web-search for schedules, scores and tables."
+    ),
+)
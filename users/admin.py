@@ -7,10 +7,14 @@ from .models import User
 from payments.models import Subscription
 from plans.models import Plan
 from classes.models import SavedClass
+from ai.models import TokenUsage, DailyTokenUsage, AgentTrace
+from sports.models import Team, Fixture, Result
+from idempotency.models import IdempotencyKey
+from utils.admin import LargeTableAdminMixin
 
 
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     model = User
     list_display = ('email', 'username', 'is_staff', 'is_superuser')
     list_filter = ('is_staff', 'is_superuser', 'is_active')
@@ -38,22 +42,82 @@ admin.site.register(User, UserAdmin)
 # Register other models here
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'plan', 'plan_type', 'is_active', 'current_period_end')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
     list_filter = ('plan', 'plan_type', 'is_active')
     search_fields = ('user__email', 'stripe_customer_id', 'stripe_subscription_id')
     readonly_fields = ('stripe_customer_id', 'stripe_subscription_id', 'current_period_end')
 
 @admin.register(Plan)
-class PlanAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'is_saved', 'pinned_date', 'created_at', 'updated_at')
-    list_filter = ('is_saved', 'pinned_date', 'created_at')
+class PlanAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('title', 'user', 'is_saved', 'pinned_date', 'created_at', 'updated_at', 'archived_at')
+    list_select_related = ('user',)
+    list_defer = ('conversation', 'summary')
+    raw_id_fields = ('user',)
+    list_filter = ('is_saved', 'pinned_date', 'created_at', 'archived_at')
     search_fields = ('title', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'archived_at')
 
 @admin.register(SavedClass)
-class SavedClassAdmin(admin.ModelAdmin):
+class SavedClassAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'user', 'pinned_date', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'plan')
     search_fields = ('title', 'user__email')
     list_filter = ('pinned_date',)
     readonly_fields = ('created_at',)
+
+@admin.register(TokenUsage)
+class TokenUsageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'message_index', 'prompt_tokens', 'completion_tokens', 'tool_call_tokens', 'tool_calls', 'latency_ms', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'plan')
+    search_fields = ('user__email',)
+    readonly_fields = ('created_at',)
+
+@admin.register(DailyTokenUsage)
+class DailyTokenUsageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'date', 'prompt_tokens', 'completion_tokens', 'tool_call_tokens', 'tool_calls', 'runs')
+    list_select_related = ('user',)
+    list_filter = ('date',)
+    search_fields = ('user__email',)
+
+@admin.register(AgentTrace)
+class AgentTraceAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('request_id', 'user', 'message_index', 'duration_ms', 'attempts', 'failed', 'created_at')
+    list_select_related = ('user',)
+    list_defer = ('spans',)
+    list_filter = ('failed',)
+    raw_id_fields = ('user', 'plan')
+    search_fields = ('request_id__exact', 'user__email')
+    readonly_fields = ('created_at',)
+
+@admin.register(Team)
+class TeamAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'short_name', 'country', 'updated_at')
+    search_fields = ('name', 'slug', 'short_name')
+
+@admin.register(Fixture)
+class FixtureAdmin(admin.ModelAdmin):
+    list_display = ('external_id', 'competition', 'season', 'home_team', 'away_team', 'kickoff', 'status')
+    list_select_related = ('home_team', 'away_team')
+    list_filter = ('status', 'competition')
+    raw_id_fields = ('home_team', 'away_team')
+    search_fields = ('external_id', 'home_team__name', 'away_team__name')
+
+@admin.register(Result)
+class ResultAdmin(admin.ModelAdmin):
+    list_display = ('fixture', 'home_score', 'away_score', 'updated_at')
+    list_select_related = ('fixture__home_team', 'fixture__away_team')
+    raw_id_fields = ('fixture',)
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('key', 'user', 'response_status', 'locked_at', 'expires_at')
+    list_select_related = ('user',)
+    list_defer = ('response_body',)
+    raw_id_fields = ('user',)
+    search_fields = ('key__exact', 'user__email')
+    readonly_fields = ('created_at',)
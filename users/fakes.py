@@ -0,0 +1,25 @@
+"""Local stand-in for cloudinary.uploader.upload, used in OFFLINE_MODE."""
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from utils.fakes import simulate_call
+
+
+def local_upload(file, folder='', public_id=None, overwrite=False, resource_type='image', **options):
+    """
+    Save `file` to default storage (MEDIA_ROOT) and return a Cloudinary-like
+    result. public_id is an absolute URL, which the serializers already
+    pass through untouched.
+    """
+    simulate_call('storage', lambda: ConnectionError("Injected offline upload failure"))
+
+    extension = os.path.splitext(getattr(file, 'name', ''))[1]
+    name = os.path.join(folder, f"{public_id or 'upload'}{extension}")
+    if overwrite and default_storage.exists(name):
+        default_storage.delete(name)
+    name = default_storage.save(name, file)
+
+    url = f"{settings.BACKEND_DOMAIN.rstrip('/')}{default_storage.url(name)}"
+    return {'public_id': url, 'secure_url': url, 'resource_type': resource_type}
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:20
+
+from django.db import migrations
+
+from utils.trigram import trigram_indexes
+
+
+class Migration(migrations.Migration):
+    atomic = False  # the indexes are built CONCURRENTLY
+
+    dependencies = [
+        ('users', '0005_remove_user_account_type'),
+    ]
+
+    operations = [
+        trigram_indexes('"django"."users"', {
+            'users_email_trgm': 'email',
+            'users_username_trgm': 'username',
+        }),
+    ]
@@ -39,6 +39,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     details = models.TextField(blank=True, null=True)  # For popup extra info, not shown on profile page
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
 
+    # Part of the signed calendar feed URL; bumping it revokes every URL handed out
+    calendar_feed_version = models.PositiveIntegerField(default=0)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
@@ -69,7 +72,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         from payments.models import Subscription
 
         try:
-            subscription = Subscription.objects.get(user=self)
+            # The reverse accessor caches the row (or its absence) on the
+            # instance, so repeated checks in one request cost one query
+            subscription = self.subscription
             if subscription.is_active and subscription.current_period_end and subscription.current_period_end > now:
                 if subscription.plan == 'pro':
                     return 'Pro'
@@ -6,7 +6,11 @@ import random
 from django.core.mail import send_mail
 from django.conf import settings
 from cloudinary import CloudinaryImage
-from cloudinary.uploader import upload as cloudinary_upload
+
+if settings.OFFLINE_MODE:
+    from .fakes import local_upload as cloudinary_upload
+else:
+    from cloudinary.uploader import upload as cloudinary_upload
 
 
 # -----------------------------
@@ -13,11 +13,14 @@ from .serializers import (
     AboutDetailsSerializer
 )
 from payments.utils import start_free_trial
+from utils.db_routing import read_from_primary
+from utils.queries import query_budget
 from django.utils import timezone
 from datetime import timedelta
 from .models import User
 
 # User signup
+@query_budget(post=4)
 class UserSignupView(APIView):
     def post(self, request):
         serializer = UserSignupSerializer(data=request.data)
@@ -27,6 +30,7 @@ class UserSignupView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Protected view for testing JWT
+@query_budget(get=1)
 class ProtectedView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -34,6 +38,7 @@ class ProtectedView(APIView):
         return Response({"message": "You are authenticated!"})
 
 # Accept free trial
+@query_budget(post=5)
 class AcceptFreeTrialView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -52,6 +57,7 @@ class AcceptFreeTrialView(APIView):
         }, status=status.HTTP_200_OK)
 
 # Request OTP for password reset
+@query_budget(post=4)
 class ForgotPasswordRequestView(APIView):
     def post(self, request):
         serializer = ForgotPasswordRequestSerializer(data=request.data)
@@ -69,6 +75,7 @@ class ForgotPasswordRequestView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Verify OTP
+@query_budget(post=3)
 class ForgotPasswordVerifyView(APIView):
     def post(self, request):
         email = request.COOKIES.get('reset_email')
@@ -100,6 +107,7 @@ class ForgotPasswordVerifyView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Reset password after OTP verification
+@query_budget(post=4)
 class ResetPasswordView(APIView):
     def post(self, request):
         email = request.COOKIES.get('reset_email')
@@ -118,6 +126,7 @@ class ResetPasswordView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Logout
+@query_budget(post=6)
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -130,7 +139,9 @@ class LogoutView(APIView):
         except Exception:
             return Response({"error": "Invalid refresh token."}, status=status.HTTP_400_BAD_REQUEST)
 
-# User profile
+# User profile (account_type follows Stripe webhooks, so read it from the primary)
+@read_from_primary
+@query_budget(get=2, put=4)
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -152,6 +163,7 @@ class UserProfileView(APIView):
 
 
 # About/Details update
+@query_budget(post=2)
 class AboutDetailsUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -0,0 +1,101 @@
+"""
+ModelAdmin pieces for changelists over tables too big to scan.
+
+LargeTableAdminMixin (goes before ModelAdmin in the bases):
+
+- counts with EstimatedCountPaginator: exact below ADMIN_EXACT_COUNT_LIMIT
+  rows, the query planner's estimate (EXPLAIN, no scan) above that;
+- skips the second, unfiltered "(N total)" count;
+- defers `list_defer` columns in the changelist (not in the change form);
+- searches one field at a time and combines the matching primary keys.
+  Django's default puts every search field in one OR, which no index can
+  serve once a field is on a joined table; one query per field can use the
+  trigram indexes created in the apps' migrations (utils/trigram.py).
+"""
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+SEARCH_PREFIXES = {'^': 'istartswith', '=': 'iexact', '@': 'search'}
+
+
+def estimated_count(queryset):
+    """The number of rows the planner expects `queryset` to return."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and connections[queryset.db].vendor == 'postgresql':
+            estimate = estimated_count(queryset)
+            if estimate >= settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+class DeferringChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_defer:
+            queryset = queryset.defer(*self.model_admin.list_defer)
+        return queryset
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        return DeferringChangeList
+
+    def _search_lookup(self, field_name):
+        # Same rules as ModelAdmin.get_search_results
+        if field_name[:1] in SEARCH_PREFIXES:
+            return f"{field_name[1:]}__{SEARCH_PREFIXES[field_name[0]]}"
+        opts = self.model._meta
+        prev_field = None
+        for part in field_name.split(LOOKUP_SEP):
+            if part == 'pk':
+                part = opts.pk.name
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                if prev_field and prev_field.get_lookup(part):
+                    return field_name
+            else:
+                prev_field = field
+                if hasattr(field, 'path_infos'):
+                    opts = field.path_infos[-1].to_opts
+        return f"{field_name}__icontains"
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if len(search_fields) < 2 or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+
+        lookups = [self._search_lookup(str(field)) for field in search_fields]
+        rows = self.model._default_manager.all()
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            # Every term must match some field, as with the default search
+            matches = [rows.filter(**{lookup: term}).values('pk') for lookup in lookups]
+            queryset = queryset.filter(pk__in=matches[0].union(*matches[1:]))
+        return queryset, False
@@ -0,0 +1,99 @@
+"""
+Native async views on top of DRF, which itself only dispatches synchronously.
+
+AsyncAPIView keeps DRF's request parsing, authentication, permissions,
+exception handling and renderers; only the handler is awaited on the event
+loop. The parts of APIView.initial() that may touch the database (JWT user
+lookup, permission checks, throttles) run once per request in a thread via
+sync_to_async. Handlers use the async ORM (aget, afirst, asave, async for)
+and sync_to_async for anything else that queries.
+
+    @async_api_view(['GET'])
+    @permission_classes([IsAuthenticated])
+    async def my_view(request): ...
+"""
+import inspect
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose get/post/... handlers are coroutines."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_api_view(http_method_names=None):
+    """rest_framework.decorators.api_view for `async def` views."""
+    http_method_names = ['GET'] if http_method_names is None else http_method_names
+
+    def decorator(func):
+        WrappedAPIView = type('WrappedAPIView', (AsyncAPIView,), {'__doc__': func.__doc__})
+        WrappedAPIView.http_method_names = [method.lower() for method in set(http_method_names) | {'options'}]
+
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        for method in http_method_names:
+            setattr(WrappedAPIView, method.lower(), handler)
+
+        WrappedAPIView.__name__ = func.__name__
+        WrappedAPIView.__module__ = func.__module__
+        for attr in ('renderer_classes', 'parser_classes', 'authentication_classes',
+                     'throttle_classes', 'permission_classes', 'schema'):
+            setattr(WrappedAPIView, attr, getattr(func, attr, getattr(APIView, attr)))
+
+        return WrappedAPIView.as_view()
+
+    return decorator
+
+
+def async_condition(etag_func):
+    """
+    django.views.decorators.http.condition (ETag only) for async views, with
+    an async `etag_func` so the ETag query goes through the async ORM too.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await func(request, *args, **kwargs)
+
+            if etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
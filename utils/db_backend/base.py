@@ -0,0 +1,55 @@
+"""
+PostgreSQL backend that times connection checkouts from the psycopg pool
+(Django's "pool" option, configured in settings.DATABASES).
+
+With the pool on, CONN_MAX_AGE is 0: a connection is checked out at a
+request's first query and handed back when the request finishes, instead
+of staying pinned to the thread that opened it.
+
+- gthread workers: each busy thread holds at most one connection, so a
+  pool of DB_POOL_MAX_SIZE >= the thread count never makes a request wait;
+  idle threads hold none.
+- ASGI workers: the async ORM runs each request's queries on a per-request
+  sync thread, so without a pool every request opened (and with
+  CONN_MAX_AGE, kept) its own connection and TLS session. The pool caps the
+  worker at DB_POOL_MAX_SIZE connections; requests beyond that wait up to
+  DB_POOL_TIMEOUT for one (gameplan_db_pool_wait_seconds) rather than
+  exhausting the server's max_connections. That thread would keep its
+  connection across awaits, so chat turns hand it back before waiting on
+  the model (plans/views.py).
+
+Pools are per process: gunicorn.conf.py closes any pool the master opened
+before forking, and each worker opens its own on first use.
+"""
+import time
+
+from django.db.backends.postgresql import base
+from psycopg_pool import PoolTimeout
+
+from utils.metrics import DB_POOL_CONNECTIONS, DB_POOL_TIMEOUTS, DB_POOL_WAIT_SECONDS, REGISTRY
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        if not self.pool:
+            return super().get_new_connection(conn_params)
+
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        except PoolTimeout:
+            DB_POOL_TIMEOUTS.inc(alias=self.alias)
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started, alias=self.alias)
+
+
+def collect_pool_stats():
+    for alias, pool in list(DatabaseWrapper._connection_pools.items()):
+        stats = pool.get_stats()
+        DB_POOL_CONNECTIONS.set(stats.get('pool_size', 0), alias=alias, state='open')
+        DB_POOL_CONNECTIONS.set(stats.get('pool_available', 0), alias=alias, state='idle')
+        DB_POOL_CONNECTIONS.set(stats.get('requests_waiting', 0), alias=alias, state='waiting')
+
+
+REGISTRY.register_collector(collect_pool_stats)
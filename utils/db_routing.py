@@ -0,0 +1,137 @@
+"""
+Read-replica routing.
+
+Replicas are the aliases in settings.DB_REPLICAS (replica1, replica2, ...,
+one per DB_REPLICA_URLS entry). ReplicaRouter sends reads to the replica
+picked for the request being served and every write to default; outside a
+request (management commands, background workers) everything stays on
+default.
+
+utils.middleware.ReplicaRoutingMiddleware picks a replica for GET, HEAD
+and OPTIONS requests, except:
+
+- views marked @read_from_primary, for pages that must show writes the
+  caller didn't make (Stripe webhooks updating a subscription, say);
+- callers who sent a write in the last DB_REPLICA_STICKY_SECONDS, so a
+  user sees the message they just sent despite replication lag. Callers
+  are told apart by the user id in their access token, or by their session
+  cookie (the admin). The marks live in Django's cache, which has to be
+  shared (Redis, Memcached, database) when there is more than one worker.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .metrics import DB_READ_ROUTING
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# A session written on one request is read back on the next, often before a
+# replica has it
+PRIMARY_ONLY_APPS = {'sessions'}
+
+# Alias the current request reads from; None means default
+current_read_db = ContextVar('current_read_db', default=None)
+
+
+def read_from_primary(view):
+    """
+    Keep a view's reads on default.
+
+        @read_from_primary
+        @query_budget(get=2)
+        class ManageSubscriptionView(APIView): ...
+
+    Goes above @api_view, like @query_budget.
+    """
+    view.read_from_primary = True
+    return view
+
+
+def _reads_from_primary(view_func):
+    return getattr(view_func, 'read_from_primary', False) or getattr(
+        getattr(view_func, 'view_class', None), 'read_from_primary', False,
+    )
+
+
+def caller_key(request):
+    """Who is asking: the access token's user, else the session cookie, else None."""
+    scheme, _, raw_token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if raw_token and scheme in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return f"user:{AccessToken(raw_token.strip())[jwt_settings.USER_ID_CLAIM]}"
+        except (TokenError, KeyError):
+            pass
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return "session:" + hashlib.sha256(session_key.encode()).hexdigest()[:32]
+    return None
+
+
+def _sticky_key(caller):
+    return f"db-sticky:{caller}"
+
+
+def mark_sticky(caller):
+    """Read `caller`'s next requests from default for DB_REPLICA_STICKY_SECONDS."""
+    if caller is not None:
+        cache.set(_sticky_key(caller), True, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def choose_read_db(request, caller):
+    """Alias the request should read from (None for default), and why."""
+    if request.method not in SAFE_METHODS:
+        return None, 'write'
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        match = None
+    if match is not None and _reads_from_primary(match.func):
+        return None, 'view'
+    if caller is not None and cache.get(_sticky_key(caller)):
+        return None, 'sticky'
+    return random.choice(settings.DB_REPLICAS), 'replica'
+
+
+def route_request(request):
+    """Point this request's reads at a replica or default. Returns the caller key."""
+    caller = caller_key(request)
+    alias, decision = choose_read_db(request, caller)
+    current_read_db.set(alias)
+    DB_READ_ROUTING.inc(decision=decision)
+    return caller
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = current_read_db.get()
+        if alias is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        # Reads inside a transaction on default see its uncommitted rows
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as default
+        databases = {DEFAULT_DB_ALIAS, *settings.DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from default through replication
+        if db in settings.DB_REPLICAS:
+            return False
+        return None
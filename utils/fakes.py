@@ -0,0 +1,37 @@
+"""
+Shared plumbing for the offline stand-ins (ai/fakes.py, payments/fakes.py,
+users/fakes.py). Each fake call sleeps for the configured latency and fails
+with the configured probability, so retries and timeouts can be exercised
+without any network access.
+"""
+import asyncio
+import random
+import time
+
+from django.conf import settings
+
+_rng = random.Random(settings.OFFLINE_FAKES_SEED)
+
+
+def _config(service):
+    return settings.OFFLINE_FAKES.get(service, {})
+
+
+def _should_fail(service):
+    return _rng.random() < _config(service).get('error_rate', 0.0)
+
+
+def simulate_call(service, error_factory):
+    latency_ms = _config(service).get('latency_ms', 0)
+    if latency_ms:
+        time.sleep(latency_ms / 1000)
+    if _should_fail(service):
+        raise error_factory()
+
+
+async def asimulate_call(service, error_factory):
+    latency_ms = _config(service).get('latency_ms', 0)
+    if latency_ms:
+        await asyncio.sleep(latency_ms / 1000)
+    if _should_fail(service):
+        raise error_factory()
@@ -0,0 +1,243 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format
+(served at /metrics, see utils/views.py).
+
+Values live in the worker process: with several gunicorn workers each one
+reports its own series, so scrape every worker (or run one per container).
+
+Label values must come from small, known sets (route patterns, not paths;
+status classes, not codes). As a guard, each metric keeps at most
+MAX_SERIES label combinations; anything past that is folded into a single
+series labelled "other".
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+MAX_SERIES = 500
+OVERFLOW = 'other'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                if key not in self._series and len(self._series) >= MAX_SERIES:
+                    key = (OVERFLOW,) * len(self.labelnames)
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = list(self._series.items())
+        for key, series in sorted(items):
+            lines.extend(series.render(self, key))
+        return lines
+
+
+class _CounterSeries:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, metric, key):
+        yield f'{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(self.value)}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+
+class _GaugeSeries(_CounterSeries):
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def set(self, value, **labels):
+        self.labels(**labels).set(value)
+
+
+class _HistogramSeries:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, metric, key):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), counts):
+            cumulative += count
+            labels = _format_labels(metric.labelnames, key, [('le', _format_value(float(bound)))])
+            yield f'{metric.name}_bucket{labels} {cumulative}'
+        labels = _format_labels(metric.labelnames, key)
+        yield f'{metric.name}_sum{labels} {_format_value(total)}'
+        yield f'{metric.name}_count{labels} {cumulative}'
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        return self.labels(**labels).time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register_collector(self, collector):
+        """Call `collector()` before each render, to refresh gauges read from elsewhere."""
+        self._collectors.append(collector)
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        for collector in self._collectors:
+            collector()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# --- HTTP metrics (recorded by utils.middleware.MetricsMiddleware) ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'gameplan_http_request_duration_seconds',
+    'Time to produce a response, by route pattern, method and status class.',
+    ['route', 'method', 'status'],
+)
+HTTP_CONDITIONAL_REQUESTS = Counter(
+    'gameplan_http_conditional_requests_total',
+    'Conditional GETs (If-None-Match / If-Modified-Since) by route; result is hit (304) or miss.',
+    ['route', 'result'],
+)
+
+
+# --- Database connection pool (recorded by utils.db_backend) ---
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    'gameplan_db_pool_wait_seconds',
+    'Time a thread waited to check a connection out of the pool.',
+    ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    'gameplan_db_pool_timeouts_total',
+    'Checkouts that gave up after the pool timeout with no connection free.',
+    ['alias'],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'gameplan_db_pool_connections',
+    'Pool occupancy at scrape time: open connections, idle ones and requests waiting for one.',
+    ['alias', 'state'],
+)
+
+
+# --- Read-replica routing (recorded by utils.db_routing) ---
+
+DB_READ_ROUTING = Counter(
+    'gameplan_db_read_routing_total',
+    'Requests by where their reads went: replica, or default because of a write, '
+    'a @read_from_primary view or a sticky caller.',
+    ['decision'],
+)
+
+
+# --- Idempotency keys (recorded by idempotency.decorators) ---
+
+IDEMPOTENT_REQUESTS = Counter(
+    'gameplan_idempotent_requests_total',
+    'Requests carrying an Idempotency-Key: new (ran the view), replayed, waited (for the first '
+    'request, then replayed), rejected (key reused for another request) or timed_out.',
+    ['outcome'],
+)
@@ -0,0 +1,274 @@
+import gzip
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+import zstandard
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .db_routing import SAFE_METHODS, current_read_db, mark_sticky, route_request
+from .metrics import HTTP_CONDITIONAL_REQUESTS, HTTP_REQUEST_SECONDS
+from .queries import QueryBudgetExceeded, QueryStats, get_query_budget
+from .request_id import current_request_id, request_id_from_header
+
+query_logger = logging.getLogger('gameplan.queries')
+
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+_zstd = zstandard.ZstdCompressor(level=3)
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for token in header.split(','):
+        match = _encoding_re.match(token)
+        if not match:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.lower())
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses above RESPONSE_COMPRESSION_MIN_SIZE bytes with zstd
+    when the client accepts it, gzip otherwise. Small bodies go out as-is:
+    below the threshold the CPU cost outweighs the bytes saved. Streaming
+    responses are left alone (exports compress themselves).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if 'zstd' in accepted:
+            encoding, compressed = 'zstd', _zstd.compress(response.content)
+        elif 'gzip' in accepted:
+            encoding, compressed = 'gzip', gzip.compress(response.content, compresslevel=6, mtime=0)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+
+        # The encoded body is a different representation: weaken the ETag
+        # (If-None-Match uses weak comparison, so 304s still work)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        return response
+
+
+class _HybridMiddleware:
+    """
+    Base for middleware that works around get_response: subclasses write
+    before()/after(), and requests stay on the event loop under ASGI instead
+    of being handed to a thread for this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+    # Run before()/cleanup() on the request's sync thread under ASGI, for
+    # per-thread state such as database connections
+    thread_bound = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def before(self, request):
+        """Return state for after(), or raise."""
+        return None
+
+    def after(self, request, response, state):
+        return response
+
+    def cleanup(self, state):
+        """Called however the request ended, after after() when it returned."""
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.before(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.cleanup(state)
+        return self.after(request, response, state)
+
+    async def __acall__(self, request):
+        if self.thread_bound:
+            state = await sync_to_async(self.before)(request)
+        else:
+            state = self.before(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if self.thread_bound:
+                await sync_to_async(self.cleanup)(state)
+            else:
+                self.cleanup(state)
+        return self.after(request, response, state)
+
+
+class QueryInstrumentationMiddleware(_HybridMiddleware):
+    """
+    Count and time the SQL each request runs. The totals go out as X-DB-*
+    headers in DEBUG or for staff users, and every request is logged as a
+    structured record on the 'gameplan.queries' logger. Requests over the
+    view's declared @query_budget are logged as warnings, and raise
+    QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (as in the test
+    suite, see app/test_settings.py).
+
+    Streaming bodies run their queries after this returns and aren't counted.
+    """
+    thread_bound = True  # async ORM queries run on the request's sync thread
+
+    def before(self, request):
+        stats = QueryStats()
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        return stats, stack
+
+    def cleanup(self, state):
+        state[1].close()
+
+    def after(self, request, response, state):
+        stats = state[0]
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else None
+        budget = get_query_budget(match.func, request.method) if match else None
+        if getattr(request, 'idempotent_replay', False):
+            # Answered from idempotency.decorators' store, not by the view
+            budget = None
+        over_budget = budget is not None and stats.count > budget
+
+        record = {
+            'request_id': getattr(request, 'request_id', ''),
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_time_ms': round(stats.total_ms, 2),
+            'slowest_ms': round(stats.slowest_ms, 2),
+            'slowest_sql': stats.slowest_sql,
+            'duplicates': stats.duplicates,
+            'budget': budget,
+        }
+        query_logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            "%s %s: %d queries in %.1f ms (budget %s)",
+            request.method, route or request.path, stats.count, stats.total_ms, budget,
+            extra={'db_stats': record},
+        )
+
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or getattr(user, 'is_staff', False):
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = f"{stats.total_ms:.2f}"
+            response.headers['X-DB-Slowest-Ms'] = f"{stats.slowest_ms:.2f}"
+            if budget is not None:
+                response.headers['X-DB-Query-Budget'] = str(budget)
+
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f"{request.method} {route or request.path} ran {stats.count} queries, "
+                f"over its budget of {budget} ({stats.duplicates} duplicate statements)"
+            )
+        return response
+
+
+class MetricsMiddleware(_HybridMiddleware):
+    """
+    Record request latency per route pattern (never the raw path, so label
+    cardinality stays bounded) and the hit rate of conditional GETs.
+    Goes first in MIDDLEWARE so the histogram covers the whole stack.
+    """
+
+    def before(self, request):
+        return time.perf_counter()
+
+    def after(self, request, response, started):
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(
+            elapsed,
+            route=route,
+            method=request.method if request.method in HTTP_METHODS else 'other',
+            status=f"{response.status_code // 100}xx",
+        )
+
+        if request.method in ('GET', 'HEAD') and (
+            'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        ):
+            HTTP_CONDITIONAL_REQUESTS.inc(route=route, result='hit' if response.status_code == 304 else 'miss')
+        return response
+
+
+class RequestIdMiddleware(_HybridMiddleware):
+    """
+    Give every request an id (the caller's X-Request-ID when valid), echo it
+    in the response and expose it to code without the request through
+    utils.request_id.get_request_id(). Agent traces are keyed by it.
+    """
+
+    def before(self, request):
+        request.request_id = request_id_from_header(request.META.get('HTTP_X_REQUEST_ID'))
+        return current_request_id.set(request.request_id)
+
+    def cleanup(self, token):
+        current_request_id.reset(token)
+
+    def after(self, request, response, token):
+        response.headers['X-Request-ID'] = request.request_id
+        return response
+
+
+class ReplicaRoutingMiddleware(_HybridMiddleware):
+    """
+    Send the reads of safe requests to a read replica (utils.db_routing),
+    and keep a caller's reads on default for a few seconds after each of
+    their writes. Removes itself when no replicas are configured.
+    """
+    thread_bound = True  # the sticky marks are cache lookups
+
+    def __init__(self, get_response):
+        if not settings.DB_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def before(self, request):
+        return request.method not in SAFE_METHODS, route_request(request)
+
+    def cleanup(self, state):
+        wrote, caller = state
+        current_read_db.set(None)
+        if wrote:
+            mark_sticky(caller)
@@ -0,0 +1,75 @@
+"""
+Per-request query statistics and declared query budgets.
+
+A budget is an upper bound on the number of SQL statements one request to
+a view may run. It is declared on the view with @query_budget and checked
+by utils.middleware.QueryInstrumentationMiddleware, so a change that turns
+a constant number of queries into one per row (an N+1) trips it.
+"""
+import time
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    """execute_wrapper callable that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+            if elapsed_ms > self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_sql = sql
+
+    @property
+    def duplicates(self):
+        """Statements run more than once with the same SQL: the usual N+1 signature."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+def query_budget(limit=None, **per_method):
+    """
+    Declare the query budget of a view.
+
+        @query_budget(4)                 # function view, any method
+        @api_view(['GET'])
+        def get_plan_by_id(request, chat_id): ...
+
+        @query_budget(get=3, post=12)    # class-based view, per method
+        class ChatListCreateView(APIView): ...
+
+    Goes above @api_view so it lands on the view Django dispatches to.
+    """
+    budget = dict(per_method)
+    if limit is not None:
+        budget['*'] = limit
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def get_query_budget(view_func, method):
+    """The budget declared for `view_func` and HTTP `method`, or None."""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    if not budget:
+        return None
+    return budget.get(method.lower(), budget.get('*'))
@@ -0,0 +1,20 @@
+import re
+import uuid
+from contextvars import ContextVar
+
+# Id of the HTTP request being served, for code that has no request object
+# (agent callbacks, log records). Set by utils.middleware.RequestIdMiddleware.
+current_request_id = ContextVar('current_request_id', default='')
+
+_valid_request_id = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def request_id_from_header(value):
+    """Reuse an upstream X-Request-ID when it is sane, otherwise mint one."""
+    if value and _valid_request_id.match(value):
+        return value
+    return uuid.uuid4().hex
+
+
+def get_request_id():
+    return current_request_id.get()
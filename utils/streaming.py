@@ -0,0 +1,45 @@
+"""
+Streaming responses that stay streamed under ASGI.
+
+StreamingHttpResponse serves a sync iterator under ASGI by running list()
+over it in a thread before sending anything, so an export would be built
+in memory after all. streaming_content() hands ASGI an async iterator
+instead, which pulls the sync chunks a batch at a time through
+sync_to_async. The calls are thread-sensitive: they run on the request's
+thread, where the server-side cursor behind the chunks was opened. Under
+WSGI the sync iterator is returned as is.
+
+    return StreamingHttpResponse(streaming_content(request, iter_rows(...)))
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Bytes (or characters) pulled per thread hop: generators that yield small
+# pieces, like the iCalendar feed, shouldn't cost a hop each
+BATCH_SIZE = 64 * 1024
+
+
+def _next_batch(chunks, size):
+    batch, total = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        total += len(chunk)
+        if total >= size:
+            break
+    return batch
+
+
+async def _aiter_chunks(chunks, size):
+    chunks = iter(chunks)
+    next_batch = sync_to_async(_next_batch, thread_sensitive=True)
+    while batch := await next_batch(chunks, size):
+        for chunk in batch:
+            yield chunk
+
+
+def streaming_content(request, chunks, batch_size=BATCH_SIZE):
+    """`chunks` as the server serving `request` can stream them."""
+    # DRF's Request wraps the Django one
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _aiter_chunks(chunks, batch_size)
+    return chunks
@@ -0,0 +1,69 @@
+"""
+Test helpers.
+
+QueryBudgetTestCase sends requests through the whole middleware stack with
+QUERY_BUDGET_STRICT on, so a view running more queries than its
+@query_budget fails the test with QueryBudgetExceeded:
+
+    class ChatBudgetTests(QueryBudgetTestCase):
+        def test_send(self):
+            self.assertWithinBudget('post', f'/api/chats/{plan.id}/send/', {'message': 'hi'})
+
+Requests carry a real access token, so the user lookup the JWT
+authentication does is counted, as in production.
+
+asgi_get() requests a path through the ASGI handler instead of WSGI, for
+behaviour that differs between the two (streamed responses).
+"""
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .queries import get_query_budget
+
+
+# DEBUG puts the X-DB-Query-* headers on every response
+@override_settings(QUERY_BUDGET_STRICT=True, DEBUG=True)
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.user.trial_start = timezone.now() - timedelta(days=1)
+        self.user.trial_end = timezone.now() + timedelta(days=7)
+        self.user.save()
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def assertWithinBudget(self, method, path, data=None, headers=None, status=None):
+        """Request `path` and check it declares a budget and stays within it. Returns the response."""
+        route_path = urlsplit(path).path
+        budget = get_query_budget(resolve(route_path).func, method)
+        self.assertIsNotNone(budget, f"{method.upper()} {route_path} declares no query budget")
+
+        response = getattr(self.client, method)(
+            path, data, content_type='application/json', headers={**self.auth, **(headers or {})},
+        )
+        if status is not None:
+            self.assertEqual(response.status_code, status, getattr(response, 'content', b'')[:500])
+        # Idempotent replays are exempt from the view's budget, but should cost less anyway
+        if 'Idempotent-Replayed' not in response.headers:
+            self.assertEqual(response.headers['X-DB-Query-Budget'], str(budget))
+        self.assertLessEqual(int(response.headers['X-DB-Query-Count']), budget)
+        return response
+
+
+def asgi_get(path, headers=None):
+    """GET `path` through the ASGI handler. Returns the response and its body, read the way ASGI servers read it."""
+    async def get():
+        response = await AsyncClient().get(path, headers=headers or {})
+        if not response.streaming:
+            return response, response.content
+        if response.is_async:
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+        return response, b''.join(response.streaming_content)
+
+    return async_to_sync(get)()
@@ -0,0 +1,293 @@
+import datetime
+import decimal
+import gzip
+import io
+import os
+from contextlib import ExitStack
+from unittest import mock
+
+import zstandard
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from plans.models import Plan
+from plans.views import ChatListCreateView
+
+from .db_routing import ReplicaRouter, current_read_db
+from . import metrics
+from .middleware import CompressionMiddleware
+from .parsers import ORJSONParser
+from .queries import QueryBudgetExceeded
+from .renderers import ORJSONRenderer, dumps
+from .testing import QueryBudgetTestCase
+
+
+class QueryBudgetTests(QueryBudgetTestCase):
+    def test_over_budget_request_fails(self):
+        with mock.patch.object(ChatListCreateView, 'query_budget', {'get': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/chats/', headers=self.auth)
+
+    def test_within_budget_request_reports_its_queries(self):
+        response = self.assertWithinBudget('get', '/api/chats/', status=200)
+        self.assertGreater(int(response.headers['X-DB-Query-Count']), 0)
+
+
+class JSONTests(SimpleTestCase):
+    def test_types_orjson_does_not_know(self):
+        data = {
+            'price': decimal.Decimal('9.50'),
+            'at': datetime.datetime(2025, 8, 31, 18, 0, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2025, 8, 31),
+            'duration': datetime.timedelta(minutes=90),
+            'label': gettext_lazy("Untitled"),
+            'tags': ('rondo', 'press'),
+            1: 'non-string key',
+        }
+        self.assertEqual(dumps(data), (
+            b'{"price":9.5,"at":"2025-08-31T18:00:00Z","day":"2025-08-31","duration":"5400.0",'
+            b'"label":"Untitled","tags":["rondo","press"],"1":"non-string key"}'
+        ))
+        with self.assertRaises(TypeError):
+            dumps({'unknown': object()})
+
+    def test_renderer_and_parser(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(ORJSONRenderer().render({'a': [1]}))), {'a': [1]})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"a": '))
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024)
+class CompressionTests(SimpleTestCase):
+    body = b'{"drill": "rondo", "players": 6}' * 100
+
+    def respond(self, accept_encoding, response=None):
+        response = response or HttpResponse(self.body, content_type='application/json')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_zstd_preferred_over_gzip(self):
+        response = self.respond('gzip, deflate, br, zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(zstandard.ZstdDecompressor().decompress(response.content), self.body)
+
+    def test_gzip_when_zstd_is_not_accepted(self):
+        for accept_encoding in ('gzip, deflate', 'gzip, zstd;q=0', 'GZIP;q=0.5'):
+            with self.subTest(accept_encoding):
+                response = self.respond(accept_encoding)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_left_alone(self):
+        for accept_encoding in ('', 'identity', 'gzip;q=0', 'br'):
+            with self.subTest(accept_encoding):
+                response = self.respond(accept_encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.body)
+
+    def test_size_threshold(self):
+        small = self.respond('zstd', HttpResponse(self.body[:1023]))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(small.has_header('Vary'))
+        self.assertEqual(self.respond('zstd', HttpResponse(self.body[:1024]))['Content-Encoding'], 'zstd')
+
+        # Compressing must save something
+        noise = self.respond('zstd, gzip', HttpResponse(os.urandom(4096)))
+        self.assertFalse(noise.has_header('Content-Encoding'))
+
+    def test_streaming_responses_are_left_alone(self):
+        response = self.respond('zstd', StreamingHttpResponse(iter([self.body])))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_etag_is_weakened(self):
+        strong = HttpResponse(self.body)
+        strong['ETag'] = '"plan-1-2"'
+        self.assertEqual(self.respond('zstd', strong)['ETag'], 'W/"plan-1-2"')
+
+        weak = HttpResponse(self.body)
+        weak['ETag'] = 'W/"plan-1-2"'
+        self.assertEqual(self.respond('zstd', weak)['ETag'], 'W/"plan-1-2"')
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsEndpointTests(TestCase):
+    def scrape(self, authorization=None):
+        headers = {'Authorization': authorization} if authorization else {}
+        return self.client.get('/metrics', headers=headers)
+
+    def test_scraper_token(self):
+        response = self.scrape('Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn(b'# TYPE gameplan_http_request_duration_seconds histogram', response.content)
+
+    def test_staff_access_token(self):
+        user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.assertEqual(self.scrape(f'Bearer {AccessToken.for_user(user)}').status_code, 401)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.scrape(f'Bearer {AccessToken.for_user(user)}').status_code, 200)
+
+    def test_everyone_else_is_turned_away(self):
+        for authorization in (None, 'Bearer wrong-token', 'Basic scrape-token', 'Bearer not.a.jwt', 'Bearer'):
+            with self.subTest(authorization=authorization):
+                response = self.scrape(authorization)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_configured(self):
+        self.assertEqual(self.scrape('Bearer ').status_code, 401)
+        self.assertEqual(self.scrape('Bearer scrape-token').status_code, 401)
+
+    def test_get_only(self):
+        response = self.client.post('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        self.assertEqual(response.status_code, 405)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        # Metrics made here stay out of the app's registry
+        patcher = mock.patch.object(metrics, 'REGISTRY', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_series_past_the_limit_fold_into_other(self):
+        counter = metrics.Counter('test_requests_total', "Requests.", ['route'])
+        with mock.patch.object(metrics, 'MAX_SERIES', 3):
+            for index in range(5):
+                counter.inc(route=f'/plans/{index}/')
+            counter.inc(route='/plans/0/')
+        self.assertEqual(metrics.REGISTRY.render().splitlines(), [
+            '# HELP test_requests_total Requests.',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{route="/plans/0/"} 2',
+            'test_requests_total{route="/plans/1/"} 1',
+            'test_requests_total{route="/plans/2/"} 1',
+            'test_requests_total{route="other"} 2',
+        ])
+
+    def test_histogram_rendering(self):
+        histogram = metrics.Histogram('test_seconds', "Latency.", ['route'], buckets=(0.1, 1.0))
+        histogram.observe(0.05, route='a"b')
+        histogram.observe(2.0, route='a"b')
+        self.assertEqual(metrics.REGISTRY.render().splitlines()[2:], [
+            'test_seconds_bucket{route="a\\"b",le="0.1"} 1',
+            'test_seconds_bucket{route="a\\"b",le="1.0"} 1',
+            'test_seconds_bucket{route="a\\"b",le="+Inf"} 2',
+            'test_seconds_sum{route="a\\"b"} 2.05',
+            'test_seconds_count{route="a\\"b"} 2',
+        ])
+
+
+@override_settings(DB_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routing against the replica1 and replica2 test mirrors of default (see DB_REPLICAS in settings)."""
+
+    databases = {'default', 'replica1', 'replica2'}
+    # Every app; setting it makes the flush between tests TRUNCATE ... CASCADE.
+    # The flush only sees tables on the search_path, though, not the ones in
+    # the django schema: tearDown deletes what the tests made
+    available_apps = settings.INSTALLED_APPS
+
+    @classmethod
+    def tearDownClass(cls):
+        # The mirrors' pools would keep the test database open past its teardown
+        for alias in ('replica1', 'replica2'):
+            if connections[alias].pool:
+                connections[alias].close_pool()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('coach', 'coach@example.com', 'pw-123456')
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def tearDown(self):
+        # Plans, saved classes, usage and the rest go with their users
+        get_user_model().objects.all().delete()
+
+    def queries_by_alias(self, method, path, headers=None):
+        """Send a request and return how many queries it ran on each alias."""
+        with ExitStack() as stack:
+            captured = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in ('default', 'replica1', 'replica2')
+            }
+            response = getattr(self.client, method)(path, content_type='application/json', headers=headers or self.auth)
+        self.assertLess(response.status_code, 400, response.content[:500])
+        return {alias: len(queries) for alias, queries in captured.items()}
+
+    def test_safe_requests_read_from_a_replica(self):
+        with mock.patch('utils.db_routing.random.choice', side_effect=lambda aliases: aliases[-1]) as choice:
+            queries = self.queries_by_alias('get', '/api/classes/saved/')
+        choice.assert_called_once_with(['replica1', 'replica2'])
+        self.assertEqual(queries['default'], 0)
+        self.assertEqual(queries['replica1'], 0)
+        self.assertGreater(queries['replica2'], 0)
+
+    def test_message_paging_reads_from_the_replica(self):
+        # The messages are expanded in raw SQL, which has to follow the router like the ORM
+        plan = Plan.objects.create(user=self.user, conversation=[{"role": "user", "content": "rondos?"}])
+        with mock.patch('utils.db_routing.random.choice', side_effect=lambda aliases: aliases[0]):
+            queries = self.queries_by_alias('get', f'/api/chats/{plan.id}/messages/')
+        self.assertEqual(queries['default'], 0)
+        self.assertGreater(queries['replica1'], 0)
+
+    def test_writes_keep_the_caller_on_primary(self):
+        queries = self.queries_by_alias('post', '/api/chats/new/')
+        self.assertEqual(queries['replica1'] + queries['replica2'], 0)
+
+        queries = self.queries_by_alias('get', '/api/classes/saved/')
+        self.assertGreater(queries['default'], 0)
+        self.assertEqual(queries['replica1'] + queries['replica2'], 0)
+
+        # Other callers aren't affected
+        other = get_user_model().objects.create_user('other', 'other@example.com', 'pw-123456')
+        queries = self.queries_by_alias(
+            'get', '/api/classes/saved/', headers={'Authorization': f'Bearer {AccessToken.for_user(other)}'},
+        )
+        self.assertEqual(queries['default'], 0)
+
+        # Once the mark expires, the caller is back on a replica
+        cache.clear()
+        queries = self.queries_by_alias('get', '/api/classes/saved/')
+        self.assertEqual(queries['default'], 0)
+
+    def test_read_from_primary_views(self):
+        queries = self.queries_by_alias('get', '/api/profile/')
+        self.assertGreater(queries['default'], 0)
+        self.assertEqual(queries['replica1'] + queries['replica2'], 0)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        token = current_read_db.set('replica1')
+        try:
+            self.assertEqual(router.db_for_read(Plan), 'replica1')
+            self.assertIsNone(router.db_for_read(Session))
+            # Reads inside a transaction on default see its uncommitted rows
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Plan))
+        finally:
+            current_read_db.reset(token)
+        self.assertIsNone(router.db_for_read(Plan))
+        self.assertEqual(router.db_for_write(Plan), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.allow_migrate('default', 'plans'))
+        self.assertFalse(router.allow_migrate('replica1', 'plans'))
+        self.assertFalse(router.allow_migrate('replica2', 'plans'))
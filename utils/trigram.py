@@ -0,0 +1,52 @@
+"""
+Trigram indexes behind the admin's icontains searches (utils/admin.py).
+
+    operations = [trigram_indexes('"django"."users"', {'users_email_trgm': 'email'})]
+
+For icontains Django compares UPPER(column), so that is what gets indexed.
+The indexes are built CONCURRENTLY, so the table stays writable meanwhile,
+which means the migration needs `atomic = False`. Postgres only. When
+pg_trgm isn't installed and can't be created (a server built without
+contrib, or a role that may not create extensions), the indexes are skipped
+with a warning: the searches still work, unindexed.
+"""
+import warnings
+
+from django.db import DatabaseError, migrations
+
+
+def _has_trigram_extension(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is not None:
+            return True
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            warnings.warn("pg_trgm isn't available on this server: skipping the trigram indexes")
+            return False
+    try:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        warnings.warn(f"Couldn't create the pg_trgm extension ({e}): skipping the trigram indexes")
+        return False
+    return True
+
+
+def trigram_indexes(table, indexes):
+    """A RunPython operation adding (and on reverse dropping) `indexes` ({name: column}) on `table`."""
+
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql' or not _has_trigram_extension(schema_editor):
+            return
+        for name, column in indexes.items():
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name in indexes:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "django"."{name}"')
+
+    return migrations.RunPython(create, drop)
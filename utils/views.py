@@ -0,0 +1,33 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .metrics import REGISTRY
+
+
+def _authorized(request):
+    """A scraper with METRICS_TOKEN, or a staff user with a valid access token."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, credentials = header.partition(' ')
+    if scheme != 'Bearer' or not credentials:
+        return False
+
+    if settings.METRICS_TOKEN and hmac.compare_digest(credentials, settings.METRICS_TOKEN):
+        return True
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+# --- GET /metrics (Prometheus text format) ---
+@require_GET
+def metrics(request):
+    if not _authorized(request):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')